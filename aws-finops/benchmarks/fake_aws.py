@@ -0,0 +1,600 @@
+"""In-process fake AWS backend for benchmarking the cleanup Lambda.
+
+Every client created through aws_clients gets two botocore event handlers: one keeps
+the request parameters, the other answers the call from in-memory state before any
+request is sent (a `before-call` handler returning a response short-circuits the HTTP
+layer). It is registered last, so the rate limiter and telemetry handlers still run;
+pagination and error handling of the real clients run as well, so the benchmark
+measures the code as it runs in Lambda, minus the network.
+
+Latency and throttling are injectable: each call sleeps for `latency` seconds (holding
+its thread like a real request would) and fails with ThrottlingException with
+probability `throttle_rate`. Short-circuited calls skip botocore's retry handler, so a
+throttled call fails right away instead of being retried. Operations in API_QUOTAS also
+fail with their quota error when called more often than their documented rate.
+"""
+import collections
+import datetime
+import json
+import random
+import threading
+import time
+from typing import Dict, List, NamedTuple, Optional
+
+# Resources seeded per region at scale 1.0
+DEFAULT_COUNTS = {
+    'instances': 200,
+    'volumes': 200,
+    'addresses': 50,
+    'load_balancers': 50,
+    'db_clusters': 20,
+    'db_instances': 50,
+    'eks_clusters': 5,
+    'nodegroups_per_cluster': 4,
+    'streams': 20,
+    'msk_clusters': 10,
+    'domains': 10,
+}
+
+KEEP_TAG = {'Key': 'auto-deletion', 'Value': 'skip-resource'}
+# Documented per-region call rates: operation -> (calls per second, error code)
+API_QUOTAS = {
+    'kinesis.DeleteStream': (5, 'LimitExceededException'),
+}
+# Seeded state kind of each Resource Explorer resource type
+RESOURCE_EXPLORER_TYPES = {
+    'ec2:instance': 'instances',
+    'ec2:volume': 'volumes',
+    'ec2:elastic-ip': 'addresses',
+    'elasticloadbalancing:loadbalancer': 'load_balancers',
+    'rds:db': 'db_instances',
+    'rds:cluster': 'db_clusters',
+    'eks:cluster': 'eks',
+    'kinesis:stream': 'streams',
+    'kafka:cluster': 'msk',
+    'es:domain': 'domains',
+}
+
+
+class _Http:
+    """Minimal stand-in for the botocore HTTP response"""
+
+    def __init__(self, status_code: int):
+        self.status_code = status_code
+        self.headers = {}
+        self.raw = None
+        self.content = b''
+        self.text = ''
+
+
+def _ok(body: dict):
+    body.setdefault('ResponseMetadata', {'HTTPStatusCode': 200, 'RequestId': 'fake'})
+    return _Http(200), body
+
+
+def _error(code: str, status: int = 400, message: str = ''):
+    return _Http(status), {'Error': {'Code': code, 'Message': message or code},
+                           'ResponseMetadata': {'HTTPStatusCode': status, 'RequestId': 'fake'}}
+
+
+def _page(items: list, params: dict, token: str = 'NextToken', limit: str = 'MaxResults', default: int = 1000):
+    start = int(params.get(token) or 0)
+    size = params.get(limit) or default
+    chunk = items[start:start + size]
+    next_token = str(start + size) if start + size < len(items) else None
+    return chunk, next_token
+
+
+def _created(index: int) -> datetime.datetime:
+    return datetime.datetime(2024, 1, 1, tzinfo=datetime.timezone.utc) + datetime.timedelta(hours=index)
+
+
+class FakeConfig(NamedTuple):
+    """Seeding and fault injection settings of a FakeAws backend.
+
+    :param regions: Region names to seed
+    :param counts: Resources per region (keys of DEFAULT_COUNTS)
+    :param latency: Seconds every call takes
+    :param throttle_rate: Probability (0-1) that a call is throttled
+    :param protected_ratio: Share of resources carrying the protection tag
+    :param seed: Random seed of the throttling decisions
+    """
+    regions: List[str]
+    counts: Dict[str, int] = DEFAULT_COUNTS
+    latency: float = 0.0
+    throttle_rate: float = 0.0
+    protected_ratio: float = 0.1
+    seed: int = 0
+
+
+class FakeAws:
+    """Stateful fake of the AWS APIs used by the cleanup phases."""
+
+    def __init__(self, config: FakeConfig):
+        self.config = config
+        self.calls = collections.Counter()
+        self.throttles = collections.Counter()
+        self._random = random.Random(config.seed)
+        self._lock = threading.Lock()
+        self._quota_calls: Dict[tuple, collections.deque] = collections.defaultdict(collections.deque)
+        self.state = {region: self._seed(region) for region in config.regions}
+
+    def _protected(self, index: int) -> bool:
+        ratio = self.config.protected_ratio
+        return ratio > 0 and index % max(1, round(1 / ratio)) == 1
+
+    def _seed(self, region: str) -> dict:
+        counts = dict(DEFAULT_COUNTS, **self.config.counts)
+        state = {}
+        state['instances'] = {}
+        for k in range(counts['instances']):
+            tags = [{'Key': 'Name', 'Value': f'bench-{k}'}]
+            if k % 4 == 0:
+                tags.append({'Key': 'CreatedOn', 'Value': '01/01/2024'})
+            if self._protected(k):
+                tags.append(KEEP_TAG)
+            instance = {
+                'InstanceId': f'i-{region}-{k:06d}',
+                'State': {'Name': 'stopped' if k % 5 == 0 else 'running'},
+                'Monitoring': {'State': 'enabled' if k % 2 else 'disabled'},
+                'LaunchTime': _created(k),
+                'Tags': tags,
+            }
+            if k % 7 == 0:
+                instance['InstanceLifecycle'] = 'spot'
+            state['instances'][instance['InstanceId']] = instance
+
+        clusters = [f'eks-{region}-{k}' for k in range(counts['eks_clusters'])]
+        state['volumes'] = {}
+        for k in range(counts['volumes']):
+            tags = []
+            if k % 3 == 0 and clusters:
+                # Every other owner cluster no longer exists
+                owner = clusters[k % len(clusters)] if k % 2 else f'gone-{k}'
+                tags.append({'Key': f'kubernetes.io/cluster/{owner}', 'Value': 'owned'})
+            if self._protected(k):
+                tags.append(KEEP_TAG)
+            volume_id = f'vol-{region}-{k:06d}'
+            state['volumes'][volume_id] = {'VolumeId': volume_id, 'Size': 8 + k % 100, 'State': 'available',
+                                           'CreateTime': _created(k), 'Tags': tags}
+
+        state['addresses'] = {}
+        for k in range(counts['addresses']):
+            allocation_id = f'eipalloc-{region}-{k:06d}'
+            address = {'AllocationId': allocation_id, 'PublicIp': f'10.{k // 65536}.{k // 256 % 256}.{k % 256}',
+                       'Tags': [KEEP_TAG] if self._protected(k) else []}
+            if k % 4 == 0:
+                address['AssociationId'] = f'eipassoc-{k}'
+            state['addresses'][allocation_id] = address
+
+        state['load_balancers'] = {}
+        state['load_balancer_tags'] = {}
+        for k in range(counts['load_balancers']):
+            name = f'elb-{region}-{k:06d}'
+            state['load_balancers'][name] = {
+                'LoadBalancerName': name,
+                'Instances': [{'InstanceId': 'i-attached'}] if k % 3 == 0 else [],
+                'CreatedTime': _created(k),
+            }
+            state['load_balancer_tags'][name] = [KEEP_TAG] if self._protected(k) else []
+
+        state['db_clusters'] = {}
+        state['db_instances'] = {}
+        for k in range(counts['db_clusters']):
+            cluster_id = f'aurora-{region}-{k:04d}'
+            state['db_clusters'][cluster_id] = {'DBClusterIdentifier': cluster_id,
+                                                'Status': 'stopped' if k % 4 == 0 else 'available',
+                                                'Engine': 'aurora-postgresql'}
+        for k in range(counts['db_instances']):
+            instance_id = f'db-{region}-{k:04d}'
+            instance = {'DBInstanceIdentifier': instance_id,
+                        'DBInstanceStatus': 'stopped' if k % 4 == 0 else 'available',
+                        'Engine': 'postgres'}
+            if state['db_clusters'] and k % 5 == 0:
+                instance['DBClusterIdentifier'] = sorted(state['db_clusters'])[k % len(state['db_clusters'])]
+                instance['Engine'] = 'aurora-postgresql'
+                state['db_clusters'][instance['DBClusterIdentifier']].setdefault('DBClusterMembers', []).append(
+                    {'DBInstanceIdentifier': instance_id, 'IsClusterWriter': False})
+            state['db_instances'][instance_id] = instance
+
+        state['eks'] = {}
+        for k, cluster in enumerate(clusters):
+            state['eks'][cluster] = {
+                f'ng-{n}': {'status': 'ACTIVE',
+                            'scalingConfig': {'minSize': 0, 'maxSize': 5, 'desiredSize': 0 if n % 3 == 0 else 2},
+                            'tags': {KEEP_TAG['Key']: KEEP_TAG['Value']} if self._protected(n) else {}}
+                for n in range(counts['nodegroups_per_cluster'])
+            }
+
+        state['streams'] = [f'{"upsolver_" if k % 10 == 0 else ""}stream-{region}-{k:04d}'
+                            for k in range(counts['streams'])]
+        state['msk'] = {}
+        for k in range(counts['msk_clusters']):
+            arn = f'arn:aws:kafka:{region}:123456789012:cluster/msk-{k:04d}/{k:08x}'
+            state['msk'][arn] = {'ClusterArn': arn, 'ClusterName': f'msk-{region}-{k:04d}',
+                                 'State': 'ACTIVE' if k % 5 else 'CREATING',
+                                 'Tags': {KEEP_TAG['Key']: KEEP_TAG['Value']} if self._protected(k) else {}}
+        state['domains'] = {f'search-{region}-{k:04d}': {'Processing': k % 5 == 0, 'Deleted': False}
+                            for k in range(counts['domains'])}
+        return state
+
+    def install(self):
+        """Attach the fake to every client aws_clients creates from now on"""
+        import aws_clients
+
+        def hook(client, service, region, account_id=None):
+            client.meta.events.register('before-parameter-build', self._keep_params)
+            client.meta.events.register_last('before-call', self._handle)
+
+        aws_clients.register_client_hook(hook)
+        return self
+
+    @staticmethod
+    def _keep_params(params, context, **kwargs):
+        context['fake_params'] = dict(params)
+
+    def _handle(self, model, context, **kwargs):
+        service = model.service_model.service_name
+        operation = model.name
+        region = context.get('client_region') or 'us-east-1'
+        key = f'{service}.{operation}'
+        with self._lock:
+            self.calls[key] += 1
+            throttled = self.config.throttle_rate and self._random.random() < self.config.throttle_rate
+        if self.config.latency:
+            time.sleep(self.config.latency)
+        if throttled:
+            with self._lock:
+                self.throttles[key] += 1
+            return _error('ThrottlingException', message='Rate exceeded')
+        if key in API_QUOTAS and self._over_quota(key, region):
+            with self._lock:
+                self.throttles[key] += 1
+            return _error(API_QUOTAS[key][1], message='Rate exceeded for account')
+
+        handler = getattr(self, f'{service.replace("-", "_")}_{operation}', None)
+        if handler is None:
+            return _ok({})
+        if region not in self.state and service not in ('sts', 'ses', 's3', 'organizations'):
+            return _error('UnrecognizedClientException', message=f'Region {region} is not seeded')
+        with self._lock:
+            return handler(region, context.get('fake_params', {}))
+
+    def _over_quota(self, key: str, region: str) -> bool:
+        """Count a call against its quota, True if the last second already used it up"""
+        rate = API_QUOTAS[key][0]
+        now = time.monotonic()
+        with self._lock:
+            calls = self._quota_calls[(key, region)]
+            while calls and calls[0] <= now - 1.0:
+                calls.popleft()
+            if len(calls) >= rate:
+                return True
+            calls.append(now)
+            return False
+
+    # EC2
+
+    def ec2_DescribeRegions(self, region, params):
+        return _ok({'Regions': [{'RegionName': name} for name in self.state]})
+
+    def ec2_DescribeInstances(self, region, params):
+        instances = list(self.state[region]['instances'].values())
+        for filter_ in params.get('Filters', []):
+            if filter_['Name'] == 'instance-state-name':
+                instances = [i for i in instances if i['State']['Name'] in filter_['Values']]
+            elif filter_['Name'] == 'instance-id':
+                instances = [i for i in instances if i['InstanceId'] in filter_['Values']]
+        if params.get('InstanceIds'):
+            instances = [i for i in instances if i['InstanceId'] in params['InstanceIds']]
+        chunk, next_token = _page(instances, params)
+        return _ok({'Reservations': [{'Instances': chunk}] if chunk else [],
+                    **({'NextToken': next_token} if next_token else {})})
+
+    def _set_instance_state(self, region, instance_ids, state):
+        for instance_id in instance_ids:
+            if instance_id not in self.state[region]['instances']:
+                return _error('InvalidInstanceID.NotFound')
+        for instance_id in instance_ids:
+            self.state[region]['instances'][instance_id]['State'] = {'Name': state}
+        return _ok({})
+
+    def ec2_StopInstances(self, region, params):
+        return self._set_instance_state(region, params['InstanceIds'], 'stopped')
+
+    def ec2_UnmonitorInstances(self, region, params):
+        for instance_id in params['InstanceIds']:
+            self.state[region]['instances'][instance_id]['Monitoring'] = {'State': 'disabled'}
+        return _ok({'InstanceMonitorings': []})
+
+    def ec2_CreateTags(self, region, params):
+        for resource_id in params['Resources']:
+            instance = self.state[region]['instances'].get(resource_id)
+            if instance is not None:
+                instance['Tags'] = instance['Tags'] + params['Tags']
+        return _ok({})
+
+    def ec2_DescribeAddresses(self, region, params):
+        addresses = list(self.state[region]['addresses'].values())
+        for filter_ in params.get('Filters', []):
+            if filter_['Name'] == 'allocation-id':
+                addresses = [a for a in addresses if a['AllocationId'] in filter_['Values']]
+        return _ok({'Addresses': addresses})
+
+    def ec2_ReleaseAddress(self, region, params):
+        if self.state[region]['addresses'].pop(params['AllocationId'], None) is None:
+            return _error('InvalidAllocationID.NotFound')
+        return _ok({})
+
+    def ec2_DescribeVolumes(self, region, params):
+        volumes = list(self.state[region]['volumes'].values())
+        for filter_ in params.get('Filters', []):
+            if filter_['Name'] == 'status':
+                volumes = [v for v in volumes if v['State'] in filter_['Values']]
+            elif filter_['Name'] == 'volume-id':
+                volumes = [v for v in volumes if v['VolumeId'] in filter_['Values']]
+        chunk, next_token = _page(volumes, params)
+        return _ok({'Volumes': chunk, **({'NextToken': next_token} if next_token else {})})
+
+    def ec2_DeleteVolume(self, region, params):
+        if self.state[region]['volumes'].pop(params['VolumeId'], None) is None:
+            return _error('InvalidVolume.NotFound')
+        return _ok({})
+
+    # EKS
+
+    def eks_ListClusters(self, region, params):
+        chunk, next_token = _page(sorted(self.state[region]['eks']), params, 'nextToken', 'maxResults', 100)
+        return _ok({'clusters': chunk, **({'nextToken': next_token} if next_token else {})})
+
+    def eks_DescribeCluster(self, region, params):
+        if params['name'] not in self.state[region]['eks']:
+            return _error('ResourceNotFoundException', 404)
+        return _ok({'cluster': {'name': params['name'], 'status': 'ACTIVE'}})
+
+    def eks_ListNodegroups(self, region, params):
+        nodegroups = self.state[region]['eks'].get(params['clusterName'])
+        if nodegroups is None:
+            return _error('ResourceNotFoundException', 404)
+        chunk, next_token = _page(sorted(nodegroups), params, 'nextToken', 'maxResults', 100)
+        return _ok({'nodegroups': chunk, **({'nextToken': next_token} if next_token else {})})
+
+    def eks_DescribeNodegroup(self, region, params):
+        nodegroup = self.state[region]['eks'].get(params['clusterName'], {}).get(params['nodegroupName'])
+        if nodegroup is None:
+            return _error('ResourceNotFoundException', 404)
+        return _ok({'nodegroup': dict(nodegroup, clusterName=params['clusterName'],
+                                      nodegroupName=params['nodegroupName'])})
+
+    def eks_UpdateNodegroupConfig(self, region, params):
+        nodegroup = self.state[region]['eks'].get(params['clusterName'], {}).get(params['nodegroupName'])
+        if nodegroup is None:
+            return _error('ResourceNotFoundException', 404)
+        nodegroup['scalingConfig'] = dict(nodegroup['scalingConfig'], **params.get('scalingConfig', {}))
+        return _ok({'update': {'id': 'fake', 'status': 'Successful'}})
+
+    # ELB
+
+    def elb_DescribeLoadBalancers(self, region, params):
+        chunk, next_token = _page(list(self.state[region]['load_balancers'].values()), params,
+                                  'Marker', 'PageSize', 400)
+        return _ok({'LoadBalancerDescriptions': chunk, **({'NextMarker': next_token} if next_token else {})})
+
+    def elb_DescribeTags(self, region, params):
+        names = params['LoadBalancerNames']
+        if len(names) > 20:
+            return _error('ValidationError', message='At most 20 load balancer names')
+        tags = self.state[region]['load_balancer_tags']
+        return _ok({'TagDescriptions': [{'LoadBalancerName': name, 'Tags': tags[name]}
+                                        for name in names if name in tags]})
+
+    def elb_DeleteLoadBalancer(self, region, params):
+        self.state[region]['load_balancers'].pop(params['LoadBalancerName'], None)
+        return _ok({})
+
+    # RDS
+
+    def _rds_filtered(self, items, params, id_key, filter_name):
+        items = list(items)
+        for filter_ in params.get('Filters', []):
+            if filter_['Name'] == filter_name:
+                items = [item for item in items if item[id_key] in filter_['Values']]
+        return _page(items, params, 'Marker', 'MaxRecords', 100)
+
+    def rds_DescribeDBClusters(self, region, params):
+        chunk, marker = self._rds_filtered(self.state[region]['db_clusters'].values(), params,
+                                           'DBClusterIdentifier', 'db-cluster-id')
+        return _ok({'DBClusters': chunk, **({'Marker': marker} if marker else {})})
+
+    def rds_DescribeDBInstances(self, region, params):
+        chunk, marker = self._rds_filtered(self.state[region]['db_instances'].values(), params,
+                                           'DBInstanceIdentifier', 'db-instance-id')
+        return _ok({'DBInstances': chunk, **({'Marker': marker} if marker else {})})
+
+    def rds_StopDBCluster(self, region, params):
+        cluster = self.state[region]['db_clusters'].get(params['DBClusterIdentifier'])
+        if cluster is None:
+            return _error('DBClusterNotFoundFault', 404)
+        cluster['Status'] = 'stopped'
+        return _ok({'DBCluster': cluster})
+
+    def rds_StopDBInstance(self, region, params):
+        instance = self.state[region]['db_instances'].get(params['DBInstanceIdentifier'])
+        if instance is None:
+            return _error('DBInstanceNotFound', 404)
+        if 'DBClusterIdentifier' in instance:
+            return _error('InvalidDBInstanceState', message='Aurora members are stopped with their cluster')
+        instance['DBInstanceStatus'] = 'stopped'
+        return _ok({'DBInstance': instance})
+
+    # Kinesis
+
+    def kinesis_ListStreams(self, region, params):
+        chunk, next_token = _page(self.state[region]['streams'], params, 'NextToken', 'Limit', 100)
+        return _ok({'StreamNames': chunk, 'HasMoreStreams': next_token is not None,
+                    **({'NextToken': next_token} if next_token else {})})
+
+    def kinesis_DeleteStream(self, region, params):
+        streams = self.state[region]['streams']
+        if params['StreamName'] not in streams:
+            return _error('ResourceNotFoundException')
+        streams.remove(params['StreamName'])
+        return _ok({})
+
+    # MSK
+
+    def kafka_ListClusters(self, region, params):
+        chunk, next_token = _page(list(self.state[region]['msk'].values()), params, 'NextToken', 'MaxResults', 10)
+        return _ok({'ClusterInfoList': chunk, **({'NextToken': next_token} if next_token else {})})
+
+    def kafka_DeleteCluster(self, region, params):
+        cluster = self.state[region]['msk'].get(params['ClusterArn'])
+        if cluster is None:
+            return _error('NotFoundException', 404)
+        cluster['State'] = 'DELETING'
+        return _ok({'ClusterArn': params['ClusterArn'], 'State': 'DELETING'})
+
+    # OpenSearch
+
+    def opensearch_ListDomainNames(self, region, params):
+        return _ok({'DomainNames': [{'DomainName': name, 'EngineType': 'OpenSearch'}
+                                    for name in self.state[region]['domains']]})
+
+    def _domain_status(self, region, name):
+        domain = self.state[region]['domains'][name]
+        return {'DomainName': name, 'DomainId': f'123456789012/{name}',
+                'ARN': f'arn:aws:es:{region}:123456789012:domain/{name}', **domain}
+
+    def opensearch_DescribeDomain(self, region, params):
+        if params['DomainName'] not in self.state[region]['domains']:
+            return _error('ResourceNotFoundException', 409)
+        return _ok({'DomainStatus': self._domain_status(region, params['DomainName'])})
+
+    def opensearch_DescribeDomains(self, region, params):
+        names = params['DomainNames']
+        if len(names) > 5:
+            return _error('ValidationException', message='At most 5 domain names')
+        return _ok({'DomainStatusList': [self._domain_status(region, name) for name in names
+                                         if name in self.state[region]['domains']]})
+
+    def opensearch_DeleteDomain(self, region, params):
+        domain = self.state[region]['domains'].get(params['DomainName'])
+        if domain is None:
+            return _error('ResourceNotFoundException', 409)
+        domain['Deleted'] = True
+        return _ok({'DomainStatus': self._domain_status(region, params['DomainName'])})
+
+    # Config
+
+    def config_GetDiscoveredResourceCounts(self, region, params):
+        return _ok({'totalDiscoveredResources': len(self.state[region]['instances'])})
+
+    def _instance_creation_results(self, regions):
+        results = []
+        for region in regions:
+            for k, instance in enumerate(self.state[region]['instances'].values()):
+                # A tenth of the instances are unknown to the bulk query
+                if k % 10 != 3:
+                    results.append(json.dumps({'resourceId': instance['InstanceId'], 'awsRegion': region,
+                                               'resourceCreationTime': instance['LaunchTime'].isoformat()}))
+        return results
+
+    def config_SelectResourceConfig(self, region, params):
+        chunk, next_token = _page(self._instance_creation_results([region]), params, 'NextToken', 'Limit', 100)
+        return _ok({'Results': chunk, **({'NextToken': next_token} if next_token else {})})
+
+    def config_SelectAggregateResourceConfig(self, region, params):
+        chunk, next_token = _page(self._instance_creation_results(list(self.state)), params,
+                                  'NextToken', 'Limit', 100)
+        return _ok({'Results': chunk, **({'NextToken': next_token} if next_token else {})})
+
+    def config_GetResourceConfigHistory(self, region, params):
+        instance = self.state[region]['instances'].get(params['resourceId'])
+        if instance is None:
+            return _ok({'configurationItems': []})
+        return _ok({'configurationItems': [{'resourceId': params['resourceId'],
+                                            'resourceCreationTime': instance['LaunchTime']}]})
+
+    # Resource Groups Tagging API (TagFilters assumed to be the protection tag)
+
+    def resourcegroupstaggingapi_GetResources(self, region, params):
+        state = self.state[region]
+        prefix = f'arn:aws:{{}}:{region}:123456789012:'
+        arns = [prefix.format('ec2') + f'instance/{instance_id}' for instance_id, instance in state['instances'].items()
+                if KEEP_TAG in instance['Tags']]
+        arns += [prefix.format('ec2') + f'volume/{volume_id}' for volume_id, volume in state['volumes'].items()
+                 if KEEP_TAG in volume['Tags']]
+        arns += [prefix.format('ec2') + f'elastic-ip/{allocation_id}'
+                 for allocation_id, address in state['addresses'].items() if KEEP_TAG in address['Tags']]
+        arns += [prefix.format('elasticloadbalancing') + f'loadbalancer/{name}'
+                 for name, tags in state['load_balancer_tags'].items() if KEEP_TAG in tags]
+        arns += [arn for arn, cluster in state['msk'].items() if cluster['Tags']]
+        chunk, next_token = _page(arns, params, 'PaginationToken', 'ResourcesPerPage', 100)
+        return _ok({'ResourceTagMappingList': [{'ResourceARN': arn, 'Tags': [KEEP_TAG]} for arn in chunk],
+                    'PaginationToken': next_token or ''})
+
+    # Resource Explorer (every seeded region has an index, aggregated in any region)
+
+    def resource_explorer_2_ListIndexes(self, region, params):
+        return _ok({'Indexes': [{'Region': name, 'Type': 'AGGREGATOR' if name == region else 'LOCAL',
+                                 'Arn': f'arn:aws:resource-explorer-2:{name}:123456789012:index/fake'}
+                                for name in self.state]})
+
+    def resource_explorer_2_Search(self, region, params):
+        terms = params['QueryString'].split()
+        kind = RESOURCE_EXPLORER_TYPES.get(next(t for t in terms if t.startswith('resourcetype:')).split(':', 1)[1])
+        excluded = {term.split(':', 1)[1] for term in terms if term.startswith('-region:')}
+        resources = [{'Region': name, 'ResourceType': kind}
+                     for name, state in self.state.items() if name not in excluded and kind
+                     for _ in state[kind]]
+        limit = params.get('MaxResults') or 1000
+        return _ok({'Resources': resources[:limit],
+                    'Count': {'TotalResources': min(len(resources), limit), 'Complete': len(resources) <= limit}})
+
+    # SES / STS
+
+    def ses_GetIdentityVerificationAttributes(self, region, params):
+        return _ok({'VerificationAttributes': {identity: {'VerificationStatus': 'Success'}
+                                               for identity in params['Identities']}})
+
+    def ses_SendEmail(self, region, params):
+        return _ok({'MessageId': 'fake'})
+
+    def ses_SendRawEmail(self, region, params):
+        return _ok({'MessageId': 'fake'})
+
+    def sts_GetCallerIdentity(self, region, params):
+        return _ok({'Account': '123456789012', 'Arn': 'arn:aws:iam::123456789012:user/bench', 'UserId': 'bench'})
+
+    def resource_counts(self) -> Dict[str, int]:
+        """Number of seeded resources per kind, over all regions"""
+        totals: Dict[str, int] = collections.Counter()
+        for state in self.state.values():
+            for kind, resources in state.items():
+                if kind == 'eks':
+                    totals['eks_clusters'] += len(resources)
+                    totals['nodegroups'] += sum(len(nodegroups) for nodegroups in resources.values())
+                elif kind != 'load_balancer_tags':
+                    totals[kind] += len(resources)
+        return dict(totals)
+
+
+def parse_counts(value: Optional[str], scale: float = 1.0) -> Dict[str, int]:
+    """Build the per-region resource counts from a scale factor and "kind=count" overrides
+
+    :param value: Overrides, e.g. "instances=5000,volumes=0" (may be empty)
+    :param scale: Multiplier applied to DEFAULT_COUNTS
+    :return: Dict of resource kind to count
+    :raises: ValueError if a kind is unknown or a count is not a non-negative integer
+    """
+    counts = {kind: int(count * scale) for kind, count in DEFAULT_COUNTS.items()}
+    for entry in (value or '').split(','):
+        entry = entry.strip()
+        if not entry:
+            continue
+        kind, sep, count = entry.partition('=')
+        if not sep or kind.strip() not in DEFAULT_COUNTS or not count.strip().isdigit():
+            raise ValueError(f"Invalid count '{entry}', expected '<kind>=<count>' with kind one of "
+                             f"{', '.join(DEFAULT_COUNTS)}")
+        counts[kind.strip()] = int(count)
+    return counts
@@ -0,0 +1,96 @@
+"""Measure the import time of the Lambda module and check it against a budget.
+
+Runs `python -X importtime -c "import index"` in fresh subprocesses (the best of
+--repeat runs counts, since the first one also warms the file system cache) and
+reports the cumulative time of the Lambda module and its slowest imports. Exits
+with status 1 when the import takes longer than --budget-ms.
+
+Examples:
+    python import_time.py
+    python import_time.py --budget-ms 300 --top 20 --output import.json
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+BENCHMARK_DIR = os.path.dirname(os.path.abspath(__file__))
+FILES_DIR = os.path.join(os.path.dirname(BENCHMARK_DIR), 'files')
+# The import measures about 150 ms, most of it boto3; the rest of the budget absorbs machine noise
+DEFAULT_BUDGET_MS = 250
+MODULE = 'index'
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--budget-ms', type=float, default=DEFAULT_BUDGET_MS,
+                        help=f'maximum import time of the Lambda module (default: {DEFAULT_BUDGET_MS})')
+    parser.add_argument('--repeat', type=int, default=3, help='number of measured imports (default: 3)')
+    parser.add_argument('--top', type=int, default=10, help='number of slowest imports listed (default: 10)')
+    parser.add_argument('--output', help='write the JSON results to this file instead of stdout')
+    return parser
+
+
+def parse_importtime(stderr: str) -> dict:
+    """Get the cumulative import time in microseconds of every top-level entry of -X importtime output"""
+    timings = {}
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative, name = line[len('import time:'):].split('|')
+        timings[name.strip()] = max(timings.get(name.strip(), 0), int(cumulative))
+    return timings
+
+
+def measure_once() -> dict:
+    env = {key: value for key, value in os.environ.items() if key in ('PATH', 'HOME')}
+    env.update({
+        'AWS_ACCESS_KEY_ID': 'benchmark',
+        'AWS_SECRET_ACCESS_KEY': 'benchmark',
+        'AWS_DEFAULT_REGION': 'us-east-1',
+        'EMAIL_IDENTITY': 'finops@example.com',
+        'TO_ADDRESS': 'finops@example.com',
+        'PYTHONPATH': FILES_DIR,
+    })
+    completed = subprocess.run([sys.executable, '-X', 'importtime', '-c', f'import {MODULE}'],
+                               env=env, capture_output=True, text=True)
+    if completed.returncode != 0:
+        raise RuntimeError(f'Importing {MODULE} failed:\n{completed.stderr}')
+    return parse_importtime(completed.stderr)
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+
+    runs = [measure_once() for _ in range(max(1, args.repeat))]
+    best = min(runs, key=lambda timings: timings[MODULE])
+    import_ms = best[MODULE] / 1000
+    slowest = sorted(((name, us) for name, us in best.items() if name != MODULE),
+                     key=lambda item: item[1], reverse=True)[:args.top]
+
+    results = {
+        'module': MODULE,
+        'import_ms': round(import_ms, 2),
+        'runs_ms': [round(timings[MODULE] / 1000, 2) for timings in runs],
+        'budget_ms': args.budget_ms,
+        'within_budget': import_ms <= args.budget_ms,
+        'slowest_imports': [{'module': name, 'cumulative_ms': round(us / 1000, 2)} for name, us in slowest],
+    }
+    print(f'{MODULE}: {import_ms:.1f} ms (budget {args.budget_ms:.0f} ms)', file=sys.stderr)
+    for name, us in slowest:
+        print(f'  {name:<40} {us / 1000:>9.1f} ms', file=sys.stderr)
+
+    document = json.dumps(results, indent=2)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(document + '\n')
+    else:
+        print(document)
+    if not results['within_budget']:
+        print(f'{MODULE} import time exceeds the budget of {args.budget_ms:.0f} ms', file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
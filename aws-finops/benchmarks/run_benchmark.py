@@ -0,0 +1,222 @@
+"""Benchmark the cleanup phases and lambda_handler against the in-process fake AWS backend.
+
+Each target (one cleanup phase, or the whole handler) runs in its own subprocess so
+module-level configuration, client caches and peak RSS start fresh. Results are
+written as one JSON document; pass a previous document with --baseline to print the
+relative change of every metric.
+
+Examples:
+    python run_benchmark.py --regions 4 --scale 5 --output bench.json
+    python run_benchmark.py --targets handler --latency-ms 20 --throttle-rate 0.05
+    MAX_WORKERS=20 python run_benchmark.py --baseline bench.json
+"""
+import argparse
+import datetime
+import json
+import logging
+import os
+import platform
+import resource
+import subprocess
+import sys
+import time
+
+BENCHMARK_DIR = os.path.dirname(os.path.abspath(__file__))
+FILES_DIR = os.path.join(os.path.dirname(BENCHMARK_DIR), 'files')
+SCHEMA_VERSION = 1
+HANDLER = 'handler'
+ALL_REGIONS = ['us-east-1', 'us-east-2', 'us-west-1', 'us-west-2', 'eu-north-1', 'eu-central-1', 'eu-west-1',
+               'eu-west-2', 'eu-west-3', 'ap-south-1', 'ap-northeast-1', 'ap-southeast-1', 'ap-southeast-2',
+               'ca-central-1', 'sa-east-1']
+# Settings of the Lambda that are passed through to the workers when set
+PASSTHROUGH_ENV = ['MAX_WORKERS', 'SERVICE_CONCURRENCY', 'RATE_LIMITS', 'VERIFY_MUTATIONS', 'VERIFY_TIMEOUT_SECONDS',
+                   'CONFIG_AGGREGATOR_NAME', 'BOTO_RETRY_MODE', 'BOTO_MAX_ATTEMPTS', 'SAFETY_MARGIN_SECONDS',
+                   'RESOURCE_EXPLORER_REGION', 'PLAN_STORE', 'APPLY_PLAN']
+COMPARED_METRICS = ['wall_seconds', 'api_calls_total', 'throttled_calls', 'peak_rss_kb', 'tracker_bytes']
+
+
+def parse_regions(value: str):
+    if value.isdigit():
+        count = int(value)
+        if not 1 <= count <= len(ALL_REGIONS):
+            raise argparse.ArgumentTypeError(f'region count must be between 1 and {len(ALL_REGIONS)}')
+        return ALL_REGIONS[:count]
+    return [region.strip() for region in value.split(',') if region.strip()]
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--regions', type=parse_regions, default=ALL_REGIONS[:2],
+                        help='number of regions, or a comma-separated list (default: 2)')
+    parser.add_argument('--scale', type=float, default=1.0, help='multiplier of the default resource counts')
+    parser.add_argument('--counts', default='', help='per-region count overrides, e.g. "instances=5000,volumes=0"')
+    parser.add_argument('--latency-ms', type=float, default=0.0, help='latency of every API call')
+    parser.add_argument('--throttle-rate', type=float, default=0.0, help='share of API calls throttled (0-1)')
+    parser.add_argument('--seed', type=int, default=0, help='seed of the throttling decisions')
+    parser.add_argument('--dry-run', choices=['true', 'false'], default='false', help='DRY_RUN of the Lambda')
+    parser.add_argument('--targets', default='',
+                        help=f'comma-separated cleanup phases and/or "{HANDLER}" (default: every phase and the handler)')
+    parser.add_argument('--output', help='write the JSON results to this file instead of stdout')
+    parser.add_argument('--baseline', help='JSON results of a previous run to compare against')
+    parser.add_argument('--log-level', default='WARNING', help='log level of the Lambda code')
+    parser.add_argument('--worker', help=argparse.SUPPRESS)
+    return parser
+
+
+def peak_rss_kb() -> int:
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in kilobytes on Linux and in bytes on macOS
+    return peak // 1024 if sys.platform == 'darwin' else peak
+
+
+def run_worker(args) -> dict:
+    """Run one target in this process and return its metrics"""
+    sys.path.insert(0, FILES_DIR)
+    sys.path.insert(0, BENCHMARK_DIR)
+    from fake_aws import FakeAws, FakeConfig, parse_counts
+
+    fake = FakeAws(FakeConfig(args.regions, parse_counts(args.counts, args.scale), args.latency_ms / 1000,
+                              args.throttle_rate, seed=args.seed)).install()
+    seeded = fake.resource_counts()
+
+    import index
+    logging.getLogger().setLevel(args.log_level)
+
+    runs = []
+    init = index.RunContext.__init__
+
+    def capture(self, *init_args, **init_kwargs):
+        init(self, *init_args, **init_kwargs)
+        runs.append(self)
+
+    index.RunContext.__init__ = capture
+
+    class LambdaContext:
+        @staticmethod
+        def get_remaining_time_in_millis():
+            return 15 * 60 * 1000
+
+    start = time.perf_counter()
+    if args.worker == HANDLER:
+        response = index.lambda_handler({}, LambdaContext())
+        if response['statusCode'] != 200:
+            raise RuntimeError(f'lambda_handler failed: {response["body"]}')
+    else:
+        index.run_phases([args.worker], args.regions, index.RunContext())
+    wall_seconds = time.perf_counter() - start
+
+    tracker = runs[0].tracker
+    return {
+        'target': args.worker,
+        'wall_seconds': round(wall_seconds, 4),
+        'api_calls_total': sum(fake.calls.values()),
+        'api_calls': dict(sorted(fake.calls.items())),
+        'throttled_calls': sum(fake.throttles.values()),
+        'peak_rss_kb': peak_rss_kb(),
+        'tracker_records': len(tracker),
+        'tracker_bytes': tracker.nbytes,
+        'outcomes': {name: summary['total'] for name, summary in tracker.summary().items()},
+        'seeded_resources': seeded,
+    }
+
+
+def run_target(target: str, args, argv) -> dict:
+    env = {key: value for key, value in os.environ.items() if key in PASSTHROUGH_ENV or key in ('PATH', 'HOME')}
+    env.update({
+        'AWS_ACCESS_KEY_ID': 'benchmark',
+        'AWS_SECRET_ACCESS_KEY': 'benchmark',
+        'AWS_DEFAULT_REGION': 'us-east-1',
+        'AWS_REGION': 'us-east-1',
+        'EMAIL_IDENTITY': 'finops@example.com',
+        'TO_ADDRESS': 'finops@example.com',
+        'DRY_RUN': args.dry_run,
+        'REGIONS': ','.join(args.regions),
+        'CHECK_ALL_REGIONS': 'false',
+    })
+    completed = subprocess.run([sys.executable, os.path.abspath(__file__), *argv, '--worker', target],
+                               env=env, capture_output=True, text=True)
+    if completed.returncode != 0:
+        raise RuntimeError(f'Benchmark of {target} failed:\n{completed.stderr}')
+    return json.loads(completed.stdout.strip().splitlines()[-1])
+
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', 'HEAD'], cwd=BENCHMARK_DIR, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(results: dict, baseline: dict):
+    """Print the relative change of each metric against a baseline run to stderr"""
+    previous = {result['target']: result for result in baseline.get('results', [])}
+    print(f'{"target":<20}' + ''.join(f'{metric:>18}' for metric in COMPARED_METRICS), file=sys.stderr)
+    for result in results['results']:
+        before = previous.get(result['target'])
+        if before is None:
+            continue
+        cells = []
+        for metric in COMPARED_METRICS:
+            old, new = before.get(metric), result.get(metric)
+            if not old or new is None:
+                cells.append(f'{"-":>18}')
+            else:
+                cells.append(f'{(new - old) / old:>+17.1%} ')
+        print(f'{result["target"]:<20}' + ''.join(cells), file=sys.stderr)
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    args = build_parser().parse_args(argv)
+
+    if args.worker:
+        print(json.dumps(run_worker(args)))
+        return
+
+    sys.path.insert(0, BENCHMARK_DIR)
+    from fake_aws import parse_counts
+    counts = parse_counts(args.counts, args.scale)
+    phase_names = ['ec2-instance', 'ec2-tagging', 'ec2-monitoring', 'eip', 'ebs-volume', 'classic-elb', 'rds',
+                   'eks-nodegroup', 'kinesis-stream', 'msk-cluster', 'opensearch-domain']
+    targets = [target.strip() for target in args.targets.split(',') if target.strip()] or phase_names + [HANDLER]
+    unknown = set(targets) - set(phase_names) - {HANDLER}
+    if unknown:
+        build_parser().error(f'unknown targets: {", ".join(sorted(unknown))}')
+
+    results = {
+        'schema': SCHEMA_VERSION,
+        'created_at': datetime.datetime.now(datetime.timezone.utc).isoformat(),
+        'git_commit': git_commit(),
+        'python': platform.python_version(),
+        'config': {
+            'regions': args.regions,
+            'counts_per_region': counts,
+            'latency_ms': args.latency_ms,
+            'throttle_rate': args.throttle_rate,
+            'seed': args.seed,
+            'dry_run': args.dry_run == 'true',
+            'env': {key: os.environ[key] for key in PASSTHROUGH_ENV if key in os.environ},
+        },
+        'results': [],
+    }
+    for target in targets:
+        result = run_target(target, args, argv)
+        print(f'{target:<20} {result["wall_seconds"]:>9.3f}s {result["api_calls_total"]:>8} calls '
+              f'{result["peak_rss_kb"] / 1024:>8.1f} MiB  {result["tracker_records"]:>8} records', file=sys.stderr)
+        results['results'].append(result)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            compare(results, json.load(f))
+
+    document = json.dumps(results, indent=2)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(document + '\n')
+    else:
+        print(document)
+
+
+if __name__ == '__main__':
+    main()
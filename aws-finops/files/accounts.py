@@ -0,0 +1,163 @@
+import logging
+import re
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+from botocore.credentials import RefreshableCredentials
+
+from aws_clients import get_client
+from settings import DEFAULT_ROLE_NAME
+
+logger = logging.getLogger()
+
+ROLE_SESSION_NAME = 'finops-cleanup'
+ROLE_SESSION_DURATION = 3600
+ORGANIZATION = 'organization'
+# Roles assumed at once when resolving the target accounts
+ASSUME_ROLE_WORKERS = 10
+
+_ACCOUNT_ID = re.compile(r'^\d{12}$')
+_ROLE_ARN = re.compile(r'^arn:aws[\w-]*:iam::(\d{12}):role/.+$')
+
+
+class AccountCredentials(RefreshableCredentials):
+    """Assumed-role credentials that remember the account they belong to."""
+    account_id: Optional[str] = None
+
+
+class Account(NamedTuple):
+    """A target account: its id, the role to assume (None to use the Lambda's own
+    credentials) and the credentials to pass to get_client."""
+    account_id: str
+    role_arn: Optional[str]
+    credentials: Optional[AccountCredentials]
+
+
+# Credentials are cached per role for the lifetime of the container and refresh
+# themselves before they expire, so warm invocations do not call AssumeRole again.
+# _lock only guards the two dicts; AssumeRole runs under the lock of its role, so
+# different roles are assumed concurrently and each role only once.
+_lock = threading.Lock()
+_credentials: Dict[str, AccountCredentials] = {}
+_role_locks: Dict[str, threading.Lock] = {}
+
+
+def parse_accounts(value: Optional[str], role_name: str = DEFAULT_ROLE_NAME) -> List[str]:
+    """Parse a comma-separated list of account ids and role ARNs into role ARNs
+
+    :param value: Raw string (e.g. "111111111111,arn:aws:iam::222222222222:role/Cleanup")
+    :param role_name: Role assumed in accounts given by id
+    :return: List of role ARNs
+    :raises: ValueError if an entry is neither an account id nor a role ARN
+    """
+    role_arns = []
+    for entry in (value or '').split(','):
+        entry = entry.strip()
+        if not entry:
+            continue
+        if _ACCOUNT_ID.match(entry):
+            role_arns.append(f'arn:aws:iam::{entry}:role/{role_name}')
+        elif _ROLE_ARN.match(entry):
+            role_arns.append(entry)
+        else:
+            raise ValueError(f"Invalid account entry '{entry}', expected a 12-digit account id or a role ARN")
+    return role_arns
+
+
+def list_organization_accounts(role_name: str = DEFAULT_ROLE_NAME) -> List[str]:
+    """List the active accounts of the organization as role ARNs
+
+    :param role_name: Role assumed in each account
+    :return: List of role ARNs
+    """
+    organizations = get_client('organizations')
+    role_arns = []
+    paginator = organizations.get_paginator('list_accounts')
+    for page in paginator.paginate():
+        for account in page.get('Accounts', []):
+            if account.get('Status') == 'ACTIVE':
+                role_arns.append(f'arn:aws:iam::{account["Id"]}:role/{role_name}')
+    logger.info(f'Found {len(role_arns)} active accounts in the organization')
+    return role_arns
+
+
+def assume_role_credentials(role_arn: str) -> AccountCredentials:
+    """Get auto-refreshing credentials for a role, assuming it on first use
+
+    :param role_arn: ARN of the role to assume
+    :return: AccountCredentials
+    :raises: ClientError if the role cannot be assumed
+    """
+    with _lock:
+        credentials = _credentials.get(role_arn)
+        if credentials is not None:
+            return credentials
+        role_lock = _role_locks.setdefault(role_arn, threading.Lock())
+
+    with role_lock:
+        # Another thread may have assumed the role while this one waited
+        with _lock:
+            credentials = _credentials.get(role_arn)
+        if credentials is not None:
+            return credentials
+
+        sts = get_client('sts')
+
+        def refresh():
+            response = sts.assume_role(RoleArn=role_arn, RoleSessionName=ROLE_SESSION_NAME,
+                                       DurationSeconds=ROLE_SESSION_DURATION)
+            assumed = response['Credentials']
+            return {
+                'access_key': assumed['AccessKeyId'],
+                'secret_key': assumed['SecretAccessKey'],
+                'token': assumed['SessionToken'],
+                'expiry_time': assumed['Expiration'].isoformat(),
+            }
+
+        credentials = AccountCredentials.create_from_metadata(
+            metadata=refresh(), refresh_using=refresh, method='sts-assume-role')
+        credentials.account_id = _ROLE_ARN.match(role_arn).group(1)
+        with _lock:
+            _credentials[role_arn] = credentials
+        return credentials
+
+
+def resolve_accounts(value: Optional[str], role_name: str = DEFAULT_ROLE_NAME) -> Tuple[List[Account], List[str]]:
+    """Build the target accounts of an organization-mode run
+
+    The account the Lambda runs in is cleaned with its own credentials; the roles of the
+    others are assumed concurrently, and those that cannot be assumed are logged and
+    left out.
+
+    :param value: ACCOUNTS setting: account ids / role ARNs, or "organization"
+    :param role_name: Role assumed in accounts given by id or listed from Organizations
+    :return: Tuple of (accounts to clean, ids of accounts whose role could not be assumed);
+             both empty when organization mode is off
+    """
+    if not value:
+        return [], []
+    if value.strip().lower() == ORGANIZATION:
+        role_arns = list_organization_accounts(role_name)
+    else:
+        role_arns = parse_accounts(value, role_name)
+
+    own_account = get_client('sts').get_caller_identity()['Account']
+    role_arns = list(dict.fromkeys(role_arns))
+    with ThreadPoolExecutor(max_workers=ASSUME_ROLE_WORKERS) as executor:
+        futures = {role_arn: executor.submit(assume_role_credentials, role_arn) for role_arn in role_arns
+                   if _ROLE_ARN.match(role_arn).group(1) != own_account}
+
+    accounts = []
+    unreachable = []
+    for role_arn in role_arns:
+        account_id = _ROLE_ARN.match(role_arn).group(1)
+        if account_id == own_account:
+            accounts.append(Account(account_id, None, None))
+            continue
+        try:
+            accounts.append(Account(account_id, role_arn, futures[role_arn].result()))
+        except Exception as e:
+            logger.error(f'Error assuming role {role_arn}, skipping account {account_id}: {str(e)}')
+            unreachable.append(account_id)
+    return accounts, unreachable
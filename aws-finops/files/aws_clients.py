@@ -0,0 +1,144 @@
+import logging
+import threading
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import boto3
+import botocore.session
+from botocore.config import Config
+from botocore.credentials import CredentialProvider, CredentialResolver
+
+logger = logging.getLogger()
+
+DEFAULT_MAX_POOL_CONNECTIONS = 10
+DEFAULT_CONNECT_TIMEOUT = 5
+DEFAULT_READ_TIMEOUT = 60
+DEFAULT_MAX_ATTEMPTS = 3
+DEFAULT_RETRY_MODE = 'standard'
+RETRY_MODES = ('legacy', 'standard', 'adaptive')
+
+# Clients and sessions live at module scope so they survive warm Lambda invocations.
+# botocore clients are thread-safe once created, but creating them is not, so creation
+# happens under a lock.
+_lock = threading.Lock()
+_clients: Dict[Tuple[str, Optional[str], Any], Any] = {}
+_sessions: Dict[Any, boto3.Session] = {}
+# Session of the default credential chain, created on first use
+_default_session: Optional[boto3.Session] = None
+_options: Dict[str, Any] = dict(max_pool_connections=DEFAULT_MAX_POOL_CONNECTIONS,
+                                connect_timeout=DEFAULT_CONNECT_TIMEOUT, read_timeout=DEFAULT_READ_TIMEOUT,
+                                max_attempts=DEFAULT_MAX_ATTEMPTS, retry_mode=DEFAULT_RETRY_MODE)
+# Callables (client, service, region, account_id) run on every new client, e.g. to register
+# event handlers
+_client_hooks: List[Callable[[Any, str, Optional[str], Optional[str]], None]] = []
+
+
+def _client_config() -> Config:
+    return Config(
+        max_pool_connections=_options['max_pool_connections'],
+        connect_timeout=_options['connect_timeout'],
+        read_timeout=_options['read_timeout'],
+        retries={'mode': _options['retry_mode'], 'total_max_attempts': _options['max_attempts']},
+    )
+
+
+def configure_clients(max_pool_connections: int = DEFAULT_MAX_POOL_CONNECTIONS,
+                      connect_timeout: float = DEFAULT_CONNECT_TIMEOUT, read_timeout: float = DEFAULT_READ_TIMEOUT,
+                      max_attempts: int = DEFAULT_MAX_ATTEMPTS, retry_mode: str = DEFAULT_RETRY_MODE):
+    """Set the botocore configuration of every client
+
+    Cached clients built with other options are dropped so they get rebuilt on next use.
+
+    :param max_pool_connections: Number of connections each client may keep open; size it to the
+                                 number of concurrent workers
+    :param connect_timeout: Seconds to wait for a connection
+    :param read_timeout: Seconds to wait for a response
+    :param max_attempts: Attempts botocore makes per call, retries included
+    :param retry_mode: botocore retry mode, one of RETRY_MODES
+    """
+    options = dict(max_pool_connections=max_pool_connections, connect_timeout=connect_timeout,
+                   read_timeout=read_timeout, max_attempts=max_attempts, retry_mode=retry_mode)
+    with _lock:
+        if options == _options:
+            return
+        _options.update(options)
+        _clients.clear()
+
+
+def _account_id(credentials) -> Optional[str]:
+    """Account the credentials belong to, if known (see accounts.AccountCredentials)"""
+    return getattr(credentials, 'account_id', None)
+
+
+def register_client_hook(hook: Callable[[Any, str, Optional[str], Optional[str]], None]):
+    """Run `hook(client, service, region, account_id)` on every client, including already cached ones
+
+    :param hook: Callable receiving the client, its service name, its region and the account
+                 of its credentials (None for the default credentials)
+    """
+    with _lock:
+        _client_hooks.append(hook)
+        for (service, region_name, credentials), client in _clients.items():
+            hook(client, service, region_name, _account_id(credentials))
+
+
+class _FixedCredentialProvider(CredentialProvider):
+    """Credential provider handing out one set of (possibly auto-refreshing) credentials"""
+    METHOD = 'assume-role'
+
+    def __init__(self, credentials):
+        super().__init__()
+        self.credentials = credentials
+
+    def load(self):
+        return self.credentials
+
+
+def _session_for(credentials) -> boto3.Session:
+    """Get the (cached) session for a set of credentials, None meaning the default credential chain"""
+    global _default_session
+    if credentials is None:
+        if _default_session is None:
+            _default_session = boto3.Session()
+        return _default_session
+
+    session = _sessions.get(credentials)
+    if session is None:
+        # Unlike Session(aws_access_key_id=...), a credential provider keeps refreshable credentials refreshing
+        core_session = botocore.session.Session()
+        core_session.register_component('credential_provider',
+                                        CredentialResolver([_FixedCredentialProvider(credentials)]))
+        session = boto3.Session(botocore_session=core_session)
+        _sessions[credentials] = session
+    return session
+
+
+def get_client(service: str, region_name: Optional[str] = None, credentials=None):
+    """Get a shared boto3 client, creating it on first use
+
+    :param service: AWS service name (e.g. 'ec2')
+    :param region_name: AWS region name, None for the default region
+    :param credentials: botocore Credentials to use, None for the default credential chain
+    :return: boto3 client
+    """
+    key = (service, region_name, credentials)
+    client = _clients.get(key)
+    if client is not None:
+        return client
+
+    with _lock:
+        client = _clients.get(key)
+        if client is None:
+            client = _session_for(credentials).client(service, region_name=region_name, config=_client_config())
+            for hook in _client_hooks:
+                hook(client, service, region_name, _account_id(credentials))
+            _clients[key] = client
+    return client
+
+
+def clear_clients():
+    """Drop all cached clients and sessions"""
+    global _default_session
+    with _lock:
+        _clients.clear()
+        _sessions.clear()
+        _default_session = None
@@ -0,0 +1,88 @@
+import logging
+from collections import defaultdict
+from typing import Callable, Dict, Iterable, Iterator, List, Sequence, Tuple
+
+from botocore.exceptions import ClientError
+
+logger = logging.getLogger()
+
+# StopInstances/UnmonitorInstances have no documented ID limit, but large requests
+# fail as a whole on a single bad ID; keep batches small enough to bisect cheaply.
+EC2_MUTATION_BATCH_SIZE = 100
+# Classic ELB DescribeTags accepts up to 20 load balancer names per call.
+ELB_DESCRIBE_TAGS_BATCH_SIZE = 20
+# CreateTags accepts up to 1000 resource IDs, AWS recommends smaller batches.
+CREATE_TAGS_BATCH_SIZE = 500
+# OpenSearch DescribeDomains accepts up to 5 domain names per call.
+OPENSEARCH_DESCRIBE_BATCH_SIZE = 5
+
+# Errors that apply to the whole request rather than to individual IDs. Bisecting
+# a batch that failed with one of these would only multiply the failing calls.
+WHOLE_BATCH_ERRORS = {
+    'AccessDenied',
+    'AccessDeniedException',
+    'UnauthorizedOperation',
+    'RequestLimitExceeded',
+    'Throttling',
+    'ThrottlingException',
+}
+
+
+def chunked(items: Sequence, size: int) -> Iterator[List]:
+    """Split a sequence into lists of at most `size` items
+
+    :param items: Items to split
+    :param size: Maximum chunk size
+    """
+    for start in range(0, len(items), size):
+        yield list(items[start:start + size])
+
+
+def group_by_value(pairs: Iterable[Tuple[str, str]]) -> Dict[str, List[str]]:
+    """Group (resource_id, value) pairs into value -> [resource_id, ...]
+
+    :param pairs: Iterable of (resource_id, value) tuples
+    :return: Dict of value to resource ids sharing it
+    """
+    groups = defaultdict(list)
+    for resource_id, value in pairs:
+        groups[value].append(resource_id)
+    return dict(groups)
+
+
+def apply_in_batches(call: Callable[[List[str]], None], resource_ids: Sequence[str], batch_size: int,
+                     on_success: Callable[[List[str]], None],
+                     on_failure: Callable[[str, Exception], None]):
+    """Apply a multi-resource mutation in chunks, bisecting chunks that fail
+
+    When a chunk fails with a per-resource error it is split in halves which are retried
+    independently, so only the offending IDs end up reported through `on_failure`.
+
+    :param call: Function issuing the API call for a list of resource ids
+    :param resource_ids: Resource ids to mutate
+    :param batch_size: Maximum number of ids per call
+    :param on_success: Called with each list of ids that was mutated successfully
+    :param on_failure: Called with (resource_id, exception) for each id that failed
+    """
+    for chunk in chunked(resource_ids, batch_size):
+        pending = [chunk]
+        while pending:
+            batch = pending.pop()
+            try:
+                call(batch)
+            except ClientError as e:
+                error_code = e.response.get('Error', {}).get('Code', '')
+                if len(batch) > 1 and error_code not in WHOLE_BATCH_ERRORS:
+                    logger.warning(f'Batch of {len(batch)} failed with {error_code}, bisecting')
+                    middle = len(batch) // 2
+                    pending.append(batch[middle:])
+                    pending.append(batch[:middle])
+                    continue
+                for resource_id in batch:
+                    on_failure(resource_id, e)
+                continue
+            except Exception as e:
+                for resource_id in batch:
+                    on_failure(resource_id, e)
+                continue
+            on_success(batch)
@@ -0,0 +1,202 @@
+import json
+import logging
+import os
+import time
+import zlib
+from abc import ABC, abstractmethod
+from typing import Dict, List, Optional, Set
+
+from botocore.exceptions import ClientError
+
+from aws_clients import get_client
+
+logger = logging.getLogger()
+
+CHECKPOINT_VERSION = 3
+CHECKPOINT_KEY = 'checkpoint.json.z'
+# Checkpoints older than this belong to an abandoned run and are ignored
+DEFAULT_CHECKPOINT_MAX_AGE = 24 * 3600
+
+
+class CheckpointStore(ABC):
+    """Key/value blob storage for state carried between invocations."""
+
+    @abstractmethod
+    def load(self, key: str) -> Optional[bytes]:
+        """Get the blob stored under `key`, or None if there is none"""
+
+    @abstractmethod
+    def save(self, key: str, data: bytes):
+        """Store a blob under `key`, replacing any previous one"""
+
+    @abstractmethod
+    def delete(self, key: str):
+        """Remove the blob stored under `key`, if any"""
+
+
+class LocalCheckpointStore(CheckpointStore):
+    """Stores blobs as files in a local directory (tests, local runs)."""
+
+    def __init__(self, directory: str):
+        self.directory = directory
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, key)
+
+    def load(self, key: str) -> Optional[bytes]:
+        try:
+            with open(self._path(key), 'rb') as f:
+                return f.read()
+        except FileNotFoundError:
+            return None
+
+    def save(self, key: str, data: bytes):
+        os.makedirs(self.directory, exist_ok=True)
+        # Write then rename so a timeout mid-write never leaves a truncated blob
+        tmp_path = self._path(key) + '.tmp'
+        with open(tmp_path, 'wb') as f:
+            f.write(data)
+        os.replace(tmp_path, self._path(key))
+
+    def delete(self, key: str):
+        try:
+            os.remove(self._path(key))
+        except FileNotFoundError:
+            pass
+
+
+class S3CheckpointStore(CheckpointStore):
+    """Stores blobs as objects under a prefix of an S3 bucket."""
+
+    def __init__(self, bucket: str, prefix: str = ''):
+        self.bucket = bucket
+        self.prefix = prefix.strip('/')
+
+    def _key(self, key: str) -> str:
+        return f'{self.prefix}/{key}' if self.prefix else key
+
+    def load(self, key: str) -> Optional[bytes]:
+        s3 = get_client('s3')
+        try:
+            return s3.get_object(Bucket=self.bucket, Key=self._key(key))['Body'].read()
+        except ClientError as e:
+            if e.response.get('Error', {}).get('Code') in ('NoSuchKey', '404'):
+                return None
+            raise
+
+    def save(self, key: str, data: bytes):
+        get_client('s3').put_object(Bucket=self.bucket, Key=self._key(key), Body=data)
+
+    def delete(self, key: str):
+        get_client('s3').delete_object(Bucket=self.bucket, Key=self._key(key))
+
+
+def get_checkpoint_store(location: Optional[str]) -> Optional[CheckpointStore]:
+    """Build a store from a location string
+
+    :param location: "s3://bucket/prefix", "file:///path" or a local directory path; empty for none
+    :return: CheckpointStore, or None if no location is configured
+    """
+    if not location:
+        return None
+    if location.startswith('s3://'):
+        bucket, _, prefix = location[len('s3://'):].partition('/')
+        if not bucket:
+            raise ValueError(f"Invalid S3 location '{location}', expected 's3://<bucket>[/prefix]'")
+        return S3CheckpointStore(bucket, prefix)
+    if location.startswith('file://'):
+        location = location[len('file://'):]
+    return LocalCheckpointStore(location)
+
+
+class Checkpoint:
+    """Progress of a cleanup run that did not finish within one invocation.
+
+    Holds the (phase, region) units already completed, the resume tokens of paginations
+    interrupted mid-way and the partial tracker records, so the next invocation can
+    skip finished work and report on the whole run. Only an invocation with the same
+    DRY_RUN and APPLY_PLAN modes resumes it.
+    """
+
+    def __init__(self, dry_run: bool, created_at: Optional[float] = None,
+                 completed: Optional[Set[str]] = None, page_tokens: Optional[Dict[str, str]] = None,
+                 records: Optional[List[list]] = None, apply_plan: bool = False):
+        self.dry_run = dry_run
+        self.apply_plan = apply_plan
+        self.created_at = created_at if created_at is not None else time.time()
+        self.completed = set(completed or ())
+        self.page_tokens = dict(page_tokens or {})
+        self.records = list(records or [])
+
+    def to_bytes(self) -> bytes:
+        return zlib.compress(json.dumps({
+            'version': CHECKPOINT_VERSION,
+            'dry_run': self.dry_run,
+            'apply_plan': self.apply_plan,
+            'created_at': self.created_at,
+            'completed': sorted(self.completed),
+            'page_tokens': self.page_tokens,
+            'records': self.records,
+        }, separators=(',', ':')).encode())
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> Optional["Checkpoint"]:
+        try:
+            state = json.loads(zlib.decompress(data))
+        except (zlib.error, ValueError) as e:
+            logger.warning(f'Ignoring unreadable checkpoint: {str(e)}')
+            return None
+        if state.get('version') != CHECKPOINT_VERSION:
+            logger.warning(f'Ignoring checkpoint with version {state.get("version")}')
+            return None
+        return cls(state['dry_run'], state['created_at'], set(state['completed']), state['page_tokens'],
+                   state['records'], state['apply_plan'])
+
+
+def load_checkpoint(store: Optional[CheckpointStore], dry_run: bool, apply_plan: bool = False,
+                    max_age: float = DEFAULT_CHECKPOINT_MAX_AGE) -> Optional[Checkpoint]:
+    """Load the checkpoint of an unfinished run, if it can be resumed
+
+    :param store: CheckpointStore (None disables checkpointing)
+    :param dry_run: DRY_RUN of the current invocation; a checkpoint of the other mode is ignored
+    :param apply_plan: APPLY_PLAN of the current invocation; a checkpoint of the other mode is ignored
+    :param max_age: Maximum checkpoint age in seconds
+    :return: Checkpoint, or None to start a fresh run (also if the store cannot be read)
+    """
+    if store is None:
+        return None
+    try:
+        data = store.load(CHECKPOINT_KEY)
+    except Exception as e:
+        logger.warning(f'Error loading checkpoint, starting a fresh run: {str(e)}')
+        return None
+    if data is None:
+        return None
+
+    checkpoint = Checkpoint.from_bytes(data)
+    if checkpoint is None:
+        return None
+    if checkpoint.dry_run != dry_run:
+        logger.info('Ignoring checkpoint saved with a different DRY_RUN mode')
+        return None
+    if checkpoint.apply_plan != apply_plan:
+        logger.info('Ignoring checkpoint saved with a different APPLY_PLAN mode')
+        return None
+    if time.time() - checkpoint.created_at > max_age:
+        logger.info('Ignoring expired checkpoint')
+        return None
+
+    logger.info(f'Resuming from checkpoint: {len(checkpoint.completed)} work units completed, '
+                f'{len(checkpoint.page_tokens)} paginations in progress, {len(checkpoint.records)} tracked resources')
+    return checkpoint
+
+
+def save_checkpoint(store: CheckpointStore, checkpoint: Checkpoint):
+    store.save(CHECKPOINT_KEY, checkpoint.to_bytes())
+    logger.info(f'Saved checkpoint: {len(checkpoint.completed)} work units completed, '
+                f'{len(checkpoint.records)} tracked resources')
+
+
+def clear_checkpoint(store: Optional[CheckpointStore]):
+    if store is not None:
+        store.delete(CHECKPOINT_KEY)
@@ -0,0 +1,135 @@
+import json
+import logging
+import threading
+from datetime import datetime
+from typing import Dict, Optional
+
+from aws_clients import get_client
+
+logger = logging.getLogger()
+
+CREATED_ON_FORMAT = "%d/%m/%Y"
+# Advanced queries return at most 100 results per page
+SELECT_PAGE_SIZE = 100
+INSTANCE_CREATION_QUERY = (
+    "SELECT resourceId, awsRegion, resourceCreationTime "
+    "WHERE resourceType = 'AWS::EC2::Instance'"
+)
+
+
+def _format_created_on(creation_time: str) -> Optional[str]:
+    """Convert a Config query timestamp (e.g. 2024-01-02T10:11:12.000Z) to the CreatedOn tag format"""
+    try:
+        return datetime.strptime(creation_time[:10], '%Y-%m-%d').strftime(CREATED_ON_FORMAT)
+    except (TypeError, ValueError):
+        return None
+
+
+class CreationTimeResolver:
+    """Resolves EC2 instance creation dates from AWS Config in bulk.
+
+    Creation dates are fetched with a single paginated advanced query per region
+    (select_resource_config), or with one query for all regions through a configuration
+    aggregator when one is configured. Instances missing from the query results fall
+    back to a per-resource get_resource_config_history lookup.
+
+    For another account of an organization run, pass its credentials and id: regional
+    queries run in that account, while the aggregator (which lives in the Lambda's own
+    account) is queried with the default credentials and filtered on the account id.
+    """
+
+    def __init__(self, aggregator_name: Optional[str] = None, aggregator_region: Optional[str] = None,
+                 credentials=None, account_id: Optional[str] = None):
+        self.aggregator_name = aggregator_name
+        self.aggregator_region = aggregator_region
+        self.credentials = credentials
+        self.account_id = account_id
+        self._lock = threading.Lock()
+        self._region_locks: Dict[str, threading.Lock] = {}
+        self._dates: Dict[str, Dict[str, str]] = {}
+        self._aggregate_loaded = False
+
+    def _region_lock(self, region: str) -> threading.Lock:
+        with self._lock:
+            return self._region_locks.setdefault(region, threading.Lock())
+
+    def creation_dates(self, region: str) -> Dict[str, str]:
+        """Get the instance id -> CreatedOn date map of a region, querying Config on first use
+
+        :param region: AWS region name
+        :return: Dict of instance id to formatted creation date (empty if the query failed)
+        """
+        if self.aggregator_name:
+            with self._lock:
+                if not self._aggregate_loaded:
+                    self._load_aggregate()
+                    self._aggregate_loaded = True
+                return self._dates.get(region, {})
+
+        with self._region_lock(region):
+            if region not in self._dates:
+                self._dates[region] = self._load_region(region)
+            return self._dates[region]
+
+    def resolve(self, region: str, instance_id: str) -> Optional[str]:
+        """Get the CreatedOn date of an instance, falling back to its Config history
+
+        :param region: AWS region name
+        :param instance_id: EC2 instance id
+        :return: Formatted creation date, or None if Config has no record of the instance
+        """
+        created_on = self.creation_dates(region).get(instance_id)
+        if created_on:
+            return created_on
+
+        config = get_client('config', region_name=region, credentials=self.credentials)
+        response = config.get_resource_config_history(
+            resourceType='AWS::EC2::Instance',
+            resourceId=instance_id)
+
+        if response.get('configurationItems'):
+            return response['configurationItems'][0]['resourceCreationTime'].strftime(CREATED_ON_FORMAT)
+        return None
+
+    def _load_region(self, region: str) -> Dict[str, str]:
+        config = get_client('config', region_name=region, credentials=self.credentials)
+        dates = {}
+        try:
+            paginator = config.get_paginator('select_resource_config')
+            for page in paginator.paginate(Expression=INSTANCE_CREATION_QUERY,
+                                           PaginationConfig={'PageSize': SELECT_PAGE_SIZE}):
+                self._add_results(page.get('Results', []), dates)
+            logger.info(f'Resolved creation dates of {len(dates)} instances from AWS Config in region: {region}')
+        except Exception as e:
+            logger.warning(f'Config advanced query failed in region {region}, '
+                           f'falling back to per-instance history: {str(e)}')
+        return dates
+
+    def _load_aggregate(self):
+        config = get_client('config', region_name=self.aggregator_region)
+        by_region: Dict[str, Dict[str, str]] = {}
+        expression = INSTANCE_CREATION_QUERY
+        if self.account_id:
+            expression += f" AND accountId = '{self.account_id}'"
+        try:
+            paginator = config.get_paginator('select_aggregate_resource_config')
+            for page in paginator.paginate(Expression=expression,
+                                           ConfigurationAggregatorName=self.aggregator_name,
+                                           PaginationConfig={'PageSize': SELECT_PAGE_SIZE}):
+                for result in page.get('Results', []):
+                    item = json.loads(result)
+                    self._add_results([item], by_region.setdefault(item.get('awsRegion', ''), {}))
+            logger.info(f'Resolved creation dates of {sum(len(d) for d in by_region.values())} instances '
+                        f'from Config aggregator {self.aggregator_name}')
+        except Exception as e:
+            logger.warning(f'Config aggregator query on {self.aggregator_name} failed, '
+                           f'falling back to per-instance history: {str(e)}')
+        self._dates = by_region
+
+    @staticmethod
+    def _add_results(results, dates: Dict[str, str]):
+        for result in results:
+            item = json.loads(result) if isinstance(result, str) else result
+            created_on = _format_created_on(item.get('resourceCreationTime'))
+            if item.get('resourceId') and created_on:
+                dates[item['resourceId']] = created_on
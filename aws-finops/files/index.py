@@ -1,60 +1,97 @@
-import boto3
+import copy
 import json
-import os
 import logging
-import re
-import time
+import random
 import threading
-from functools import wraps
+import time
+from contextlib import contextmanager
+from functools import lru_cache, partial, wraps
 from concurrent.futures import ThreadPoolExecutor, as_completed
-from typing import List, Tuple, Optional, Callable
+from typing import TYPE_CHECKING, Dict, List, Optional, Callable
+import jmespath
 from botocore.exceptions import ClientError
 
-from send_mail import send_email
+from aws_clients import configure_clients, get_client, register_client_hook
+from batching import (CREATE_TAGS_BATCH_SIZE, EC2_MUTATION_BATCH_SIZE, ELB_DESCRIBE_TAGS_BATCH_SIZE,
+                      OPENSEARCH_DESCRIBE_BATCH_SIZE, apply_in_batches, chunked, group_by_value)
+from creation_times import CreationTimeResolver
+from inventory import (EC2_PAGE_SIZE, EKS_PAGE_SIZE, INSTANCE_FIELDS, EksClusterIndex, InstanceInventory,
+                       InstanceRecord, ProtectionIndex, to_instance_record)
+from pipeline import DEFAULT_MUTATION_WORKERS, Mutation, MutationPipeline, Quota, Verifier
+from rate_limit import (THROTTLING_ERRORS, attach_rate_limiter, configure_rate_limits, limiter_stats,
+                        reset_limiter_stats)
+from scheduler import TimeBudget, TimeBudgetExceeded, WorkScheduler, WorkUnit
+from settings import load_settings
+from snapshot import NO_CONFIG_HISTORY, ResourceSnapshot, fingerprint, tags_hash
+from telemetry import attach_telemetry, emit_metrics, reset_telemetry, telemetry_summary
+from tracker import DELETED, FAILED, NOTIFY, PENDING, SKIPPED, ResourceTracker
+from ttl_cache import TtlCache
+
+# Modules of optional features (organization mode, checkpoints, plans, the region probe)
+# are imported where those features are used, so runs without them do not load them
+if TYPE_CHECKING:
+    from accounts import Account
+    from checkpoint import Checkpoint
+    from plan import Plan, PlanEntry, PlanKind
+    from region_probe import RegionMap
+
+# Number of threads each region's tagging unit uses for per-instance lookups
+TAGGING_WORKERS = 5
+# Number of threads each region's EKS unit uses to list and describe nodegroups; as many
+# clusters are listed ahead of the one being processed
+EKS_WORKERS = 5
+# Threads all EKS pools of an instance together may use (see eks_executor())
+EKS_POOL_WORKERS = 10
+# Largest page sizes the describe and list calls accept
+EBS_PAGE_SIZE = 500
+ELB_PAGE_SIZE = 400
+RDS_PAGE_SIZE = 100
+KINESIS_PAGE_SIZE = 10000
+MSK_PAGE_SIZE = 100
+# page_tokens value of a finished pagination or loop, saved with the checkpoint so a resumed
+# unit does not run it again (no AWS resume token or resource name looks like this)
+PAGINATION_DONE = '#done'
+
+# Fields of the listed resources the phases and plan fingerprints read, projected from
+# each page with JMESPath so nothing else is kept. The defaults stand in for the keys the
+# APIs omit when empty, so projected resources look like the API's own.
+ADDRESS_FIELDS = ("{AllocationId: AllocationId, PublicIp: PublicIp, AssociationId: AssociationId || '', "
+                  "Tags: Tags || `[]`}")
+VOLUME_FIELDS = "{VolumeId: VolumeId, Size: Size, State: State, Tags: Tags || `[]`}"
+LOAD_BALANCER_FIELDS = "{LoadBalancerName: LoadBalancerName, Instances: Instances, CreatedTime: CreatedTime || ''}"
+DB_CLUSTER_FIELDS = ("{DBClusterIdentifier: DBClusterIdentifier, Status: Status, TagList: TagList || `[]`, "
+                     "DBClusterMembers: DBClusterMembers[].{DBInstanceIdentifier: DBInstanceIdentifier} || `[]`}")
+DB_INSTANCE_FIELDS = ("{DBInstanceIdentifier: DBInstanceIdentifier, DBInstanceStatus: DBInstanceStatus, "
+                      "DBClusterIdentifier: DBClusterIdentifier || '', TagList: TagList || `[]`}")
+MSK_CLUSTER_FIELDS = "{ClusterArn: ClusterArn, ClusterName: ClusterName, State: State || '', Tags: Tags || `{}`}"
 
 # Configure structured logging
 logger = logging.getLogger()
 logger.setLevel(logging.INFO)
 
 
-def validate_email(email: str) -> bool:
-    """Validate email address format"""
-    pattern = r'^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$'
-    return re.match(pattern, email) is not None
-
-
-def get_validated_env(key: str, default: Optional[str] = None, required: bool = True) -> Optional[str]:
-    """Get and validate environment variable
-
-    :param key: Environment variable name
-    :param default: Default value if not set
-    :param required: Whether variable is required
-    :return: Environment variable value
-    :raises: ValueError if required variable is missing or invalid
-    """
-    value = os.environ.get(key, default)
-
-    if required and not value:
-        raise ValueError(f"Required environment variable '{key}' is not set")
-
-    # Validate specific environment variables
-    if key in ['EMAIL_IDENTITY', 'TO_ADDRESS'] and value:
-        if not validate_email(value):
-            raise ValueError(f"Invalid email format for '{key}': {value}")
-
-    if key == 'DRY_RUN' and value:
-        if value.lower() not in ['true', 'false']:
-            raise ValueError(f"DRY_RUN must be 'true' or 'false', got: {value}")
-
-    if key == 'CHECK_ALL_REGIONS' and value:
-        if value.lower() not in ['true', 'false']:
-            raise ValueError(f"CHECK_ALL_REGIONS must be 'true' or 'false', got: {value}")
-
-    return value
+# Errors that will not succeed on retry, including per-resource EC2 errors that
+# batched mutations resolve by bisecting instead of retrying
+NON_RETRYABLE_ERRORS = [
+    'ValidationException',
+    'InvalidParameterException',
+    'AccessDenied',
+    'UnauthorizedOperation',
+    'InvalidInstanceID.NotFound',
+    'InvalidInstanceID.Malformed',
+    'IncorrectInstanceState',
+    'UnsupportedOperation',
+    'OperationNotPermitted',
+]
 
 
 def retry_with_backoff(max_retries: int = 3, initial_delay: float = 1.0, backoff_factor: float = 2.0):
-    """Decorator to retry function with exponential backoff
+    """Decorator to retry function with exponential backoff and full jitter
+
+    Each retry sleeps a random time between 0 and the current backoff delay, so threads
+    failing together do not retry in lockstep. Throttling errors are not retried here:
+    the per-(service, region) rate limiters attached to every client slow down on them
+    and botocore retries them, so one reaching this point has used up those attempts.
 
     :param max_retries: Maximum number of retry attempts
     :param initial_delay: Initial delay in seconds
@@ -74,25 +111,20 @@ def retry_with_backoff(max_retries: int = 3, initial_delay: float = 1.0, backoff
                     last_exception = e
 
                     # Don't retry on non-retryable errors
-                    if error_code in ['ValidationException', 'InvalidParameterException', 'AccessDenied']:
+                    if error_code in NON_RETRYABLE_ERRORS:
                         logger.error(f"{func.__name__} failed with non-retryable error: {error_code}")
                         raise
 
-                    # Throttling errors - retry with backoff
-                    if error_code in ['Throttling', 'TooManyRequestsException', 'RequestLimitExceeded']:
-                        if attempt < max_retries:
-                            logger.warning(f"{func.__name__} throttled, retrying in {delay}s (attempt {attempt + 1}/{max_retries})")
-                            time.sleep(delay)
-                            delay *= backoff_factor
-                            continue
-                        else:
-                            logger.error(f"{func.__name__} failed after {max_retries} retries: {str(e)}")
-                            raise
+                    # Throttling errors - already retried by botocore and paced by the rate limiter
+                    if error_code in THROTTLING_ERRORS:
+                        logger.error(f"{func.__name__} throttled after botocore retries: {str(e)}")
+                        raise
 
                     # Other client errors - retry with backoff
                     if attempt < max_retries:
-                        logger.warning(f"{func.__name__} failed, retrying in {delay}s (attempt {attempt + 1}/{max_retries}): {str(e)}")
-                        time.sleep(delay)
+                        sleep = random.uniform(0, delay)
+                        logger.warning(f"{func.__name__} failed, retrying in {sleep:.2f}s (attempt {attempt + 1}/{max_retries}): {str(e)}")
+                        time.sleep(sleep)
                         delay *= backoff_factor
                     else:
                         logger.error(f"{func.__name__} failed after {max_retries} retries: {str(e)}")
@@ -109,66 +141,254 @@ def retry_with_backoff(max_retries: int = 3, initial_delay: float = 1.0, backoff
     return decorator
 
 
+_eks_threads = threading.BoundedSemaphore(EKS_POOL_WORKERS)
+
+
+@contextmanager
+def eks_executor():
+    """Get a pool of up to EKS_WORKERS threads, taken from the EKS_POOL_WORKERS shared by all regions
+
+    Each caller gets its own pool, so the EKS rate limiter of one region never holds up
+    the threads of another. Waits until at least one thread is free; on exit the work not
+    started yet is cancelled and the threads are handed back.
+    """
+    _eks_threads.acquire()
+    threads = 1
+    while threads < EKS_WORKERS and _eks_threads.acquire(blocking=False):
+        threads += 1
+    executor = ThreadPoolExecutor(max_workers=threads, thread_name_prefix='eks')
+    try:
+        yield executor
+    finally:
+        executor.shutdown(wait=True, cancel_futures=True)
+        for _ in range(threads):
+            _eks_threads.release()
+
+
 # Validate and load environment variables
 try:
-    keep_tag_key = get_validated_env('KEEP_TAG_KEY', default='auto-deletion', required=False)
-    keep_tag_value = get_validated_env('KEEP_TAG_VALUE', default='skip-resource', required=False)
-    dry_run = get_validated_env('DRY_RUN', default='true', required=False).lower() == 'true'
-    from_address = get_validated_env('EMAIL_IDENTITY', required=True)
-    to_address = get_validated_env('TO_ADDRESS', required=True)
-
-    logger.info(f"Configuration loaded - DRY_RUN: {dry_run}, KEEP_TAG_KEY: {keep_tag_key}")
+    settings = load_settings()
+    configure_rate_limits(settings.rate_limits)
+    # Every worker may hold a connection, plus the nested per-region instance tagging pool
+    # and the mutation pipeline workers
+    configure_clients(settings.max_workers + TAGGING_WORKERS + DEFAULT_MUTATION_WORKERS,
+                      connect_timeout=settings.boto_connect_timeout, read_timeout=settings.boto_read_timeout,
+                      max_attempts=settings.boto_max_attempts, retry_mode=settings.boto_retry_mode)
+    register_client_hook(attach_rate_limiter)
+    register_client_hook(attach_telemetry)
+
+    logger.info(f"Configuration loaded - DRY_RUN: {settings.dry_run}, KEEP_TAG_KEY: {settings.keep_tag_key}, "
+                f"regions: {', '.join(settings.regions)}")
 
 except ValueError as e:
     logger.error(f"Configuration error: {str(e)}")
     raise
 
-# Default regions if not specified
-DEFAULT_REGIONS = [
-    'us-east-1',
-    'us-east-2',
-    'us-west-1',
-    'us-west-2',
-    'eu-north-1',
-    'eu-central-1',
-    'eu-west-1'
-]
-
-# Load regions from environment or use defaults
-REGIONS_ENV = get_validated_env('REGIONS', default='', required=False)
-if REGIONS_ENV:
-    USED_REGIONS = [r.strip() for r in REGIONS_ENV.split(',') if r.strip()]
-    logger.info(f"Using custom regions from environment: {USED_REGIONS}")
-else:
-    USED_REGIONS = DEFAULT_REGIONS
-    logger.info(f"Using default regions: {USED_REGIONS}")
 
+class RunContext:
+    """Per-invocation state shared by all cleanup work units.
 
-class ResourceTracker:
-    """Thread-safe tracker for resource cleanup results."""
+    When resuming from a Checkpoint, its completed units, pagination resume tokens and
+    tracker records are restored.
 
-    def __init__(self):
-        self._lock = threading.Lock()
-        self.deleted_resources: List[Tuple[str, str]] = []
-        self.skip_delete_resources: List[Tuple[str, str]] = []
-        self.notify_resources: List[Tuple[str, str]] = []
-        self.check_resources: List[Tuple[str, str]] = []
+    In organization mode each target account gets a child context (see for_account())
+    that shares the budget, progress, tracker, snapshot and mutation pipeline of the
+    root context, but has its own credentials and account-scoped inventories.
 
-    def add_deleted(self, service: str, resource_id: str):
-        with self._lock:
-            self.deleted_resources.append((service, resource_id))
+    region_map is set by the region pre-probe; units of regions without resources of a
+    phase's types are then not scheduled.
 
-    def add_skipped(self, service: str, resource_id: str):
-        with self._lock:
-            self.skip_delete_resources.append((service, resource_id))
-
-    def add_notify(self, service: str, resource_id: str):
-        with self._lock:
-            self.notify_resources.append((service, resource_id))
-
-    def add_failed(self, service: str, resource_id: str):
-        with self._lock:
-            self.check_resources.append((service, resource_id))
+    plan is set in dry runs with a PLAN_STORE; the phases add the actions they would take
+    to it (see planned()).
+    """
+    account = ''
+    credentials = None
+    region_map: Optional["RegionMap"] = None
+    plan: Optional["Plan"] = None
+
+    def __init__(self, tracker: Optional[ResourceTracker] = None,
+                 inventory: Optional[InstanceInventory] = None,
+                 creation_times: Optional[CreationTimeResolver] = None,
+                 eks_clusters: Optional[EksClusterIndex] = None,
+                 budget: Optional[TimeBudget] = None,
+                 checkpoint: Optional["Checkpoint"] = None,
+                 snapshot: Optional[ResourceSnapshot] = None):
+        self.tracker = tracker or ResourceTracker()
+        self.snapshot = snapshot or ResourceSnapshot(settings.snapshot_store)
+        self.budget = budget or TimeBudget()
+        self.started_at = checkpoint.created_at if checkpoint else time.time()
+        self.completed = set(checkpoint.completed) if checkpoint else set()
+        self.page_tokens = dict(checkpoint.page_tokens) if checkpoint else {}
+        if checkpoint:
+            self.tracker.load(checkpoint.records)
+        self.inventory = inventory or InstanceInventory()
+        self.eks_clusters = eks_clusters or EksClusterIndex()
+        self.protection = ProtectionIndex(settings.keep_tag_key, settings.keep_tag_value)
+        self.creation_times = creation_times or CreationTimeResolver(settings.config_aggregator_name,
+                                                                     settings.config_aggregator_region)
+        self.mutations = MutationPipeline(self.tracker, MUTATION_VERIFIERS, verify=settings.verify_mutations,
+                                          verify_timeout=settings.verify_timeout, limits=MUTATION_LIMITS,
+                                          quotas=MUTATION_QUOTAS, deadline=self.budget.deadline)
+
+    def for_account(self, account: "Account") -> "RunContext":
+        """Get a child context running the cleanup phases in another account
+
+        :param account: Target Account
+        :return: RunContext recording its results under the account id
+        """
+        child = copy.copy(self)
+        child.account = account.account_id
+        child.credentials = account.credentials
+        child.tracker = self.tracker.for_account(account.account_id)
+        child.snapshot = self.snapshot.for_account(account.account_id)
+        child.inventory = InstanceInventory(account.credentials)
+        child.eks_clusters = EksClusterIndex(account.credentials)
+        child.protection = ProtectionIndex(settings.keep_tag_key, settings.keep_tag_value, account.credentials)
+        child.creation_times = CreationTimeResolver(settings.config_aggregator_name,
+                                                    settings.config_aggregator_region,
+                                                    account.credentials, account.account_id)
+        return child
+
+    def client(self, service: str, region: str):
+        """Get the shared client of a service in a region of this context's account"""
+        return get_client(service, region_name=region, credentials=self.credentials)
+
+    def submit(self, mutation: Mutation):
+        """Queue a mutation of this context's account on the shared pipeline"""
+        self.mutations.submit(mutation._replace(account=self.account, credentials=self.credentials))
+
+    def planned(self, kind: str, region: str, resource_id: str, action: str, resource_fingerprint: str):
+        """Add an action a dry run would take to the plan, if one is being recorded
+
+        :param kind: Tracker category (e.g. 'ebs-volume')
+        :param region: AWS region name
+        :param resource_id: Id the API call takes
+        :param action: Name of the API operation (e.g. 'delete_volume')
+        :param resource_fingerprint: fingerprint() of what the decision was based on, as
+                                     computed again by the kind's plan_kinds() entry
+        """
+        if self.plan is not None:
+            from plan import PlanEntry
+            self.plan.add(PlanEntry(self.account, region, kind, resource_id, action, resource_fingerprint))
+
+    def protected(self, region: str, service: str, resource: str, tags: Optional[list] = None) -> Optional[bool]:
+        """Check the protection tag of a resource against its tags and the region's ProtectionIndex
+
+        :param region: AWS region name
+        :param service: Service part of the resource ARN (e.g. "ec2")
+        :param resource: Resource part of the resource ARN (e.g. "volume/vol-0123")
+        :param tags: Tags from the describe call, if it returns them
+        :return: True or False, or None if no tags were given and the index is unavailable
+        """
+        if tags and _has_protection_tag(tags):
+            return True
+        protected = self.protection.is_protected(region, service, resource)
+        if protected is None and tags is not None:
+            return False
+        return protected
+
+    def key(self, name: str) -> str:
+        """Qualify a unit or pagination key with this context's account"""
+        return f'{self.account}:{name}' if self.account else name
+
+    def paginate(self, key: str, paginator, **kwargs):
+        """Iterate over the pages of a paginator, resuming where a previous invocation stopped
+
+        After each page is processed the time budget is checked; once it is exhausted the
+        resume token of the next page is kept under `key` and TimeBudgetExceeded is raised.
+        A finished pagination is marked PAGINATION_DONE, so a resumed unit running several
+        paginations does not list the ones before its interrupted one again.
+
+        :param key: Unique name of this pagination within the run (e.g. "rds-instances:us-east-1")
+        :param paginator: boto3 paginator
+        :param kwargs: Arguments of paginator.paginate()
+        """
+        key = self.key(key)
+        config = dict(kwargs.pop('PaginationConfig', {}))
+        if self.page_tokens.get(key) == PAGINATION_DONE:
+            logger.info(f'Skipping {key}, finished by a previous invocation')
+            return
+        if self.page_tokens.get(key):
+            logger.info(f'Resuming {key} from a previous invocation')
+            config['StartingToken'] = self.page_tokens[key]
+
+        page_iterator = paginator.paginate(PaginationConfig=config, **kwargs)
+        for page in page_iterator:
+            yield page
+            if self.budget.exhausted() and page_iterator.resume_token:
+                self.page_tokens[key] = page_iterator.resume_token
+                raise TimeBudgetExceeded()
+        self.page_tokens[key] = PAGINATION_DONE
+
+    def search(self, key: str, paginator, expression: str, **kwargs):
+        """Like paginate(), but yield the results of a JMESPath expression on each page
+
+        As with PageIterator.search(), list results are flattened, so only the projected
+        fields of each page are kept. The time budget is still checked, and the resume
+        token kept, once all results of a page are processed.
+
+        :param key: Unique name of this pagination within the run (e.g. "ebs-volumes:us-east-1")
+        :param paginator: boto3 paginator
+        :param expression: JMESPath expression (e.g. f'Volumes[].{VOLUME_FIELDS}')
+        :param kwargs: Arguments of paginator.paginate()
+        """
+        compiled = jmespath.compile(expression)
+        for page in self.paginate(key, paginator, **kwargs):
+            results = compiled.search(page)
+            if isinstance(results, list):
+                yield from results
+            else:
+                yield results
+
+    def resumable(self, key: str, items):
+        """Iterate over items in sorted order, skipping those a previous invocation finished
+
+        Like paginate(), but for loops over an already listed set of names: the last
+        finished item is kept under `key` and TimeBudgetExceeded is raised once the time
+        budget is exhausted. A finished loop is marked PAGINATION_DONE.
+
+        :param key: Unique name of this loop within the run (e.g. "eks-clusters:us-east-1")
+        :param items: Names to iterate over
+        """
+        key = self.key(key)
+        last_done = self.page_tokens.get(key)
+        if last_done == PAGINATION_DONE:
+            logger.info(f'Skipping {key}, finished by a previous invocation')
+            return
+        for item in sorted(items):
+            if last_done is not None and item <= last_done:
+                continue
+            yield item
+            self.page_tokens[key] = item
+            if self.budget.exhausted():
+                raise TimeBudgetExceeded()
+        self.page_tokens[key] = PAGINATION_DONE
+
+    def prefetched(self, key: str, items, submit: Callable, window: int):
+        """Like resumable(), but start work on the next items while the current one is processed
+
+        :param key: Unique name of this loop within the run (e.g. "eks-clusters:us-east-1")
+        :param items: Names to iterate over
+        :param submit: Function starting the work of an item and returning its Future
+        :param window: Number of items (the current one included) whose work is started
+        :return: Iterator of (item, Future) pairs, in sorted order
+        """
+        last_done = self.page_tokens.get(self.key(key))
+        if last_done == PAGINATION_DONE:
+            pending = []
+        else:
+            pending = [item for item in sorted(items) if last_done is None or item > last_done]
+        futures = {}
+        for index, item in enumerate(self.resumable(key, pending)):
+            for ahead in pending[index:index + window]:
+                if ahead not in futures:
+                    futures[ahead] = submit(ahead)
+            yield item, futures.pop(item)
+
+    def to_checkpoint(self) -> "Checkpoint":
+        from checkpoint import Checkpoint
+        return Checkpoint(settings.dry_run, self.started_at, self.completed, self.page_tokens, self.tracker.dump(),
+                          settings.apply_plan)
 
 
 def _has_protection_tag(tags: list) -> bool:
@@ -178,7 +398,7 @@ def _has_protection_tag(tags: list) -> bool:
     :return: True if resource is protected
     """
     for tag in tags:
-        if tag.get("Key") == keep_tag_key and tag.get("Value") == keep_tag_value:
+        if tag.get("Key") == settings.keep_tag_key and tag.get("Value") == settings.keep_tag_value:
             return True
     return False
 
@@ -189,121 +409,255 @@ def notify_auto_clean_data(tracker: ResourceTracker):
     logger.info(f"notify resources: {tracker.notify_resources}")
     logger.info(f"check resources: {tracker.check_resources}")
     logger.info(f"skip delete resources: {tracker.skip_delete_resources}")
+    logger.info(f"pending resources: {tracker.pending_resources}")
+
+    # Imported on first use: the report code is only needed once per invocation, at the end
+    from send_mail import send_email
+    send_email(settings.from_address, settings.to_address, tracker.deleted_resources,
+               tracker.skip_delete_resources, tracker.notify_resources, tracker.check_resources,
+               tracker.pending_resources, ses_region=settings.ses_region,
+               max_body_bytes=settings.report_max_body_bytes, top_rows=settings.report_top_rows,
+               cache_ttl=settings.cache_ttl)
+
+
+# Plan fingerprints: what each cleanup decision was based on. A dry run records them in
+# the plan; apply mode computes them again from the same describe fields and only acts
+# on resources whose fingerprint did not change.
+
+def instance_fingerprint(instance: InstanceRecord) -> str:
+    return fingerprint(instance.state, tags_hash(instance.tags))
+
+
+def monitoring_fingerprint(instance: InstanceRecord) -> str:
+    # Not the state: the plan's own stop actions change it, and stopped instances can be unmonitored too
+    return fingerprint(instance.monitoring)
+
+
+def address_fingerprint(address: dict) -> str:
+    return fingerprint(address.get('AssociationId', ''), tags_hash(address.get('Tags', [])))
 
-    send_email(from_address, to_address, tracker.deleted_resources,
-               tracker.skip_delete_resources, tracker.notify_resources, tracker.check_resources)
+
+def volume_fingerprint(volume: dict) -> str:
+    return fingerprint(volume['State'], tags_hash(volume.get('Tags', [])))
+
+
+def load_balancer_fingerprint(lb: dict) -> str:
+    return fingerprint(len(lb['Instances']), str(lb.get('CreatedTime', '')))
+
+
+def db_cluster_fingerprint(cluster: dict) -> str:
+    return fingerprint(cluster['Status'], tags_hash(cluster.get('TagList', [])))
+
+
+def db_instance_fingerprint(instance: dict) -> str:
+    return fingerprint(instance['DBInstanceStatus'], instance.get('DBClusterIdentifier', ''),
+                       tags_hash(instance.get('TagList', [])))
+
+
+def nodegroup_fingerprint(nodegroup: dict) -> str:
+    return fingerprint(nodegroup['scalingConfig'].get('desiredSize', 0), tags_hash(nodegroup.get('tags', {}).items()))
+
+
+def stream_fingerprint(summary: Optional[dict]) -> str:
+    # list_streams has no state beyond the name; the creation time tells a recreated stream apart
+    return fingerprint(str((summary or {}).get('StreamCreationTimestamp', '')))
+
+
+def msk_cluster_fingerprint(cluster: dict) -> str:
+    return fingerprint(cluster.get('State', ''), tags_hash(cluster.get('Tags', {}).items()))
+
+
+def domain_fingerprint(status: dict) -> str:
+    return fingerprint(status.get('Processing', False), status.get('Deleted', False))
 
 
 # Delete EC2 instances
 
 @retry_with_backoff()
-def stop_instances(instances_to_stop, region):
+def stop_instances(instances_to_stop, region, credentials=None):
     """Stop a list of instances in a specific region
 
     :param instances_to_stop: List of instance ids
     :param region: AWS region name
+    :param credentials: Credentials of the account, None for the Lambda's own
     """
-    ec2 = boto3.client('ec2', region_name=region)
+    ec2 = get_client('ec2', region_name=region, credentials=credentials)
     ec2.stop_instances(InstanceIds=instances_to_stop)
 
 
-def stop_all_instances(regions, tracker: ResourceTracker):
+@retry_with_backoff()
+def unmonitor_instances(instances_to_unmonitor, region, credentials=None):
+    """Disable detailed monitoring on a list of instances in a specific region
+
+    :param instances_to_unmonitor: List of instance ids
+    :param region: AWS region name
+    :param credentials: Credentials of the account, None for the Lambda's own
+    """
+    ec2 = get_client('ec2', region_name=region, credentials=credentials)
+    ec2.unmonitor_instances(InstanceIds=instances_to_unmonitor)
+
+
+@retry_with_backoff()
+def create_tags(resource_ids, tags, region, credentials=None):
+    """Apply the same tags to a list of EC2 resources in a specific region
+
+    :param resource_ids: List of resource ids
+    :param tags: List of tag dicts with Key/Value
+    :param region: AWS region name
+    :param credentials: Credentials of the account, None for the Lambda's own
+    """
+    ec2 = get_client('ec2', region_name=region, credentials=credentials)
+    ec2.create_tags(Resources=resource_ids, Tags=tags)
+
+
+def stop_all_instances(regions, tracker: ResourceTracker, inventory: Optional[InstanceInventory] = None):
     """Stop all EC2 instances
 
     :param regions: List of AWS region names
     :param tracker: ResourceTracker instance
+    :param inventory: Shared InstanceInventory (a private one is created if omitted)
     """
     logger.info("====== EC2 Instances ======")
-    for region in regions:
-        instances_to_stop = get_instances_in_region(region, tracker)
-        if instances_to_stop:
-            if not dry_run:
-                try:
-                    stop_instances(instances_to_stop, region)
-                    for inst_id in instances_to_stop:
-                        tracker.add_deleted('ec2-instance', inst_id)
-                    logger.info(f'Stopped instances: {str(instances_to_stop)}')
-                except Exception as e:
-                    logger.error(f'Failed to stop instances in {region}: {str(e)}')
-                    for inst_id in instances_to_stop:
-                        tracker.add_failed('ec2-instance', inst_id)
-            else:
-                for inst_id in instances_to_stop:
-                    tracker.add_skipped('ec2-instance', inst_id)
-                logger.info(f'DRY RUN: Would stop instances: {str(instances_to_stop)}')
+    run_phases(['ec2-instance'], regions, RunContext(tracker, inventory))
 
 
-def get_instances_in_region(region, tracker: ResourceTracker):
-    """Get all non-spot running instances in a specific region using pagination
+def stop_instances_in_region(region, run: RunContext):
+    """Stop all non-spot, unprotected running instances in a specific region
+
+    :param region: AWS region name
+    :param run: RunContext of the current invocation
+    """
+    tracker = run.tracker
+    instances_to_stop = get_instances_in_region(region, tracker, run.inventory, run.protection)
+    if instances_to_stop:
+        if not settings.dry_run:
+            stop_instance_ids(region, instances_to_stop, run)
+        else:
+            records = {instance.instance_id: instance for instance in run.inventory.instances(region)}
+            for inst_id in instances_to_stop:
+                tracker.add_skipped('ec2-instance', inst_id, region, 'stop_instances')
+                run.planned('ec2-instance', region, inst_id, 'stop_instances', instance_fingerprint(records[inst_id]))
+            logger.info(f'DRY RUN: Would stop instances: {str(instances_to_stop)}')
+
+
+def stop_instance_ids(region, instance_ids, run: RunContext):
+    """Stop instances in batches of EC2_MUTATION_BATCH_SIZE, recording the results
+
+    :param region: AWS region name
+    :param instance_ids: List of instance ids
+    :param run: RunContext of the current invocation
+    """
+    tracker = run.tracker
+
+    def on_stopped(stopped):
+        run.inventory.update_state(region, stopped, 'stopping')
+        for inst_id in stopped:
+            tracker.add_deleted('ec2-instance', inst_id, region, 'stop_instances')
+        logger.info(f'Stopped instances: {str(stopped)}')
+
+    def on_failed(inst_id, error):
+        logger.error(f'Failed to stop instance {inst_id} in {region}: {str(error)}')
+        tracker.add_failed('ec2-instance', inst_id, region, 'stop_instances')
+
+    apply_in_batches(partial(stop_instances, region=region, credentials=run.credentials),
+                     instance_ids, EC2_MUTATION_BATCH_SIZE, on_stopped, on_failed)
+
+
+def get_instances_in_region(region, tracker: ResourceTracker, inventory: Optional[InstanceInventory] = None,
+                            protection: Optional[ProtectionIndex] = None):
+    """Get all non-spot running instances in a specific region from the instance snapshot
 
     :param region: AWS region name
     :param tracker: ResourceTracker instance
+    :param inventory: Shared InstanceInventory (a private one is created if omitted)
+    :param protection: ProtectionIndex also consulted for the protection tag (optional)
     :return: List of instance ids
     """
-    ec2 = boto3.client('ec2', region_name=region)
+    inventory = inventory or InstanceInventory()
     instances_to_stop = []
 
-    paginator = ec2.get_paginator('describe_instances')
-    for page in paginator.paginate(Filters=[{'Name': 'instance-state-name', 'Values': ['running']}]):
-        for reservation in page["Reservations"]:
-            for instance in reservation["Instances"]:
-                # Ignore spot instances
-                if instance.get('InstanceLifecycle') == 'spot':
-                    continue
-                instance_id = instance["InstanceId"]
-                instance_name = ""
-
-                tags = instance.get("Tags", [])
-                if _has_protection_tag(tags):
-                    logger.info(f'Instance {instance_id} has protection tag, skipping')
-                    continue
+    for instance in inventory.instances(region):
+        if instance.state != 'running':
+            continue
+        # Ignore spot instances
+        if instance.is_spot:
+            continue
+        instance_id = instance.instance_id
 
-                for tag in tags:
-                    if tag.get("Key") == "Name":
-                        instance_name = tag.get("Value", "")
+        if (instance.has_tag(settings.keep_tag_key, settings.keep_tag_value)
+                or (protection and protection.is_protected(region, 'ec2', f'instance/{instance_id}'))):
+            logger.info(f'Instance {instance_id} has protection tag, skipping')
+            continue
 
-                logger.info(f'Instance with ID "{instance_id}" and name "{instance_name}" will be stopped.')
-                instances_to_stop.append(instance_id)
+        instance_name = instance.get_tag("Name") or ""
+        logger.info(f'Instance with ID "{instance_id}" and name "{instance_name}" will be stopped.')
+        instances_to_stop.append(instance_id)
 
     return instances_to_stop
 
 
 # Unmonitor EC2 instances
 
-def unmonitor_all_instances(regions, tracker: ResourceTracker):
+def unmonitor_all_instances(regions, tracker: ResourceTracker, inventory: Optional[InstanceInventory] = None):
     """Stop detailed monitoring on all EC2 instances
 
     :param regions: List of AWS region names
     :param tracker: ResourceTracker instance
+    :param inventory: Shared InstanceInventory (a private one is created if omitted)
     """
     logger.info("====== EC2 - Unmonitor ======")
+    run_phases(['ec2-monitoring'], regions, RunContext(tracker, inventory))
 
-    for region in regions:
-        ec2 = boto3.client('ec2', region_name=region)
-        instances_to_unmonitor = []
-        logger.info(f'Getting instances in region: {region}')
-
-        paginator = ec2.get_paginator('describe_instances')
-        for page in paginator.paginate(Filters=[{'Name': 'instance-state-name', 'Values': ['running']}]):
-            for reservation in page.get('Reservations', []):
-                for instance in reservation.get('Instances', []):
-                    instance_id = instance['InstanceId']
-                    monitor_state = instance.get('Monitoring', {}).get('State', 'disabled')
-
-                    if monitor_state == 'enabled':
-                        logger.info(f'Instance with ID "{instance_id}" will be unmonitored.')
-                        instances_to_unmonitor.append(instance_id)
-
-        if instances_to_unmonitor:
-            if not dry_run:
-                ec2.unmonitor_instances(InstanceIds=instances_to_unmonitor)
-                for inst_id in instances_to_unmonitor:
-                    tracker.add_deleted('ec2-monitoring', inst_id)
-                logger.info(f'Unmonitored instances: {str(instances_to_unmonitor)}')
-            else:
-                for inst_id in instances_to_unmonitor:
-                    tracker.add_skipped('ec2-monitoring', inst_id)
-                logger.info(f'DRY RUN: Would unmonitor instances: {str(instances_to_unmonitor)}')
+
+def unmonitor_instances_in_region(region, run: RunContext):
+    """Stop detailed monitoring on running EC2 instances in a specific region
+
+    :param region: AWS region name
+    :param run: RunContext of the current invocation
+    """
+    tracker = run.tracker
+    instances_to_unmonitor = []
+    logger.info(f'Getting instances in region: {region}')
+
+    for instance in run.inventory.instances(region):
+        if instance.state != 'running':
+            continue
+        if instance.monitoring == 'enabled':
+            logger.info(f'Instance with ID "{instance.instance_id}" will be unmonitored.')
+            instances_to_unmonitor.append(instance)
+
+    if instances_to_unmonitor:
+        if not settings.dry_run:
+            unmonitor_instance_ids(region, [instance.instance_id for instance in instances_to_unmonitor], run)
+        else:
+            for instance in instances_to_unmonitor:
+                tracker.add_skipped('ec2-monitoring', instance.instance_id, region, 'unmonitor_instances')
+                run.planned('ec2-monitoring', region, instance.instance_id, 'unmonitor_instances',
+                            monitoring_fingerprint(instance))
+            logger.info(f'DRY RUN: Would unmonitor instances: '
+                        f'{str([instance.instance_id for instance in instances_to_unmonitor])}')
+
+
+def unmonitor_instance_ids(region, instance_ids, run: RunContext):
+    """Stop detailed monitoring on instances in batches of EC2_MUTATION_BATCH_SIZE, recording the results
+
+    :param region: AWS region name
+    :param instance_ids: List of instance ids
+    :param run: RunContext of the current invocation
+    """
+    tracker = run.tracker
+
+    def on_unmonitored(unmonitored):
+        for inst_id in unmonitored:
+            tracker.add_deleted('ec2-monitoring', inst_id, region, 'unmonitor_instances')
+        logger.info(f'Unmonitored instances: {str(unmonitored)}')
+
+    def on_failed(inst_id, error):
+        logger.error(f'Failed to unmonitor instance {inst_id} in {region}: {str(error)}')
+        tracker.add_failed('ec2-monitoring', inst_id, region, 'unmonitor_instances')
+
+    apply_in_batches(partial(unmonitor_instances, region=region, credentials=run.credentials),
+                     instance_ids, EC2_MUTATION_BATCH_SIZE, on_unmonitored, on_failed)
 
 
 # Delete unassociated EIPs
@@ -315,40 +669,43 @@ def release_unassociated_eip(regions, tracker: ResourceTracker):
     :param tracker: ResourceTracker instance
     """
     logger.info("====== Elastic IPs ======")
+    run_phases(['eip'], regions, RunContext(tracker))
 
-    for region in regions:
-        ec2 = boto3.client('ec2', region_name=region)
-        logger.info(f'Getting unassociated EIPs in region: {region}')
-
-        try:
-            addresses = ec2.describe_addresses()
 
-            for address in addresses.get('Addresses', []):
-                # Check if EIP is not associated with any instance
-                if 'AssociationId' not in address:
-                    allocation_id = address.get('AllocationId')
-                    public_ip = address.get('PublicIp')
+def release_unassociated_eip_in_region(region, run: RunContext):
+    """Release unassociated Elastic IP addresses in a specific region
 
-                    # Check protection tag
-                    if _has_protection_tag(address.get('Tags', [])):
-                        logger.info(f'EIP {public_ip} has protection tag, skipping')
-                        continue
+    :param region: AWS region name
+    :param run: RunContext of the current invocation
+    """
+    tracker = run.tracker
+    ec2 = run.client('ec2', region)
+    logger.info(f'Getting unassociated EIPs in region: {region}')
 
-                    if allocation_id:
-                        if not dry_run:
-                            try:
-                                ec2.release_address(AllocationId=allocation_id)
-                                tracker.add_deleted('eip', public_ip)
-                                logger.info(f'Released EIP: {public_ip}')
-                            except Exception as e:
-                                logger.error(f'Failed to release EIP {public_ip}: {str(e)}')
-                                tracker.add_failed('eip', public_ip)
-                        else:
-                            tracker.add_skipped('eip', public_ip)
-                            logger.info(f'DRY RUN: Would release EIP: {public_ip}')
+    try:
+        # describe_addresses is not paginated and has no filter for unassociated addresses
+        addresses = jmespath.search(f'Addresses[?!AssociationId].{ADDRESS_FIELDS}', ec2.describe_addresses())
+
+        for address in addresses:
+            allocation_id = address.get('AllocationId')
+            public_ip = address.get('PublicIp')
+
+            # Check protection tag
+            if run.protected(region, 'ec2', f'elastic-ip/{allocation_id}', address['Tags']):
+                logger.info(f'EIP {public_ip} has protection tag, skipping')
+                continue
+
+            if allocation_id:
+                if not settings.dry_run:
+                    run.submit(Mutation('eip', public_ip, region,
+                                        partial(ec2.release_address, AllocationId=allocation_id)))
+                else:
+                    tracker.add_skipped('eip', public_ip, region, 'release_address')
+                    run.planned('eip', region, allocation_id, 'release_address', address_fingerprint(address))
+                    logger.info(f'DRY RUN: Would release EIP: {public_ip}')
 
-        except Exception as e:
-            logger.error(f'Error describing addresses in region {region}: {str(e)}')
+    except Exception as e:
+        logger.error(f'Error describing addresses in region {region}: {str(e)}')
 
 
 # Delete EBS volumes
@@ -360,57 +717,53 @@ def delete_ebs_volumes(regions, tracker: ResourceTracker):
     :param tracker: ResourceTracker instance
     """
     logger.info("====== EBS Volumes ======")
+    run_phases(['ebs-volume'], regions, RunContext(tracker))
 
-    for region in regions:
-        logger.info(f'Getting all available (unused) EBS volumes in region: {region}')
-        ec2 = boto3.client('ec2', region_name=region)
-        eks = boto3.client('eks', region_name=region)
 
-        try:
-            paginator = ec2.get_paginator('describe_volumes')
-            for page in paginator.paginate(Filters=[{'Name': 'status', 'Values': ['available']}]):
-                for volume in page['Volumes']:
-                    volume_id = volume['VolumeId']
-                    volume_size = volume.get('Size', 0)
-                    delete_volume = True
-
-                    # Check protection tag
-                    tags = volume.get('Tags', [])
-                    if _has_protection_tag(tags):
-                        logger.info(f'Volume {volume_id} has protection tag, skipping')
-                        continue
+def delete_ebs_volumes_in_region(region, run: RunContext):
+    """Delete available EBS volumes in a specific region
 
-                    # Check if the volume is connected to a running EKS cluster
-                    for tag in tags:
-                        if tag['Key'].startswith('kubernetes.io/cluster'):
-                            eks_cluster_name = tag['Key'].split('/')[2]
-                            try:
-                                eks.describe_cluster(name=eks_cluster_name)
-                                delete_volume = False
-                                logger.info(f'Volume {volume_id} belongs to EKS cluster {eks_cluster_name}, skipping')
-                            except eks.exceptions.ResourceNotFoundException:
-                                delete_volume = True
-                            except ClientError as e:
-                                logger.warning(f'Error checking EKS cluster {eks_cluster_name}: {str(e)}')
-                                delete_volume = False
-                            break
-
-                    if delete_volume:
-                        if not dry_run:
-                            try:
-                                ec2.delete_volume(VolumeId=volume_id)
-                                tracker.add_deleted('ebs-volume', f'{volume_id} ({volume_size}GB)')
-                                logger.info(f'Deleted EBS volume: {volume_id} ({volume_size}GB)')
-                            except Exception as e:
-                                logger.error(f'Failed to delete volume {volume_id}: {str(e)}')
-                                tracker.add_failed('ebs-volume', volume_id)
-                        else:
-                            tracker.add_skipped('ebs-volume', f'{volume_id} ({volume_size}GB)')
-                            logger.info(f'DRY RUN: Would delete EBS volume: {volume_id} ({volume_size}GB)')
+    :param region: AWS region name
+    :param run: RunContext of the current invocation
+    """
+    tracker = run.tracker
+    logger.info(f'Getting all available (unused) EBS volumes in region: {region}')
+    ec2 = run.client('ec2', region)
 
-        except Exception as e:
-            logger.error(f'Error describing volumes in region {region}: {str(e)}')
+    try:
+        paginator = ec2.get_paginator('describe_volumes')
+        for volume in run.search(f'ebs-volumes:{region}', paginator, f'Volumes[].{VOLUME_FIELDS}',
+                                 Filters=[{'Name': 'status', 'Values': ['available']}],
+                                 PaginationConfig={'PageSize': EBS_PAGE_SIZE}):
+            volume_id = volume['VolumeId']
+            volume_size = volume.get('Size', 0)
+            delete_volume = True
+
+            tags = volume.get('Tags', [])
+            eks_cluster_name = next((tag['Key'].split('/')[2] for tag in tags
+                                     if tag['Key'].startswith('kubernetes.io/cluster')), None)
+
+            # Check protection tag
+            if run.protected(region, 'ec2', f'volume/{volume_id}', tags):
+                logger.info(f'Volume {volume_id} has protection tag, skipping')
+                continue
+
+            # Check if the volume is connected to a running EKS cluster
+            if eks_cluster_name is not None and run.eks_clusters.exists(region, eks_cluster_name):
+                delete_volume = False
+                logger.info(f'Volume {volume_id} belongs to EKS cluster {eks_cluster_name}, skipping')
+
+            if delete_volume:
+                if not settings.dry_run:
+                    run.submit(Mutation('ebs-volume', f'{volume_id} ({volume_size}GB)', region,
+                                        partial(ec2.delete_volume, VolumeId=volume_id)))
+                else:
+                    tracker.add_skipped('ebs-volume', f'{volume_id} ({volume_size}GB)', region, 'delete_volume')
+                    run.planned('ebs-volume', region, volume_id, 'delete_volume', volume_fingerprint(volume))
+                    logger.info(f'DRY RUN: Would delete EBS volume: {volume_id} ({volume_size}GB)')
 
+    except Exception as e:
+        logger.error(f'Error describing volumes in region {region}: {str(e)}')
 
 
 # Delete empty load balancers
@@ -422,41 +775,82 @@ def delete_empty_load_balancers(regions, tracker: ResourceTracker):
     :param tracker: ResourceTracker instance
     """
     logger.info("====== Classic Load Balancers ======")
+    run_phases(['classic-elb'], regions, RunContext(tracker))
 
-    for region in regions:
-        elb = boto3.client('elb', region_name=region)
 
-        try:
-            paginator = elb.get_paginator('describe_load_balancers')
-            for page in paginator.paginate():
-                for lb in page['LoadBalancerDescriptions']:
-                    if len(lb['Instances']) == 0:
-                        lb_name = lb['LoadBalancerName']
-
-                        # Check protection tag
-                        try:
-                            tag_response = elb.describe_tags(LoadBalancerNames=[lb_name])
-                            for tag_desc in tag_response.get('TagDescriptions', []):
-                                if _has_protection_tag(tag_desc.get('Tags', [])):
-                                    logger.info(f'Load balancer {lb_name} has protection tag, skipping')
-                                    continue
-                        except Exception:
-                            pass
-
-                        if not dry_run:
-                            try:
-                                elb.delete_load_balancer(LoadBalancerName=lb_name)
-                                tracker.add_deleted('classic-elb', lb_name)
-                                logger.info(f'Deleted classic load balancer: {lb_name}')
-                            except Exception as e:
-                                logger.error(f'Failed to delete load balancer {lb_name}: {str(e)}')
-                                tracker.add_failed('classic-elb', lb_name)
-                        else:
-                            tracker.add_skipped('classic-elb', lb_name)
-                            logger.info(f'DRY RUN: Would delete classic load balancer: {lb_name}')
+def delete_empty_load_balancers_in_region(region, run: RunContext):
+    """Delete empty (classic) load balancers in a specific region
+
+    Empty load balancers are collected first and checked against the region's
+    ProtectionIndex. Only if it is unavailable are their tags fetched with batched
+    describe_tags calls.
 
+    :param region: AWS region name
+    :param run: RunContext of the current invocation
+    """
+    tracker = run.tracker
+    elb = run.client('elb', region)
+
+    try:
+        empty_lbs = []
+        fingerprints = {}
+        # Classic ELB has no server-side filters: empty load balancers are picked from the listing
+        paginator = elb.get_paginator('describe_load_balancers')
+        for lb in paginator.paginate(PaginationConfig={'PageSize': ELB_PAGE_SIZE}).search(
+                f'LoadBalancerDescriptions[?length(Instances) == `0`].{LOAD_BALANCER_FIELDS}'):
+            lb_name = lb['LoadBalancerName']
+            fingerprints[lb_name] = load_balancer_fingerprint(lb)
+            empty_lbs.append(lb_name)
+    except Exception as e:
+        logger.error(f'Error describing load balancers in region {region}: {str(e)}')
+        return
+
+    lb_tags = None
+    if empty_lbs and run.protection.protected_resources(region) is None:
+        lb_tags = get_load_balancer_tags(elb, empty_lbs, region)
+
+    for lb_name in empty_lbs:
+        # Check protection tag
+        if lb_tags is None:
+            protected = run.protected(region, 'elasticloadbalancing', f'loadbalancer/{lb_name}')
+        elif lb_name in lb_tags:
+            protected = _has_protection_tag(lb_tags[lb_name])
+        else:
+            protected = None
+        if protected is None:
+            logger.warning(f'Tags of load balancer {lb_name} unknown, not deleting it')
+            tracker.add_notify('classic-elb', lb_name, region)
+            continue
+        if protected:
+            logger.info(f'Load balancer {lb_name} has protection tag, skipping')
+            continue
+
+        if not settings.dry_run:
+            run.submit(Mutation('classic-elb', lb_name, region,
+                                partial(elb.delete_load_balancer, LoadBalancerName=lb_name)))
+        else:
+            tracker.add_skipped('classic-elb', lb_name, region, 'delete_load_balancer')
+            run.planned('classic-elb', region, lb_name, 'delete_load_balancer', fingerprints[lb_name])
+            logger.info(f'DRY RUN: Would delete classic load balancer: {lb_name}')
+
+
+def get_load_balancer_tags(elb, lb_names, region):
+    """Get the tags of classic load balancers, ELB_DESCRIBE_TAGS_BATCH_SIZE names per call
+
+    :param elb: ELB client of the region
+    :param lb_names: List of load balancer names
+    :param region: AWS region name
+    :return: Dict of load balancer name to list of tag dicts; names whose batch failed are absent
+    """
+    lb_tags = {}
+    for batch in chunked(lb_names, ELB_DESCRIBE_TAGS_BATCH_SIZE):
+        try:
+            response = elb.describe_tags(LoadBalancerNames=batch)
+            for tag_desc in response.get('TagDescriptions', []):
+                lb_tags[tag_desc['LoadBalancerName']] = tag_desc.get('Tags', [])
         except Exception as e:
-            logger.error(f'Error describing load balancers in region {region}: {str(e)}')
+            logger.error(f'Error describing tags of {len(batch)} load balancers in region {region}: {str(e)}')
+    return lb_tags
 
 
 # Stop RDS instances
@@ -468,63 +862,73 @@ def stop_rds_instances(regions, tracker: ResourceTracker):
     :param tracker: ResourceTracker instance
     """
     logger.info("====== RDS Clusters/Instances ======")
+    run_phases(['rds'], regions, RunContext(tracker))
 
-    def stop_rds_in_region(region):
-        logger.info(f'Getting RDS clusters and instances in region: {region}')
-        rds = boto3.client('rds', region_name=region)
 
-        try:
-            paginator = rds.get_paginator('describe_db_clusters')
-            for page in paginator.paginate():
-                for cluster in page.get('DBClusters', []):
-                    if cluster['Status'] == 'available':
-                        cluster_id = cluster['DBClusterIdentifier']
-
-                        if not dry_run:
-                            try:
-                                rds.stop_db_cluster(DBClusterIdentifier=cluster_id)
-                                tracker.add_deleted('rds-cluster', cluster_id)
-                                logger.info(f'Stopped DB cluster: {cluster_id}')
-                            except Exception as e:
-                                logger.error(f'Failed to stop DB cluster {cluster_id}: {str(e)}')
-                                tracker.add_failed('rds-cluster', cluster_id)
-                        else:
-                            tracker.add_skipped('rds-cluster', cluster_id)
-                            logger.info(f'DRY RUN: Would stop DB cluster: {cluster_id}')
+def stop_rds_in_region(region, run: RunContext):
+    """Stop available RDS clusters and instances in a specific region
 
-        except Exception as e:
-            logger.error(f'Error describing DB clusters in region {region}: {str(e)}')
+    Instances that are members of a cluster (Aurora or Multi-AZ DB clusters) cannot be
+    stopped on their own; they stop with their cluster and are not submitted. Members
+    are known from the clusters' DBClusterMembers and from the instances' own
+    DBClusterIdentifier (the latter also covers cluster pages listed by an earlier
+    invocation of a resumed run).
 
-        try:
-            paginator = rds.get_paginator('describe_db_instances')
-            for page in paginator.paginate():
-                for instance in page.get('DBInstances', []):
-                    if instance['DBInstanceStatus'] == 'available':
-                        instance_id = instance['DBInstanceIdentifier']
-
-                        if not dry_run:
-                            try:
-                                rds.stop_db_instance(DBInstanceIdentifier=instance_id)
-                                tracker.add_deleted('rds-instance', instance_id)
-                                logger.info(f'Stopped DB instance: {instance_id}')
-                            except Exception as e:
-                                logger.error(f'Failed to stop DB instance {instance_id}: {str(e)}')
-                                tracker.add_failed('rds-instance', instance_id)
-                        else:
-                            tracker.add_skipped('rds-instance', instance_id)
-                            logger.info(f'DRY RUN: Would stop DB instance: {instance_id}')
+    :param region: AWS region name
+    :param run: RunContext of the current invocation
+    """
+    tracker = run.tracker
+    logger.info(f'Getting RDS clusters and instances in region: {region}')
+    rds = run.client('rds', region)
+    cluster_members = set()
 
-        except Exception as e:
-            logger.error(f'Error describing DB instances in region {region}: {str(e)}')
+    try:
+        paginator = rds.get_paginator('describe_db_clusters')
+        for cluster in run.search(f'rds-clusters:{region}', paginator, f'DBClusters[].{DB_CLUSTER_FIELDS}',
+                                  PaginationConfig={'PageSize': RDS_PAGE_SIZE}):
+            cluster_members.update(member['DBInstanceIdentifier'] for member in cluster.get('DBClusterMembers', []))
+            if cluster['Status'] == 'available':
+                cluster_id = cluster['DBClusterIdentifier']
+                if run.protected(region, 'rds', f'cluster:{cluster_id}', cluster.get('TagList', [])):
+                    logger.info(f'DB cluster {cluster_id} has protection tag, skipping')
+                    continue
 
-    with ThreadPoolExecutor(max_workers=5) as executor:
-        futures = [executor.submit(stop_rds_in_region, region) for region in regions]
-        for future in as_completed(futures):
-            try:
-                future.result()
-            except Exception as e:
-                logger.error(f'Error in RDS cleanup thread: {str(e)}')
+                if not settings.dry_run:
+                    run.submit(Mutation('rds-cluster', cluster_id, region,
+                                        partial(rds.stop_db_cluster, DBClusterIdentifier=cluster_id)))
+                else:
+                    tracker.add_skipped('rds-cluster', cluster_id, region, 'stop_db_cluster')
+                    run.planned('rds-cluster', region, cluster_id, 'stop_db_cluster',
+                                db_cluster_fingerprint(cluster))
+                    logger.info(f'DRY RUN: Would stop DB cluster: {cluster_id}')
+
+    except Exception as e:
+        logger.error(f'Error describing DB clusters in region {region}: {str(e)}')
+
+    try:
+        paginator = rds.get_paginator('describe_db_instances')
+        for instance in run.search(f'rds-instances:{region}', paginator, f'DBInstances[].{DB_INSTANCE_FIELDS}',
+                                   PaginationConfig={'PageSize': RDS_PAGE_SIZE}):
+            if instance['DBInstanceStatus'] == 'available':
+                instance_id = instance['DBInstanceIdentifier']
+                if instance.get('DBClusterIdentifier') or instance_id in cluster_members:
+                    logger.debug(f'DB instance {instance_id} is a cluster member, stopped with its cluster')
+                    continue
+                if run.protected(region, 'rds', f'db:{instance_id}', instance.get('TagList', [])):
+                    logger.info(f'DB instance {instance_id} has protection tag, skipping')
+                    continue
 
+                if not settings.dry_run:
+                    run.submit(Mutation('rds-instance', instance_id, region,
+                                        partial(rds.stop_db_instance, DBInstanceIdentifier=instance_id)))
+                else:
+                    tracker.add_skipped('rds-instance', instance_id, region, 'stop_db_instance')
+                    run.planned('rds-instance', region, instance_id, 'stop_db_instance',
+                                db_instance_fingerprint(instance))
+                    logger.info(f'DRY RUN: Would stop DB instance: {instance_id}')
+
+    except Exception as e:
+        logger.error(f'Error describing DB instances in region {region}: {str(e)}')
 
 
 # Scale in EKS nodegroups
@@ -536,62 +940,79 @@ def scale_in_eks_nodegroups(regions, tracker: ResourceTracker):
     :param tracker: ResourceTracker instance
     """
     logger.info("====== EKS Node Groups ======")
+    run_phases(['eks-nodegroup'], regions, RunContext(tracker))
 
-    def scale_in_eks_nodegroups_in_region(region):
-        logger.info(f'Getting EKS clusters in region {region}')
-        eks = boto3.client('eks', region_name=region)
 
-        try:
-            paginator = eks.get_paginator('list_clusters')
-            for page in paginator.paginate():
-                for cluster in page.get('clusters', []):
-                    try:
-                        ng_paginator = eks.get_paginator('list_nodegroups')
-                        for ng_page in ng_paginator.paginate(clusterName=cluster):
-                            for ng in ng_page.get('nodegroups', []):
-                                try:
-                                    node_group_info = eks.describe_nodegroup(
-                                        clusterName=cluster, nodegroupName=ng)
-                                    scaling_config = node_group_info['nodegroup']['scalingConfig']
-                                    current_desired = scaling_config.get('desiredSize', 0)
-
-                                    if current_desired > 0:
-                                        if not dry_run:
-                                            try:
-                                                eks.update_nodegroup_config(
-                                                    clusterName=cluster,
-                                                    nodegroupName=ng,
-                                                    scalingConfig={
-                                                        'minSize': 0,
-                                                        'desiredSize': 0,
-                                                        'maxSize': scaling_config.get('maxSize', 0)
-                                                    }
-                                                )
-                                                tracker.add_deleted('eks-nodegroup', f'{cluster}/{ng}')
-                                                logger.info(f'Scaled down node group {ng} in cluster {cluster}')
-                                            except Exception as e:
-                                                logger.error(f'Failed to scale node group {ng} in cluster {cluster}: {str(e)}')
-                                                tracker.add_failed('eks-nodegroup', f'{cluster}/{ng}')
-                                        else:
-                                            tracker.add_skipped('eks-nodegroup', f'{cluster}/{ng}')
-                                            logger.info(f'DRY RUN: Would scale down node group {ng} in cluster {cluster}')
-
-                                except Exception as e:
-                                    logger.error(f'Error describing nodegroup {ng} in cluster {cluster}: {str(e)}')
-
-                    except Exception as e:
-                        logger.error(f'Error listing nodegroups for cluster {cluster}: {str(e)}')
+def scale_in_eks_nodegroups_in_region(region, run: RunContext):
+    """Scale-in EKS nodegroups to 0 in a specific region
 
-        except Exception as e:
-            logger.error(f'Error listing clusters in region {region}: {str(e)}')
+    Nodegroups are listed and described on an eks_executor() pool: while one
+    cluster's nodegroups are evaluated, the nodegroups of the next clusters are already
+    being listed and described. Mutations are queued in cluster order, so a run resumed
+    after the time budget ran out continues with the first unfinished cluster.
+    Nodegroups already at desiredSize 0 or carrying the protection tag are skipped.
 
-    with ThreadPoolExecutor(max_workers=5) as executor:
-        futures = [executor.submit(scale_in_eks_nodegroups_in_region, region) for region in regions]
-        for future in as_completed(futures):
+    :param region: AWS region name
+    :param run: RunContext of the current invocation
+    """
+    tracker = run.tracker
+    logger.info(f'Getting EKS clusters in region {region}')
+    eks = run.client('eks', region)
+
+    try:
+        clusters = run.eks_clusters.clusters(region)
+    except Exception as e:
+        logger.error(f'Error listing clusters in region {region}: {str(e)}')
+        return
+
+    # Work prefetched for clusters past an exhausted time budget is dropped when the pool shuts down
+    with eks_executor() as executor:
+        def describe_nodegroups(cluster):
+            # Describes go to the same pool; nothing on the pool waits for them, only the unit's thread
+            names = eks.get_paginator('list_nodegroups').paginate(
+                clusterName=cluster, PaginationConfig={'PageSize': EKS_PAGE_SIZE}).search('nodegroups')
+            return [(ng, executor.submit(eks.describe_nodegroup, clusterName=cluster, nodegroupName=ng))
+                    for ng in names]
+
+        for cluster, listing in run.prefetched(f'eks-clusters:{region}', clusters,
+                                               partial(executor.submit, describe_nodegroups), EKS_WORKERS):
             try:
-                future.result()
+                nodegroups = listing.result()
             except Exception as e:
-                logger.error(f'Error in EKS cleanup thread: {str(e)}')
+                logger.error(f'Error listing nodegroups for cluster {cluster}: {str(e)}')
+                continue
+
+            for ng, described in nodegroups:
+                try:
+                    nodegroup = described.result()['nodegroup']
+                except Exception as e:
+                    logger.error(f'Error describing nodegroup {ng} in cluster {cluster}: {str(e)}')
+                    continue
+
+                scaling_config = nodegroup['scalingConfig']
+                if scaling_config.get('desiredSize', 0) == 0:
+                    continue
+                if _has_protection_tag([{'Key': key, 'Value': value}
+                                        for key, value in nodegroup.get('tags', {}).items()]):
+                    logger.info(f'Node group {ng} in cluster {cluster} has protection tag, skipping')
+                    continue
+
+                if not settings.dry_run:
+                    run.submit(Mutation('eks-nodegroup', f'{cluster}/{ng}', region, partial(
+                        eks.update_nodegroup_config,
+                        clusterName=cluster,
+                        nodegroupName=ng,
+                        scalingConfig={
+                            'minSize': 0,
+                            'desiredSize': 0,
+                            'maxSize': scaling_config.get('maxSize', 0)
+                        }
+                    )))
+                else:
+                    tracker.add_skipped('eks-nodegroup', f'{cluster}/{ng}', region, 'update_nodegroup_config')
+                    run.planned('eks-nodegroup', region, f'{cluster}/{ng}', 'update_nodegroup_config',
+                                nodegroup_fingerprint(nodegroup))
+                    logger.info(f'DRY RUN: Would scale down node group {ng} in cluster {cluster}')
 
 
 # Delete Kinesis Streams
@@ -603,48 +1024,55 @@ def delete_kinesis_stream(regions, tracker: ResourceTracker):
     :param tracker: ResourceTracker instance
     """
     logger.info("====== Kinesis Streams ======")
+    run_phases(['kinesis-stream'], regions, RunContext(tracker))
 
-    def delete_kinesis_stream_in_region(region):
-        logger.info(f'Getting all Kinesis streams in the region: {region}')
-        kinesis_client = boto3.client('kinesis', region_name=region)
 
-        try:
-            paginator = kinesis_client.get_paginator('list_streams')
-            for page in paginator.paginate():
-                for streamName in page.get('StreamNames', []):
-                    try:
-                        if streamName.startswith("upsolver_"):
-                            tracker.add_notify("kinesis", streamName)
-                            logger.info(f'Skipped upsolver stream: {streamName}')
+def delete_kinesis_stream_in_region(region, run: RunContext):
+    """Delete Kinesis streams in a specific region
+
+    :param region: AWS region name
+    :param run: RunContext of the current invocation
+    """
+    tracker = run.tracker
+    logger.info(f'Getting all Kinesis streams in the region: {region}')
+    kinesis_client = run.client('kinesis', region)
+
+    try:
+        paginator = kinesis_client.get_paginator('list_streams')
+        for page in run.paginate(f'kinesis-streams:{region}', paginator,
+                                 PaginationConfig={'PageSize': KINESIS_PAGE_SIZE}):
+            summaries = {summary['StreamName']: summary for summary in page.get('StreamSummaries', [])}
+            for streamName in page.get('StreamNames', []):
+                try:
+                    if streamName.startswith("upsolver_"):
+                        tracker.add_notify("kinesis", streamName, region)
+                        logger.info(f'Skipped upsolver stream: {streamName}')
+                        continue
+
+                    protected = run.protected(region, 'kinesis', f'stream/{streamName}')
+                    if protected is None:
+                        protected = _has_protection_tag(
+                            kinesis_client.list_tags_for_stream(StreamName=streamName).get('Tags', []))
+                    if protected:
+                        logger.info(f'Kinesis stream {streamName} has protection tag, skipping')
+                    else:
+                        if not settings.dry_run:
+                            run.submit(Mutation("kinesis-stream", streamName, region, partial(
+                                kinesis_client.delete_stream,
+                                StreamName=streamName,
+                                EnforceConsumerDeletion=True
+                            )))
                         else:
-                            if not dry_run:
-                                try:
-                                    kinesis_client.delete_stream(
-                                        StreamName=streamName,
-                                        EnforceConsumerDeletion=True
-                                    )
-                                    tracker.add_deleted("kinesis-stream", streamName)
-                                    logger.info(f'Deleted Kinesis stream: {streamName}')
-                                except Exception as e:
-                                    logger.error(f'Failed to delete kinesis stream {streamName}: {str(e)}')
-                                    tracker.add_failed("kinesis-stream", streamName)
-                            else:
-                                tracker.add_skipped("kinesis-stream", streamName)
-                                logger.info(f'DRY RUN: Would delete Kinesis stream: {streamName}')
-
-                    except Exception as e:
-                        logger.error(f'Error processing kinesis stream {streamName}: {str(e)}')
+                            tracker.add_skipped("kinesis-stream", streamName, region, 'delete_stream')
+                            run.planned("kinesis-stream", region, streamName, 'delete_stream',
+                                        stream_fingerprint(summaries.get(streamName)))
+                            logger.info(f'DRY RUN: Would delete Kinesis stream: {streamName}')
 
-        except Exception as e:
-            logger.error(f'Error listing kinesis streams in region {region}: {str(e)}')
+                except Exception as e:
+                    logger.error(f'Error processing kinesis stream {streamName}: {str(e)}')
 
-    with ThreadPoolExecutor(max_workers=5) as executor:
-        futures = [executor.submit(delete_kinesis_stream_in_region, region) for region in regions]
-        for future in as_completed(futures):
-            try:
-                future.result()
-            except Exception as e:
-                logger.error(f'Error in Kinesis cleanup thread: {str(e)}')
+    except Exception as e:
+        logger.error(f'Error listing kinesis streams in region {region}: {str(e)}')
 
 
 # Delete MSK clusters
@@ -656,47 +1084,49 @@ def delete_msk_clusters(regions, tracker: ResourceTracker):
     :param tracker: ResourceTracker instance
     """
     logger.info("====== MSK Clusters ======")
+    run_phases(['msk-cluster'], regions, RunContext(tracker))
 
-    def delete_msk_in_region(region):
-        logger.info(f'Getting all MSK clusters in the region: {region}')
-        kafka_client = boto3.client('kafka', region_name=region)
 
-        try:
-            paginator = kafka_client.get_paginator('list_clusters')
-            for page in paginator.paginate():
-                for cluster in page.get('ClusterInfoList', []):
-                    cluster_arn = cluster.get('ClusterArn')
-                    cluster_name = cluster.get('ClusterName')
-                    cluster_state = cluster.get('State', '')
-
-                    # Only delete clusters in ACTIVE state
-                    if cluster_state not in ('ACTIVE',):
-                        logger.info(f'MSK cluster {cluster_name} in state {cluster_state}, skipping')
-                        continue
+def delete_msk_in_region(region, run: RunContext):
+    """Delete ACTIVE MSK (Kafka) clusters in a specific region
 
-                    if not dry_run:
-                        try:
-                            kafka_client.delete_cluster(ClusterArn=cluster_arn)
-                            tracker.add_deleted("msk-cluster", cluster_name)
-                            logger.info(f'Deleted MSK cluster: {cluster_name}')
-                        except Exception as e:
-                            logger.error(f'Failed to delete MSK cluster {cluster_name}: {str(e)}')
-                            tracker.add_failed("msk-cluster", cluster_name)
-                    else:
-                        tracker.add_skipped("msk-cluster", cluster_name)
-                        logger.info(f'DRY RUN: Would delete MSK cluster: {cluster_name}')
-
-        except Exception as e:
-            logger.error(f'Error listing MSK clusters in region {region}: {str(e)}')
+    :param region: AWS region name
+    :param run: RunContext of the current invocation
+    """
+    tracker = run.tracker
+    logger.info(f'Getting all MSK clusters in the region: {region}')
+    kafka_client = run.client('kafka', region)
 
-    with ThreadPoolExecutor(max_workers=5) as executor:
-        futures = [executor.submit(delete_msk_in_region, region) for region in regions]
-        for future in as_completed(futures):
-            try:
-                future.result()
-            except Exception as e:
-                logger.error(f'Error in MSK cleanup thread: {str(e)}')
+    try:
+        paginator = kafka_client.get_paginator('list_clusters')
+        for cluster in run.search(f'msk-clusters:{region}', paginator, f'ClusterInfoList[].{MSK_CLUSTER_FIELDS}',
+                                  PaginationConfig={'PageSize': MSK_PAGE_SIZE}):
+            cluster_arn = cluster.get('ClusterArn')
+            cluster_name = cluster.get('ClusterName')
+            cluster_state = cluster.get('State', '')
+
+            # Only delete clusters in ACTIVE state
+            if cluster_state not in ('ACTIVE',):
+                logger.info(f'MSK cluster {cluster_name} in state {cluster_state}, skipping')
+                continue
+
+            # list_clusters returns the tags as a dict
+            tags = [{'Key': key, 'Value': value} for key, value in cluster.get('Tags', {}).items()]
+            if run.protected(region, 'kafka', cluster_arn.split(':', 5)[-1], tags):
+                logger.info(f'MSK cluster {cluster_name} has protection tag, skipping')
+                continue
+
+            if not settings.dry_run:
+                run.submit(Mutation("msk-cluster", cluster_name, region,
+                                    partial(kafka_client.delete_cluster, ClusterArn=cluster_arn),
+                                    verify_id=cluster_arn))
+            else:
+                tracker.add_skipped("msk-cluster", cluster_name, region, 'delete_cluster')
+                run.planned("msk-cluster", region, cluster_arn, 'delete_cluster', msk_cluster_fingerprint(cluster))
+                logger.info(f'DRY RUN: Would delete MSK cluster: {cluster_name}')
 
+    except Exception as e:
+        logger.error(f'Error listing MSK clusters in region {region}: {str(e)}')
 
 
 # Delete OpenSearch domains
@@ -708,146 +1138,698 @@ def delete_domain(regions, tracker: ResourceTracker):
     :param tracker: ResourceTracker instance
     """
     logger.info("====== OpenSearch domains ======")
+    run_phases(['opensearch-domain'], regions, RunContext(tracker))
 
-    def delete_domain_in_region(region):
-        logger.info(f'Getting all OpenSearch domains in the region: {region}')
-        domain_client = boto3.client('opensearch', region_name=region)
-
-        try:
-            response = domain_client.list_domain_names(EngineType='OpenSearch')
 
-            for domain_info in response.get('DomainNames', []):
-                domain_name = domain_info.get('DomainName')
+def delete_domain_in_region(region, run: RunContext):
+    """Delete OpenSearch domains that are not in a transitional state in a specific region
 
-                # Check domain is not in a transitional state
-                try:
-                    domain_status = domain_client.describe_domain(DomainName=domain_name)
-                    if domain_status['DomainStatus'].get('Processing', False):
-                        logger.info(f'OpenSearch domain {domain_name} is processing, skipping')
-                        continue
-                    if domain_status['DomainStatus'].get('Deleted', False):
-                        logger.info(f'OpenSearch domain {domain_name} already deleting, skipping')
-                        continue
-                except Exception as e:
-                    logger.warning(f'Error checking domain status for {domain_name}: {str(e)}')
-                    continue
+    Domain states are read with describe_domains, OPENSEARCH_DESCRIBE_BATCH_SIZE names
+    per call, and the protection tag from the region's ProtectionIndex (list_tags per
+    domain only if the index is unavailable). Deletes are queued on the mutation
+    pipeline, which runs at most MUTATION_LIMITS['opensearch-domain'] of them at a time
+    per region.
 
-                if not dry_run:
-                    try:
-                        domain_client.delete_domain(DomainName=domain_name)
-                        tracker.add_deleted("opensearch-domain", domain_name)
-                        logger.info(f'Deleted OpenSearch domain: {domain_name}')
-                    except Exception as e:
-                        logger.error(f'Failed to delete OpenSearch domain {domain_name}: {str(e)}')
-                        tracker.add_failed("opensearch-domain", domain_name)
-                else:
-                    tracker.add_skipped("opensearch-domain", domain_name)
-                    logger.info(f'DRY RUN: Would delete OpenSearch domain: {domain_name}')
+    :param region: AWS region name
+    :param run: RunContext of the current invocation
+    """
+    tracker = run.tracker
+    logger.info(f'Getting all OpenSearch domains in the region: {region}')
+    domain_client = run.client('opensearch', region)
 
-        except Exception as e:
-            logger.error(f'Error listing OpenSearch domains in region {region}: {str(e)}')
+    try:
+        response = domain_client.list_domain_names(EngineType='OpenSearch')
 
-    with ThreadPoolExecutor(max_workers=5) as executor:
-        futures = [executor.submit(delete_domain_in_region, region) for region in regions]
-        for future in as_completed(futures):
+        domain_names = sorted(domain_info.get('DomainName') for domain_info in response.get('DomainNames', []))
+        positions = {domain_name: index for index, domain_name in enumerate(domain_names)}
+        statuses = {}
+        for domain_name in run.resumable(f'opensearch-domains:{region}', domain_names):
+            # Check domain is not in a transitional state
             try:
-                future.result()
+                if domain_name not in statuses:
+                    batch = domain_names[positions[domain_name]:positions[domain_name] + OPENSEARCH_DESCRIBE_BATCH_SIZE]
+                    response = domain_client.describe_domains(DomainNames=batch)
+                    statuses.update({status['DomainName']: status for status in response.get('DomainStatusList', [])})
+                    # Domains deleted since the listing are not returned
+                    statuses.update({name: None for name in batch if name not in statuses})
+                domain_status = statuses[domain_name]
+                if domain_status is None:
+                    logger.info(f'OpenSearch domain {domain_name} no longer exists, skipping')
+                    continue
+                if domain_status.get('Processing', False):
+                    logger.info(f'OpenSearch domain {domain_name} is processing, skipping')
+                    continue
+                if domain_status.get('Deleted', False):
+                    logger.info(f'OpenSearch domain {domain_name} already deleting, skipping')
+                    continue
+                protected = run.protected(region, 'es', f'domain/{domain_name}')
+                if protected is None:
+                    protected = _has_protection_tag(
+                        domain_client.list_tags(ARN=domain_status['ARN']).get('TagList', []))
+                if protected:
+                    logger.info(f'OpenSearch domain {domain_name} has protection tag, skipping')
+                    continue
             except Exception as e:
-                logger.error(f'Error in OpenSearch cleanup thread: {str(e)}')
+                logger.warning(f'Error checking domain status for {domain_name}: {str(e)}')
+                continue
+
+            if not settings.dry_run:
+                run.submit(Mutation("opensearch-domain", domain_name, region,
+                                    partial(domain_client.delete_domain, DomainName=domain_name)))
+            else:
+                tracker.add_skipped("opensearch-domain", domain_name, region, 'delete_domain')
+                run.planned("opensearch-domain", region, domain_name, 'delete_domain',
+                            domain_fingerprint(domain_status))
+                logger.info(f'DRY RUN: Would delete OpenSearch domain: {domain_name}')
+
+    except Exception as e:
+        logger.error(f'Error listing OpenSearch domains in region {region}: {str(e)}')
+
 
 # Tag instances with CreatedOn date
 
-def tag_instances(regions, tracker: ResourceTracker):
+def tag_instances(regions, tracker: ResourceTracker, inventory: Optional[InstanceInventory] = None):
     """Add "CreatedOn" tag on resources
 
     :param regions: List of AWS region names
     :param tracker: ResourceTracker instance
+    :param inventory: Shared InstanceInventory (a private one is created if omitted)
     """
     logger.info("====== Tagging Instances ======")
+    run_phases(['ec2-tagging'], regions, RunContext(tracker, inventory))
 
-    def process_instance(instance, ec2_specific_region, config_specific_region):
-        # Ignore spot instances
-        if instance.get('InstanceLifecycle') == 'spot':
+
+def tag_instances_in_region(region, run: RunContext):
+    """Add "CreatedOn" tag on instances in a specific region
+
+    Creation dates come from one bulk AWS Config query per region; only instances missing
+    from it (and not already found without history by the previous run) are looked up
+    individually. The tag writes are then grouped by date so
+    instances created on the same day are tagged with a single create_tags call.
+
+    :param region: AWS region name
+    :param run: RunContext of the current invocation
+    """
+    tracker = run.tracker
+
+    def get_created_on(instance_id):
+        try:
+            created_on = run.creation_times.resolve(region, instance_id)
+            if created_on:
+                logger.info(f'Instance {instance_id} created on {created_on}')
+                return instance_id, created_on
+            run.snapshot.record('ec2-instance', region, instance_id, 'untagged', '', NO_CONFIG_HISTORY)
+        except Exception as e:
+            logger.error(f'Error getting creation time of instance {instance_id}: {str(e)}')
+        return None
+
+    logger.info(f'Getting instances in region: {region}')
+    config_specific_region = run.client('config', region)
+
+    try:
+        # Check if there are discovered resources in AWS Config
+        response = config_specific_region.get_discovered_resource_counts()
+        if response.get('totalDiscoveredResources', 0) == 0:
+            return
+
+        # Ignore spot instances and instances that already carry the tag
+        untagged = [instance.instance_id for instance in run.inventory.instances(region)
+                    if not instance.is_spot and not instance.has_tag("CreatedOn")]
+        if not untagged:
             return
 
-        # Skip instance if tag already present
-        if "Tags" in instance:
-            for tag in instance["Tags"]:
-                if tag["Key"] == "CreatedOn":
-                    return
+        known_dates = run.creation_times.creation_dates(region)
+        tag_writes = [(instance_id, known_dates[instance_id]) for instance_id in untagged if instance_id in known_dates]
+        # Instances whose Config history was empty last run are not looked up again
+        misses = [instance_id for instance_id in untagged if instance_id not in known_dates
+                  and run.snapshot.lookup('ec2-instance', region, instance_id, 'untagged', '') != NO_CONFIG_HISTORY]
+        if misses:
+            logger.info(f'{len(misses)} instances in region {region} not found in Config query, '
+                        f'looking up their history individually')
+
+        with ThreadPoolExecutor(max_workers=TAGGING_WORKERS) as executor:
+            futures = [executor.submit(get_created_on, instance_id) for instance_id in misses]
+            for future in as_completed(futures):
+                try:
+                    result = future.result()
+                    if result:
+                        tag_writes.append(result)
+                except Exception as e:
+                    logger.error(f'Error in tagging thread: {str(e)}')
+
+    except Exception as e:
+        logger.error(f'Error processing instances in region {region}: {str(e)}')
+        return
+
+    for created_on, instance_ids in group_by_value(tag_writes).items():
+        # Create tag on instances
+        if not settings.dry_run:
+            def on_tagged(tagged, created_on=created_on):
+                logger.info(f'Tagged instances {str(tagged)} with CreatedOn: {created_on}')
 
-        instance_id = instance["InstanceId"]
+            def on_failed(instance_id, error):
+                logger.error(f'Error tagging instance {instance_id}: {str(error)}')
+                tracker.add_failed('ec2-tagging', instance_id, region, 'create_tags')
+
+            apply_in_batches(partial(create_tags, tags=[{'Key': 'CreatedOn', 'Value': created_on}], region=region,
+                                     credentials=run.credentials),
+                             instance_ids, CREATE_TAGS_BATCH_SIZE, on_tagged, on_failed)
+        else:
+            logger.info(f'DRY RUN: Would tag instances {str(instance_ids)} with CreatedOn: {created_on}')
+
+
+# Verify mutations
+
+def get_db_cluster_states(region, cluster_ids, credentials=None):
+    """Get the status of RDS clusters with one filtered describe call per page
+
+    :param region: AWS region name
+    :param cluster_ids: List of DB cluster identifiers
+    :param credentials: Credentials of the account, None for the Lambda's own
+    :return: Dict of cluster identifier to status
+    """
+    rds = get_client('rds', region_name=region, credentials=credentials)
+    states = {}
+    paginator = rds.get_paginator('describe_db_clusters')
+    for cluster_id, status in paginator.paginate(Filters=[{'Name': 'db-cluster-id', 'Values': cluster_ids}],
+                                                 PaginationConfig={'PageSize': RDS_PAGE_SIZE}).search(
+                                                     'DBClusters[].[DBClusterIdentifier, Status]'):
+        states[cluster_id] = status
+    return states
+
+
+def get_db_instance_states(region, instance_ids, credentials=None):
+    """Get the status of RDS instances with one filtered describe call per page
+
+    :param region: AWS region name
+    :param instance_ids: List of DB instance identifiers
+    :param credentials: Credentials of the account, None for the Lambda's own
+    :return: Dict of instance identifier to status
+    """
+    rds = get_client('rds', region_name=region, credentials=credentials)
+    states = {}
+    paginator = rds.get_paginator('describe_db_instances')
+    for instance_id, status in paginator.paginate(Filters=[{'Name': 'db-instance-id', 'Values': instance_ids}],
+                                                  PaginationConfig={'PageSize': RDS_PAGE_SIZE}).search(
+                                                      'DBInstances[].[DBInstanceIdentifier, DBInstanceStatus]'):
+        states[instance_id] = status
+    return states
+
+
+def get_msk_cluster_states(region, cluster_arns, credentials=None):
+    """Get the state of MSK clusters from one listing of the region
+
+    :param region: AWS region name
+    :param cluster_arns: List of cluster ARNs
+    :param credentials: Credentials of the account, None for the Lambda's own
+    :return: Dict of cluster ARN to state (clusters already gone are absent)
+    """
+    kafka_client = get_client('kafka', region_name=region, credentials=credentials)
+    wanted = set(cluster_arns)
+    states = {}
+    paginator = kafka_client.get_paginator('list_clusters')
+    for cluster_arn, state in paginator.paginate(PaginationConfig={'PageSize': MSK_PAGE_SIZE}).search(
+            "ClusterInfoList[].[ClusterArn, State || '']"):
+        if cluster_arn in wanted:
+            states[cluster_arn] = state
+    return states
+
+
+def get_nodegroup_states(region, nodegroup_ids, credentials=None):
+    """Get the scaling state of EKS nodegroups, describing them concurrently
+
+    EKS has no batched nodegroup describe, so the calls of one poll run on an eks_executor() pool.
+
+    :param region: AWS region name
+    :param nodegroup_ids: List of "cluster/nodegroup" ids
+    :param credentials: Credentials of the account, None for the Lambda's own
+    :return: Dict of id to 'SCALED_IN' once the nodegroup is ACTIVE with no desired nodes,
+             otherwise its status (deleted nodegroups are absent)
+    """
+    eks = get_client('eks', region_name=region, credentials=credentials)
+
+    def describe(nodegroup_id):
+        cluster, ng = nodegroup_id.split('/', 1)
         try:
-            response = config_specific_region.get_resource_config_history(
-                resourceType='AWS::EC2::Instance',
-                resourceId=instance_id)
+            nodegroup = eks.describe_nodegroup(clusterName=cluster, nodegroupName=ng)['nodegroup']
+        except eks.exceptions.ResourceNotFoundException:
+            return nodegroup_id, None
+        status = nodegroup.get('status', '')
+        if status == 'ACTIVE' and nodegroup.get('scalingConfig', {}).get('desiredSize', 0) == 0:
+            status = 'SCALED_IN'
+        return nodegroup_id, status
 
-            if response.get('configurationItems'):
-                created_on = response['configurationItems'][0]['resourceCreationTime']
-                created_on = created_on.strftime("%d/%m/%Y")
-                logger.info(f'Instance {instance_id} created on {created_on}')
+    with eks_executor() as executor:
+        results = executor.map(describe, nodegroup_ids)
+        return {nodegroup_id: status for nodegroup_id, status in results if status is not None}
+
+
+# Apply a saved plan: batched re-validation of the planned resources, then their actions
+
+def get_instance_fingerprints(region, instance_ids, run: RunContext, fingerprint_of=instance_fingerprint):
+    """Get the current fingerprint of EC2 instances with one filtered describe call per page
+
+    :param region: AWS region name
+    :param instance_ids: List of instance ids
+    :param run: RunContext of the current invocation
+    :param fingerprint_of: Fingerprint function of the planned action
+    :return: Dict of instance id to fingerprint (instances already gone are absent)
+    """
+    ec2 = run.client('ec2', region)
+    fingerprints = {}
+    paginator = ec2.get_paginator('describe_instances')
+    for instance in paginator.paginate(Filters=[{'Name': 'instance-id', 'Values': instance_ids}],
+                                       PaginationConfig={'PageSize': EC2_PAGE_SIZE}).search(INSTANCE_FIELDS):
+        record = to_instance_record(instance)
+        fingerprints[record.instance_id] = fingerprint_of(record)
+    return fingerprints
+
+
+def get_address_fingerprints(region, allocation_ids, run: RunContext):
+    ec2 = run.client('ec2', region)
+    response = ec2.describe_addresses(Filters=[{'Name': 'allocation-id', 'Values': allocation_ids}])
+    return {address['AllocationId']: address_fingerprint(address)
+            for address in jmespath.search(f'Addresses[].{ADDRESS_FIELDS}', response)}
+
+
+def get_volume_fingerprints(region, volume_ids, run: RunContext):
+    ec2 = run.client('ec2', region)
+    fingerprints = {}
+    paginator = ec2.get_paginator('describe_volumes')
+    for volume in paginator.paginate(Filters=[{'Name': 'volume-id', 'Values': volume_ids}],
+                                     PaginationConfig={'PageSize': EBS_PAGE_SIZE}).search(f'Volumes[].{VOLUME_FIELDS}'):
+        fingerprints[volume['VolumeId']] = volume_fingerprint(volume)
+    return fingerprints
+
+
+def get_load_balancer_fingerprints(region, lb_names, run: RunContext):
+    # describe_load_balancers fails a whole call over one missing name; a listing does not
+    elb = run.client('elb', region)
+    wanted = set(lb_names)
+    fingerprints = {}
+    paginator = elb.get_paginator('describe_load_balancers')
+    for lb in paginator.paginate(PaginationConfig={'PageSize': ELB_PAGE_SIZE}).search(
+            f'LoadBalancerDescriptions[].{LOAD_BALANCER_FIELDS}'):
+        if lb['LoadBalancerName'] in wanted:
+            fingerprints[lb['LoadBalancerName']] = load_balancer_fingerprint(lb)
+    return fingerprints
+
+
+def get_db_cluster_fingerprints(region, cluster_ids, run: RunContext):
+    rds = run.client('rds', region)
+    fingerprints = {}
+    paginator = rds.get_paginator('describe_db_clusters')
+    for cluster in paginator.paginate(Filters=[{'Name': 'db-cluster-id', 'Values': cluster_ids}],
+                                      PaginationConfig={'PageSize': RDS_PAGE_SIZE}).search(
+                                          f'DBClusters[].{DB_CLUSTER_FIELDS}'):
+        fingerprints[cluster['DBClusterIdentifier']] = db_cluster_fingerprint(cluster)
+    return fingerprints
+
+
+def get_db_instance_fingerprints(region, instance_ids, run: RunContext):
+    rds = run.client('rds', region)
+    fingerprints = {}
+    paginator = rds.get_paginator('describe_db_instances')
+    for instance in paginator.paginate(Filters=[{'Name': 'db-instance-id', 'Values': instance_ids}],
+                                       PaginationConfig={'PageSize': RDS_PAGE_SIZE}).search(
+                                           f'DBInstances[].{DB_INSTANCE_FIELDS}'):
+        fingerprints[instance['DBInstanceIdentifier']] = db_instance_fingerprint(instance)
+    return fingerprints
+
+
+def get_nodegroup_fingerprints(region, nodegroup_ids, run: RunContext):
+    # EKS has no batched nodegroup describe, so the calls of one batch run on an eks_executor() pool
+    eks = run.client('eks', region)
+
+    def describe(nodegroup_id):
+        cluster, ng = nodegroup_id.split('/', 1)
+        try:
+            return nodegroup_id, nodegroup_fingerprint(
+                eks.describe_nodegroup(clusterName=cluster, nodegroupName=ng)['nodegroup'])
+        except eks.exceptions.ResourceNotFoundException:
+            return nodegroup_id, None
+
+    with eks_executor() as executor:
+        results = executor.map(describe, nodegroup_ids)
+        return {nodegroup_id: value for nodegroup_id, value in results if value is not None}
+
+
+def get_stream_fingerprints(region, stream_names, run: RunContext):
+    kinesis_client = run.client('kinesis', region)
+    wanted = set(stream_names)
+    fingerprints = {}
+    paginator = kinesis_client.get_paginator('list_streams')
+    for page in paginator.paginate(PaginationConfig={'PageSize': KINESIS_PAGE_SIZE}):
+        summaries = {summary['StreamName']: summary for summary in page.get('StreamSummaries', [])}
+        for stream_name in page.get('StreamNames', []):
+            if stream_name in wanted:
+                fingerprints[stream_name] = stream_fingerprint(summaries.get(stream_name))
+    return fingerprints
+
+
+def get_msk_cluster_fingerprints(region, cluster_arns, run: RunContext):
+    kafka_client = run.client('kafka', region)
+    wanted = set(cluster_arns)
+    fingerprints = {}
+    paginator = kafka_client.get_paginator('list_clusters')
+    for cluster in paginator.paginate(PaginationConfig={'PageSize': MSK_PAGE_SIZE}).search(
+            f'ClusterInfoList[].{MSK_CLUSTER_FIELDS}'):
+        if cluster['ClusterArn'] in wanted:
+            fingerprints[cluster['ClusterArn']] = msk_cluster_fingerprint(cluster)
+    return fingerprints
+
+
+def get_domain_fingerprints(region, domain_names, run: RunContext):
+    domain_client = run.client('opensearch', region)
+    response = domain_client.describe_domains(DomainNames=domain_names)
+    return {status['DomainName']: domain_fingerprint(status) for status in response.get('DomainStatusList', [])}
+
+
+def submit_planned(kind, service, operation, id_param, **params):
+    """Get a PlanKind apply function queueing one mutation per resource on the pipeline
+
+    :param kind: Tracker category
+    :param service: boto3 service name
+    :param operation: Client method issuing the action (e.g. 'delete_volume')
+    :param id_param: Name of the parameter taking the resource id
+    :param params: Other parameters of the call
+    """
+    def apply(region, resource_ids, run: RunContext):
+        call = getattr(run.client(service, region), operation)
+        for resource_id in resource_ids:
+            run.submit(Mutation(kind, resource_id, region, partial(call, **{id_param: resource_id}, **params)))
+    return apply
 
-                # Create tag on instance
-                if not dry_run:
-                    ec2_specific_region.create_tags(
-                        Resources=[instance_id],
-                        Tags=[{'Key': 'CreatedOn', 'Value': created_on}]
-                    )
-                    logger.info(f'Tagged instance {instance_id} with CreatedOn: {created_on}')
-                else:
-                    logger.info(f'DRY RUN: Would tag instance {instance_id} with CreatedOn: {created_on}')
 
+def scale_in_planned_nodegroups(region, nodegroup_ids, run: RunContext):
+    eks = run.client('eks', region)
+    for nodegroup_id in nodegroup_ids:
+        cluster, ng = nodegroup_id.split('/', 1)
+        # maxSize is left as it is
+        run.submit(Mutation('eks-nodegroup', nodegroup_id, region, partial(
+            eks.update_nodegroup_config, clusterName=cluster, nodegroupName=ng,
+            scalingConfig={'minSize': 0, 'desiredSize': 0})))
+
+
+def apply_planned_in_region(region, entries: List["PlanEntry"], run: RunContext):
+    """Apply the planned actions of one resource kind in a specific region
+
+    The resources are described again in batches of the kind's batch_size. Those whose
+    fingerprint changed since the dry run (or that are gone) are reported for review
+    instead of being acted on, as are those whose protection tag cannot be checked.
+
+    :param region: AWS region name
+    :param entries: PlanEntries of one kind, region and account
+    :param run: RunContext of the entries' account
+    """
+    tracker = run.tracker
+    kind = entries[0].kind
+    plan_kind = plan_kinds()[kind]
+    planned = {entry.resource_id: entry for entry in entries}
+
+    current = {}
+    for batch in chunked(list(planned), plan_kind.batch_size):
+        try:
+            current.update(plan_kind.fingerprints(region, batch, run))
         except Exception as e:
-            logger.error(f'Error tagging instance {instance_id}: {str(e)}')
+            logger.error(f'Error validating {len(batch)} planned {kind} actions in region {region}: {str(e)}')
+            for resource_id in batch:
+                tracker.add_failed(kind, resource_id, region, planned[resource_id].action)
+                del planned[resource_id]
+
+    ready = []
+    for resource_id, entry in planned.items():
+        if current.get(resource_id) != entry.fingerprint:
+            logger.info(f'{kind} {resource_id} changed since the plan was made, skipping')
+            tracker.add_notify(kind, resource_id, region, entry.action)
+            continue
+        if plan_kind.arn_resource is not None:
+            protected = run.protected(region, *plan_kind.arn_resource(resource_id))
+            if protected:
+                logger.info(f'{kind} {resource_id} has protection tag, skipping')
+                continue
+            if protected is None:
+                logger.warning(f'Tags of {kind} {resource_id} unknown, not applying its planned action')
+                tracker.add_notify(kind, resource_id, region, entry.action)
+                continue
+        ready.append(resource_id)
+
+    logger.info(f'Plan validation of {kind} in region {region}: {len(ready)} of {len(entries)} actions still apply')
+    if not ready:
+        return
+    if not settings.dry_run:
+        plan_kind.apply(region, ready, run)
+    else:
+        for resource_id in ready:
+            tracker.add_skipped(kind, resource_id, region, planned[resource_id].action)
+        logger.info(f'DRY RUN: Would apply {len(ready)} planned {kind} actions in region {region}')
+
+
+# Mutations confirmed by polling when VERIFY_MUTATIONS is enabled, keyed by tracker
+# category. Other mutations are recorded as soon as the API accepts them.
+MUTATION_VERIFIERS = {
+    'rds-cluster': Verifier(get_db_cluster_states, frozenset({'stopped'}), gone_is_done=False),
+    'rds-instance': Verifier(get_db_instance_states, frozenset({'stopped'}), gone_is_done=False),
+    'eks-nodegroup': Verifier(get_nodegroup_states, frozenset({'SCALED_IN'}), frozenset({'DEGRADED'}),
+                              batch_size=20),
+    # One listing covers every cluster of the region
+    'msk-cluster': Verifier(get_msk_cluster_states, frozenset({'DELETING'}), frozenset({'FAILED'}),
+                            batch_size=1000),
+}
+
+
+# Most mutations of a kind applied at once per region and account (other kinds share the
+# pipeline's workers without a per-kind limit). Domain deletions are long-running
+# control-plane operations, a few at a time is enough.
+MUTATION_LIMITS = {
+    'opensearch-domain': 2,
+}
+
+# Rate limits of the delete APIs, per account and region. Mutations of these kinds are
+# paced to stay under them, and quota errors put them back in their queue with backoff.
+MUTATION_QUOTAS = {
+    # Kinesis DeleteStream allows 5 transactions per second; a little headroom absorbs timer jitter
+    'kinesis-stream': Quota(4.5, frozenset({'LimitExceededException'})),
+    # MSK publishes no rate for DeleteCluster and throttles bursts of control-plane calls
+    'msk-cluster': Quota(1.0, frozenset({'TooManyRequestsException', 'LimitExceededException'})),
+}
+
+
+# How apply mode validates and executes the planned actions of each tracker category.
+# Fingerprints not covering the tags are complemented by a ProtectionIndex check.
+@lru_cache(maxsize=None)
+def plan_kinds() -> Dict[str, "PlanKind"]:
+    """Get the PlanKind of every resource kind plans hold actions of"""
+    from plan import PlanKind
+    return {
+        'ec2-instance': PlanKind('ec2', get_instance_fingerprints, stop_instance_ids,
+                                 batch_size=EC2_MUTATION_BATCH_SIZE),
+        'ec2-monitoring': PlanKind('ec2', partial(get_instance_fingerprints, fingerprint_of=monitoring_fingerprint),
+                                   unmonitor_instance_ids, batch_size=EC2_MUTATION_BATCH_SIZE),
+        'eip': PlanKind('ec2', get_address_fingerprints,
+                        submit_planned('eip', 'ec2', 'release_address', 'AllocationId')),
+        'ebs-volume': PlanKind('ec2', get_volume_fingerprints,
+                               submit_planned('ebs-volume', 'ec2', 'delete_volume', 'VolumeId')),
+        # One listing covers every load balancer, stream or MSK cluster of the region
+        'classic-elb': PlanKind('elb', get_load_balancer_fingerprints,
+                                submit_planned('classic-elb', 'elb', 'delete_load_balancer', 'LoadBalancerName'),
+                                batch_size=1000,
+                                arn_resource=lambda name: ('elasticloadbalancing', f'loadbalancer/{name}')),
+        'rds-cluster': PlanKind('rds', get_db_cluster_fingerprints,
+                                submit_planned('rds-cluster', 'rds', 'stop_db_cluster', 'DBClusterIdentifier')),
+        'rds-instance': PlanKind('rds', get_db_instance_fingerprints,
+                                 submit_planned('rds-instance', 'rds', 'stop_db_instance', 'DBInstanceIdentifier')),
+        'eks-nodegroup': PlanKind('eks', get_nodegroup_fingerprints, scale_in_planned_nodegroups, batch_size=20),
+        'kinesis-stream': PlanKind('kinesis', get_stream_fingerprints,
+                                   submit_planned('kinesis-stream', 'kinesis', 'delete_stream', 'StreamName',
+                                                  EnforceConsumerDeletion=True),
+                                   batch_size=1000, arn_resource=lambda name: ('kinesis', f'stream/{name}')),
+        'msk-cluster': PlanKind('kafka', get_msk_cluster_fingerprints,
+                                submit_planned('msk-cluster', 'kafka', 'delete_cluster', 'ClusterArn'),
+                                batch_size=1000),
+        'opensearch-domain': PlanKind('opensearch', get_domain_fingerprints,
+                                      submit_planned('opensearch-domain', 'opensearch', 'delete_domain', 'DomainName'),
+                                      batch_size=OPENSEARCH_DESCRIBE_BATCH_SIZE,
+                                      arn_resource=lambda name: ('es', f'domain/{name}')),
+    }
+
+
+# Cleanup phases in reporting order: (phase name, service, per-region function).
+# The service name is the key for per-service concurrency limits.
+CLEANUP_PHASES = [
+    ('ec2-instance', 'ec2', stop_instances_in_region),
+    ('ec2-tagging', 'ec2', tag_instances_in_region),
+    ('ec2-monitoring', 'ec2', unmonitor_instances_in_region),
+    ('eip', 'ec2', release_unassociated_eip_in_region),
+    ('ebs-volume', 'ec2', delete_ebs_volumes_in_region),
+    ('classic-elb', 'elb', delete_empty_load_balancers_in_region),
+    ('rds', 'rds', stop_rds_in_region),
+    ('eks-nodegroup', 'eks', scale_in_eks_nodegroups_in_region),
+    ('kinesis-stream', 'kinesis', delete_kinesis_stream_in_region),
+    ('msk-cluster', 'kafka', delete_msk_in_region),
+    ('opensearch-domain', 'opensearch', delete_domain_in_region),
+]
 
-    with ThreadPoolExecutor(max_workers=5) as executor:
-        for region in regions:
-            logger.info(f'Getting instances in region: {region}')
-            ec2_specific_region = boto3.client('ec2', region_name=region)
-            config_specific_region = boto3.client('config', region_name=region)
 
-            try:
-                # Check if there are discovered resources in AWS Config
-                response = config_specific_region.get_discovered_resource_counts()
-                if response.get('totalDiscoveredResources', 0) == 0:
+# Phases that make no plan entries (tagging is not a cleanup action): apply mode runs
+# them like a normal run does
+UNPLANNED_PHASES = ['ec2-tagging']
+
+
+def unit_key(phase_name, region, account=''):
+    key = f'{phase_name}:{region}'
+    return f'{account}:{key}' if account else key
+
+
+def run_phases(phase_names, regions, run: RunContext, account_runs: Optional[List[RunContext]] = None):
+    """Run cleanup phases as (phase, region) work units on one bounded scheduler
+
+    Units completed by a previous invocation (see RunContext.completed) are skipped, and
+    no new unit starts once the run's time budget is exhausted.
+
+    :param phase_names: Names of the phases to run (see CLEANUP_PHASES)
+    :param regions: List of AWS region names
+    :param run: RunContext of the current invocation
+    :param account_runs: Child contexts of the target accounts in organization mode; all
+                         their units share the scheduler's global worker limit
+    :return: List of UnitResult
+    """
+    return run_units(phase_units(phase_names, regions, run, account_runs), run)
+
+
+def phase_units(phase_names, regions, run: RunContext, account_runs: Optional[List[RunContext]] = None):
+    """Get the (phase, region) work units of cleanup phases not completed yet
+
+    :param phase_names: Names of the phases (see CLEANUP_PHASES)
+    :param regions: List of AWS region names
+    :param run: RunContext of the current invocation
+    :param account_runs: Child contexts of the target accounts in organization mode
+    :return: List of WorkUnit
+    """
+    phases = {name: (service, func) for name, service, func in CLEANUP_PHASES}
+    runs = account_runs or [run]
+    units = []
+    empty_units = 0
+    for target in runs:
+        for name in phase_names:
+            for region in regions:
+                key = unit_key(name, region, target.account)
+                if key in run.completed:
+                    continue
+                if target.region_map is not None and not target.region_map.may_have_work(name, region):
+                    # Nothing to clean up there: the unit counts as done without any API call
+                    run.completed.add(key)
+                    empty_units += 1
                     continue
+                units.append(WorkUnit(name, phases[name][0], region, partial(phases[name][1], region, target),
+                                      target.account))
+    if empty_units:
+        logger.info(f"Region probe: skipping {empty_units} work units of regions without matching resources")
+    return units
 
-                paginator = ec2_specific_region.get_paginator('describe_instances')
-                for page in paginator.paginate():
-                    if "Reservations" in page:
-                        for reservation in page["Reservations"]:
-                            if "Instances" in reservation:
-                                futures = []
-                                for instance in reservation["Instances"]:
-                                    futures.append(executor.submit(
-                                        process_instance, instance,
-                                        ec2_specific_region, config_specific_region))
-                                for future in as_completed(futures):
-                                    try:
-                                        future.result()
-                                    except Exception as e:
-                                        logger.error(f'Error in tagging thread: {str(e)}')
 
-            except Exception as e:
-                logger.error(f'Error processing instances in region {region}: {str(e)}')
+def run_units(units: List[WorkUnit], run: RunContext):
+    """Run work units on one bounded scheduler, then drain the mutations they queued
+
+    :param units: WorkUnits not completed yet
+    :param run: RunContext of the current invocation
+    :return: List of UnitResult
+    """
+    scheduler = WorkScheduler(max_workers=settings.max_workers, service_limits=settings.service_concurrency,
+                              account_limit=settings.account_concurrency)
+    results = scheduler.run(units, budget=run.budget)
+    # Discovery is done; wait for the queued mutations (and their verification)
+    run.mutations.drain(deadline=run.budget.deadline)
+    run.tracker.merge()
+
+    # Units that failed with an API error count as done: retrying them next time would not help
+    for result in results:
+        if not isinstance(result.error, TimeBudgetExceeded):
+            run.completed.add(unit_key(result.unit.phase, result.unit.region, result.unit.account))
+    return results
+
+
+def apply_plan(plan: "Plan", regions, run: RunContext, account_runs: Optional[List[RunContext]] = None):
+    """Apply the actions of a dry-run plan as (kind, region) work units, without scanning again
+
+    The UNPLANNED_PHASES run on the same scheduler as usual, scanning their regions.
+
+    :param plan: Complete Plan
+    :param regions: List of AWS region names of the UNPLANNED_PHASES
+    :param run: RunContext of the current invocation
+    :param account_runs: Child contexts of the target accounts in organization mode
+    :return: Unit keys of every apply and unplanned phase unit, including those completed before
+    """
+    targets = {target.account: target for target in account_runs or [run]}
+    units = phase_units(UNPLANNED_PHASES, regions, run, account_runs)
+    unit_keys = {unit_key(name, region, target.account) for target in targets.values()
+                 for name in UNPLANNED_PHASES for region in regions}
+    for (account, region, kind), entries in sorted(plan.groups().items()):
+        phase = f'apply-{kind}'
+        key = unit_key(phase, region, account)
+        unit_keys.add(key)
+        if key in run.completed:
+            continue
+        target = targets.get(account)
+        if target is None or kind not in plan_kinds():
+            logger.error(f"Cannot apply {len(entries)} planned {kind} actions of account {account or 'self'} "
+                         f"in region {region}: {'unknown kind' if target else 'account not reachable or not targeted'}")
+            for entry in entries:
+                run.tracker.add_failed(kind, entry.resource_id, region, entry.action, account)
+            run.completed.add(key)
+            continue
+        units.append(WorkUnit(phase, plan_kinds()[kind].service, region,
+                              partial(apply_planned_in_region, region, entries, target), account))
+    run_units(units, run)
+    return unit_keys
 
 
 # Get all AWS regions
 
+# Enabled regions rarely change; warm invocations reuse the last successful lookup
+_region_cache = TtlCache(settings.cache_ttl)
+
+
 def get_aws_regions():
     """Get list of all enabled AWS regions
 
     :return: List of AWS region names
     """
-    ec2 = boto3.client('ec2', region_name='us-east-1')
+    regions = _region_cache.get('regions')
+    if regions is not None:
+        return list(regions)
+
+    ec2 = get_client('ec2', region_name='us-east-1')
     try:
         response = ec2.describe_regions(AllRegions=False)
         regions = [region['RegionName'] for region in response['Regions']]
         logger.info(f'Found {len(regions)} enabled regions')
+        _region_cache.set('regions', tuple(regions))
         return regions
     except Exception as e:
         logger.error(f'Error getting AWS regions: {str(e)}')
-        return USED_REGIONS  # Fallback to default regions
+        return list(settings.regions)  # Fallback to default regions
+
+
+def probe_account_regions(runs: List[RunContext], regions):
+    """Set the region map of each run from the Resource Explorer aggregator index of its account
+
+    :param runs: Root context, or the child contexts of the target accounts
+    :param regions: List of AWS region names the run scans
+    """
+    from region_probe import probe_regions
+
+    def probe(target: RunContext):
+        target.region_map = probe_regions(target.client('resource-explorer-2', settings.resource_explorer_region),
+                                          regions)
+
+    with ThreadPoolExecutor(max_workers=min(settings.max_workers, len(runs))) as executor:
+        for target, future in [(target, executor.submit(probe, target)) for target in runs]:
+            try:
+                future.result()
+            except Exception as e:
+                logger.warning(f"Region probe of account {target.account or 'self'} failed: {str(e)}")
+
 
 def lambda_handler(event, context):
     """Main Lambda handler function
@@ -857,56 +1839,132 @@ def lambda_handler(event, context):
     :return: Response with status code and body
     """
     logger.info("====== AWS FinOps Resource Cleanup Started ======")
-    logger.info(f"Dry run mode: {dry_run}")
-
-    # Create fresh tracker for each invocation to avoid warm-start pollution
-    tracker = ResourceTracker()
-
-    check_all_regions = os.environ.get('CHECK_ALL_REGIONS', 'false').lower() == 'true'
-    if check_all_regions:
+    logger.info(f"Dry run mode: {settings.dry_run}")
+
+    # Create fresh run state for each invocation to avoid warm-start pollution, restoring
+    # the progress of a run an earlier invocation could not finish
+    checkpoint = None
+    if settings.checkpoint_store is not None:
+        from checkpoint import load_checkpoint
+        checkpoint = load_checkpoint(settings.checkpoint_store, settings.dry_run, settings.apply_plan)
+    run = RunContext(budget=TimeBudget(context, settings.safety_margin), checkpoint=checkpoint)
+    tracker = run.tracker
+    if settings.plan_store is not None and settings.dry_run and not settings.apply_plan:
+        from plan import Plan, load_plan
+        # A resumed dry run keeps adding to the partial plan of its earlier invocations
+        run.plan = load_plan(settings.plan_store, created_at=run.started_at) if checkpoint else None
+        run.plan = run.plan or Plan(run.started_at)
+    reset_limiter_stats()
+    reset_telemetry()
+
+    if settings.check_all_regions:
         regions = get_aws_regions()
     else:
-        regions = USED_REGIONS
+        regions = list(settings.regions)
 
     logger.info(f"Scanning regions: {', '.join(regions)}")
 
     try:
-        # Execute all cleanup operations
-        stop_all_instances(regions, tracker)
-        tag_instances(regions, tracker)
-        unmonitor_all_instances(regions, tracker)
-        release_unassociated_eip(regions, tracker)
-        delete_ebs_volumes(regions, tracker)
-        delete_empty_load_balancers(regions, tracker)
-        stop_rds_instances(regions, tracker)
-        scale_in_eks_nodegroups(regions, tracker)
-        delete_kinesis_stream(regions, tracker)
-        delete_msk_clusters(regions, tracker)
-        delete_domain(regions, tracker)
-
-        # Send email notification with results
-        notify_auto_clean_data(tracker)
-
-        logger.info("====== AWS FinOps Resource Cleanup Completed ======")
-        logger.info(f"Total resources processed - Deleted: {len(tracker.deleted_resources)}, "
-                   f"Skipped: {len(tracker.skip_delete_resources)}, "
-                   f"Failed: {len(tracker.check_resources)}, "
-                   f"Notified: {len(tracker.notify_resources)}")
+        # In organization mode every target account runs the phases with assumed-role credentials
+        accounts, unreachable = [], []
+        if settings.accounts:
+            from accounts import resolve_accounts
+            accounts, unreachable = resolve_accounts(settings.accounts, settings.assume_role_name)
+        account_runs = [run.for_account(account) for account in accounts]
+        for account_id in unreachable:
+            if unit_key('assume-role', '', account_id) not in run.completed:
+                tracker.add_failed('account', account_id, action='assume_role', account=account_id)
+                run.completed.add(unit_key('assume-role', '', account_id))
+        if settings.accounts:
+            logger.info(f"Organization mode: cleaning {len(accounts)} accounts "
+                        f"({len(unreachable)} unreachable, account concurrency: {settings.account_concurrency})")
+
+        if settings.apply_plan:
+            # Execute the actions of the last dry run instead of scanning again
+            from plan import load_plan
+            plan = load_plan(settings.plan_store)
+            if plan is None:
+                raise ValueError("APPLY_PLAN is set but PLAN_STORE holds no complete plan")
+            logger.info(f"Applying plan of {len(plan.entries)} actions from "
+                        f"{time.strftime('%Y-%m-%d %H:%M:%S', time.gmtime(plan.created_at))} UTC")
+            all_units = apply_plan(plan, regions, run, account_runs)
+        else:
+            if settings.resource_explorer_region:
+                probe_account_regions(account_runs or [run], regions)
+
+            # Execute all cleanup operations as (phase, region) units on one scheduler
+            phase_names = [name for name, _, _ in CLEANUP_PHASES]
+            all_units = {unit_key(name, region, target.account) for target in account_runs or [run]
+                         for name in phase_names for region in regions}
+            logger.info(f"Scheduling {len(all_units - run.completed)} work units "
+                        f"(max workers: {settings.max_workers}, "
+                        f"service limits: {settings.service_concurrency or 'default'})")
+            run_phases(phase_names, regions, run, account_runs)
+
+        remaining_units = len(all_units - run.completed)
+        run.snapshot.save()
+        if run.plan is not None:
+            from plan import save_plan
+            run.plan.complete = remaining_units == 0
+            save_plan(settings.plan_store, run.plan)
+        if remaining_units and settings.checkpoint_store is not None:
+            # Report once the whole run is done
+            from checkpoint import save_checkpoint
+            save_checkpoint(settings.checkpoint_store, run.to_checkpoint())
+            logger.info(f"====== AWS FinOps Resource Cleanup Paused ({remaining_units} work units left) ======")
+        else:
+            if remaining_units:
+                logger.warning(f"{remaining_units} work units not run for lack of time, "
+                               f"set CHECKPOINT_STORE to resume them on the next invocation")
+            if settings.checkpoint_store is not None:
+                from checkpoint import clear_checkpoint
+                clear_checkpoint(settings.checkpoint_store)
+            if settings.apply_plan and not settings.dry_run and not remaining_units:
+                from plan import clear_plan
+                # Applied once; the next dry run makes a new plan
+                clear_plan(settings.plan_store)
+
+            # Send email notification with results
+            notify_auto_clean_data(tracker)
+
+            logger.info("====== AWS FinOps Resource Cleanup Completed ======")
+        logger.info(f"Total resources processed - Deleted: {tracker.count(DELETED)}, "
+                   f"Skipped: {tracker.count(SKIPPED)}, "
+                   f"Failed: {tracker.count(FAILED)}, "
+                   f"Notified: {tracker.count(NOTIFY)}, "
+                   f"Pending: {tracker.count(PENDING)}")
+
+        rate_limits = limiter_stats()
+        api_calls = telemetry_summary()
+        if settings.api_metrics:
+            emit_metrics(settings.metrics_namespace)
+        logger.info(f"API calls: {api_calls['calls']} ({api_calls['retries']} retries, "
+                    f"{api_calls['throttles']} throttles, {api_calls['errors']} errors)")
+        logger.info(f"Rate limiter stats: {json.dumps(rate_limits)}")
 
         return {
             'statusCode': 200,
             'body': json.dumps({
                 'message': 'Success!',
-                'dry_run': dry_run,
-                'deleted': len(tracker.deleted_resources),
-                'skipped': len(tracker.skip_delete_resources),
-                'failed': len(tracker.check_resources),
-                'notified': len(tracker.notify_resources)
+                'dry_run': settings.dry_run,
+                'complete': remaining_units == 0,
+                'remaining_units': remaining_units,
+                'deleted': tracker.count(DELETED),
+                'skipped': tracker.count(SKIPPED),
+                'failed': tracker.count(FAILED),
+                'notified': tracker.count(NOTIFY),
+                'pending': tracker.count(PENDING),
+                'resources': tracker.summary(),
+                'rate_limit_wait_seconds': round(sum(s['wait_seconds'] for s in rate_limits.values()), 3),
+                'throttled_calls': sum(s['throttles'] for s in rate_limits.values()),
+                'api_calls': api_calls
             })
         }
 
     except Exception as e:
         logger.error(f"Error in lambda_handler: {str(e)}")
+        if settings.api_metrics:
+            emit_metrics(settings.metrics_namespace)
         return {
             'statusCode': 500,
             'body': json.dumps({'error': str(e)})
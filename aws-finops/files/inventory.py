@@ -0,0 +1,282 @@
+import logging
+import threading
+from typing import Dict, FrozenSet, Iterable, List, NamedTuple, Optional, Tuple
+
+from botocore.exceptions import ClientError
+
+from aws_clients import get_client
+
+logger = logging.getLogger()
+
+# Largest page sizes of describe_instances, EKS list calls and get_resources
+EC2_PAGE_SIZE = 1000
+EKS_PAGE_SIZE = 100
+TAGGING_PAGE_SIZE = 100
+# Instance states the cleanup passes act on: terminated and shutting-down instances are not listed
+LISTED_INSTANCE_STATES = ['pending', 'running', 'stopping', 'stopped']
+# Fields of describe_instances an InstanceRecord is built from, projected from each page
+# with JMESPath; the defaults stand in for the keys the API omits
+INSTANCE_FIELDS = ("Reservations[].Instances[].{InstanceId: InstanceId, State: State || `{}`, "
+                   "InstanceLifecycle: InstanceLifecycle || '', Monitoring: Monitoring || `{}`, Tags: Tags || `[]`}")
+
+
+class InstanceRecord(NamedTuple):
+    """Compact view of an EC2 instance holding only the fields the cleanup passes use."""
+    instance_id: str
+    state: str
+    lifecycle: str
+    monitoring: str
+    tags: Tuple[Tuple[str, str], ...]
+
+    @property
+    def is_spot(self) -> bool:
+        return self.lifecycle == 'spot'
+
+    def get_tag(self, key: str) -> Optional[str]:
+        """Return the value of tag `key`, or None if the instance does not carry it."""
+        for tag_key, tag_value in self.tags:
+            if tag_key == key:
+                return tag_value
+        return None
+
+    def has_tag(self, key: str, value: Optional[str] = None) -> bool:
+        """Check if the instance carries tag `key` (optionally with the given value)."""
+        tag_value = self.get_tag(key)
+        if tag_value is None:
+            return False
+        return value is None or tag_value == value
+
+
+def to_instance_record(instance: dict) -> InstanceRecord:
+    """Build the InstanceRecord of a describe_instances instance"""
+    return InstanceRecord(
+        instance_id=instance['InstanceId'],
+        state=instance.get('State', {}).get('Name', ''),
+        lifecycle=instance.get('InstanceLifecycle', ''),
+        monitoring=instance.get('Monitoring', {}).get('State', 'disabled'),
+        tags=tuple((tag.get('Key', ''), tag.get('Value', '')) for tag in instance.get('Tags', [])),
+    )
+
+
+class InstanceInventory:
+    """Per-invocation snapshot of EC2 instances, fetched once per region.
+
+    The stop, unmonitor and tagging passes all read from the same snapshot instead of
+    paginating describe_instances themselves. Each region is fetched lazily on first
+    access; concurrent readers of the same region wait for a single fetch. Only instances
+    in LISTED_INSTANCE_STATES are listed, and only the INSTANCE_FIELDS of each are read.
+
+    :param credentials: Credentials of the account to describe, None for the Lambda's own
+    """
+
+    def __init__(self, credentials=None):
+        self.credentials = credentials
+        self._lock = threading.Lock()
+        self._region_locks: Dict[str, threading.Lock] = {}
+        self._snapshots: Dict[str, List[InstanceRecord]] = {}
+
+    def _region_lock(self, region: str) -> threading.Lock:
+        with self._lock:
+            return self._region_locks.setdefault(region, threading.Lock())
+
+    def instances(self, region: str) -> List[InstanceRecord]:
+        """Get the instance snapshot for a region, fetching it on first use.
+
+        :param region: AWS region name
+        :return: List of InstanceRecord
+        :raises: ClientError if the region cannot be described (failures are not cached)
+        """
+        with self._region_lock(region):
+            snapshot = self._snapshots.get(region)
+            if snapshot is None:
+                snapshot = self._fetch(region)
+                self._snapshots[region] = snapshot
+            return snapshot
+
+    def update_state(self, region: str, instance_ids: Iterable[str], state: str):
+        """Record a state change made by a cleanup pass so later passes see it.
+
+        :param region: AWS region name
+        :param instance_ids: Instance ids whose state changed
+        :param state: New instance state name
+        """
+        changed = set(instance_ids)
+        with self._region_lock(region):
+            snapshot = self._snapshots.get(region)
+            if snapshot is None:
+                return
+            self._snapshots[region] = [
+                record._replace(state=state) if record.instance_id in changed else record
+                for record in snapshot
+            ]
+
+    def _fetch(self, region: str) -> List[InstanceRecord]:
+        logger.info(f'Building EC2 instance snapshot for region: {region}')
+        ec2 = get_client('ec2', region_name=region, credentials=self.credentials)
+        records = []
+
+        paginator = ec2.get_paginator('describe_instances')
+        for instance in paginator.paginate(Filters=[{'Name': 'instance-state-name', 'Values': LISTED_INSTANCE_STATES}],
+                                           PaginationConfig={'PageSize': EC2_PAGE_SIZE}).search(INSTANCE_FIELDS):
+            records.append(to_instance_record(instance))
+
+        logger.info(f'Found {len(records)} instances in region: {region}')
+        return records
+
+
+class EksClusterIndex:
+    """Per-invocation index of EKS cluster names, built once per region from list_clusters.
+
+    Cluster existence checks become set lookups, so thousands of volumes tagged for the
+    same handful of clusters cost one paginated list_clusters call per region. If the
+    listing fails, existence falls back to memoized describe_cluster calls (negative
+    results included).
+
+    :param credentials: Credentials of the account to list, None for the Lambda's own
+    """
+
+    def __init__(self, credentials=None):
+        self.credentials = credentials
+        self._lock = threading.Lock()
+        self._region_locks: Dict[str, threading.Lock] = {}
+        self._clusters: Dict[str, FrozenSet[str]] = {}
+        self._described: Dict[Tuple[str, str], bool] = {}
+
+    def _region_lock(self, region: str) -> threading.Lock:
+        with self._lock:
+            return self._region_locks.setdefault(region, threading.Lock())
+
+    def clusters(self, region: str) -> FrozenSet[str]:
+        """Get the names of all EKS clusters in a region, listing them on first use
+
+        :param region: AWS region name
+        :return: Set of cluster names
+        :raises: ClientError if the clusters cannot be listed (failures are not cached)
+        """
+        with self._region_lock(region):
+            clusters = self._clusters.get(region)
+            if clusters is None:
+                eks = get_client('eks', region_name=region, credentials=self.credentials)
+                paginator = eks.get_paginator('list_clusters')
+                page_iterator = paginator.paginate(PaginationConfig={'PageSize': EKS_PAGE_SIZE})
+                clusters = frozenset(page_iterator.search('clusters'))
+                self._clusters[region] = clusters
+                logger.info(f'Found {len(clusters)} EKS clusters in region: {region}')
+            return clusters
+
+    def exists(self, region: str, cluster_name: str) -> bool:
+        """Check if an EKS cluster exists
+
+        Errors other than "not found" count as existing, so callers never delete
+        resources of a cluster whose state is unknown.
+
+        :param region: AWS region name
+        :param cluster_name: EKS cluster name
+        :return: True if the cluster exists (or its existence could not be determined)
+        """
+        try:
+            return cluster_name in self.clusters(region)
+        except Exception as e:
+            logger.warning(f'Error listing EKS clusters in region {region}, describing {cluster_name}: {str(e)}')
+
+        key = (region, cluster_name)
+        with self._region_lock(region):
+            if key not in self._described:
+                eks = get_client('eks', region_name=region, credentials=self.credentials)
+                try:
+                    eks.describe_cluster(name=cluster_name)
+                    self._described[key] = True
+                except eks.exceptions.ResourceNotFoundException:
+                    self._described[key] = False
+                except ClientError as e:
+                    logger.warning(f'Error checking EKS cluster {cluster_name}: {str(e)}')
+                    return True
+            return self._described[key]
+
+
+# Resource types whose protection tag the cleanup phases look up in the ProtectionIndex
+PROTECTED_RESOURCE_TYPES = [
+    'ec2:instance',
+    'ec2:volume',
+    'ec2:elastic-ip',
+    'elasticloadbalancing:loadbalancer',
+    'rds:db',
+    'rds:cluster',
+    'kinesis:stream',
+    'kafka:cluster',
+    'es:domain',
+]
+
+
+class ProtectionIndex:
+    """Per-invocation index of the resources carrying the protection tag, built once per region.
+
+    One paginated Resource Groups Tagging API get_resources call filtered on the tag
+    lists every protected resource of the region, so protection checks become set
+    lookups instead of one tag lookup per resource. Resources are keyed by
+    "service:resource", the last part of their ARN (e.g. "elasticloadbalancing:loadbalancer/web"),
+    which does not depend on the account id.
+
+    Unlike the other indexes, a failed listing is remembered for the invocation: the
+    phases then fall back to the tags of their describe calls.
+
+    :param tag_key: Protection tag key
+    :param tag_value: Protection tag value
+    :param credentials: Credentials of the account to list, None for the Lambda's own
+    """
+
+    def __init__(self, tag_key: str, tag_value: str, credentials=None):
+        self.tag_key = tag_key
+        self.tag_value = tag_value
+        self.credentials = credentials
+        self._lock = threading.Lock()
+        self._region_locks: Dict[str, threading.Lock] = {}
+        self._protected: Dict[str, Optional[FrozenSet[str]]] = {}
+
+    def _region_lock(self, region: str) -> threading.Lock:
+        with self._lock:
+            return self._region_locks.setdefault(region, threading.Lock())
+
+    def protected_resources(self, region: str) -> Optional[FrozenSet[str]]:
+        """Get the "service:resource" keys of the protected resources of a region, listing them on first use
+
+        :param region: AWS region name
+        :return: Set of keys, or None if the region's resources could not be listed
+        """
+        with self._region_lock(region):
+            if region not in self._protected:
+                try:
+                    self._protected[region] = self._fetch(region)
+                except Exception as e:
+                    logger.warning(f'Error listing protected resources in region {region}, '
+                                   f'falling back to per-resource tags: {str(e)}')
+                    self._protected[region] = None
+            return self._protected[region]
+
+    def is_protected(self, region: str, service: str, resource: str) -> Optional[bool]:
+        """Check if a resource carries the protection tag
+
+        :param region: AWS region name
+        :param service: Service part of the resource ARN (e.g. "kinesis")
+        :param resource: Resource part of the resource ARN (e.g. "stream/orders")
+        :return: True or False, or None if the region's protected resources are unknown
+        """
+        protected = self.protected_resources(region)
+        if protected is None:
+            return None
+        return f'{service}:{resource}' in protected
+
+    def _fetch(self, region: str) -> FrozenSet[str]:
+        tagging = get_client('resourcegroupstaggingapi', region_name=region, credentials=self.credentials)
+        keys = []
+        paginator = tagging.get_paginator('get_resources')
+        for arn in paginator.paginate(TagFilters=[{'Key': self.tag_key, 'Values': [self.tag_value]}],
+                                      ResourceTypeFilters=PROTECTED_RESOURCE_TYPES,
+                                      PaginationConfig={'PageSize': TAGGING_PAGE_SIZE}).search(
+                                          'ResourceTagMappingList[].ResourceARN'):
+            # arn:partition:service:region:account:resource
+            parts = arn.split(':', 5)
+            if len(parts) == 6:
+                keys.append(f'{parts[2]}:{parts[5]}')
+        logger.info(f'Found {len(keys)} protected resources in region: {region}')
+        return frozenset(keys)
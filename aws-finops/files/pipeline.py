@@ -0,0 +1,277 @@
+import logging
+import random
+import threading
+import time
+from collections import Counter, deque
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Callable, Dict, FrozenSet, List, NamedTuple, Optional, Tuple
+
+from botocore.exceptions import ClientError
+
+from batching import chunked
+
+logger = logging.getLogger()
+
+DEFAULT_MUTATION_WORKERS = 10
+DEFAULT_VERIFY_TIMEOUT = 120
+DEFAULT_POLL_INTERVAL = 10
+# Number of (resource kind, region) groups polled at the same time
+VERIFY_WORKERS = 5
+# Backoff of a mutation whose API reported its quota as exceeded: doubles per attempt,
+# with jitter, up to QUOTA_MAX_BACKOFF. After QUOTA_MAX_ATTEMPTS the mutation fails.
+QUOTA_INITIAL_BACKOFF = 1.0
+QUOTA_MAX_BACKOFF = 30.0
+QUOTA_MAX_ATTEMPTS = 8
+
+
+class Verifier(NamedTuple):
+    """Batched status check confirming that mutations of one resource kind took effect.
+
+    `check(region, ids, credentials)` returns the current state of each id it still finds;
+    ids missing from the result no longer exist, which counts as confirmed when
+    `gone_is_done` is set.
+    """
+    check: Callable[[str, List[str], object], Dict[str, str]]
+    done_states: FrozenSet[str]
+    failed_states: FrozenSet[str] = frozenset()
+    batch_size: int = 100
+    gone_is_done: bool = True
+
+
+class Quota(NamedTuple):
+    """Documented rate limit of the API applying the mutations of one resource kind.
+
+    Mutations of the kind start at most `rate` per second per (region, account), on at
+    most `concurrency` pool tasks. An error whose code is in `retry_errors` means the
+    quota was exceeded: the mutation goes back to the front of its queue after a backoff
+    instead of being recorded as failed.
+    """
+    rate: float
+    retry_errors: FrozenSet[str]
+    concurrency: int = 1
+
+
+class Mutation(NamedTuple):
+    """A discovered cleanup action waiting to be applied.
+
+    :param service: Tracker category (e.g. 'rds-cluster'), also the Verifier key
+    :param resource_id: Id reported in the tracker
+    :param region: AWS region name
+    :param action: Function issuing the API call
+    :param verify_id: Id passed to the Verifier check, if different from resource_id
+    :param account: Account the resource belongs to ('' for the Lambda's own account)
+    :param credentials: Credentials of that account, used by the Verifier check
+    """
+    service: str
+    resource_id: str
+    region: str
+    action: Callable[[], None]
+    verify_id: Optional[str] = None
+    account: str = ''
+    credentials: object = None
+
+    @property
+    def operation(self) -> str:
+        """Name of the API operation the action issues (e.g. 'stop_db_cluster')"""
+        return getattr(getattr(self.action, 'func', self.action), '__name__', '')
+
+
+class MutationPipeline:
+    """Applies discovered mutations on a bounded worker pool, then optionally verifies them.
+
+    Discovery code submits Mutations and keeps paginating; the pool works the queue
+    concurrently. Kinds listed in `limits` are applied at most that many at a time per
+    (kind, region, account): their mutations wait in a queue that up to `limit` pool
+    tasks work through, so no pool thread blocks waiting for its turn. Kinds listed in
+    `quotas` are queued the same way and also paced to their Quota; mutations that could
+    not start before `deadline` are recorded as failed.
+
+    On drain, mutations whose kind has a Verifier are polled in batches,
+    all (kind, region, account) groups concurrently, until they reach a done state or the
+    deadline passes. Results go to the tracker as deleted (confirmed, or accepted when
+    verification is off), pending (unconfirmed at the deadline) or failed.
+    """
+
+    def __init__(self, tracker, verifiers: Optional[Dict[str, Verifier]] = None,
+                 max_workers: int = DEFAULT_MUTATION_WORKERS, verify: bool = False,
+                 verify_timeout: float = DEFAULT_VERIFY_TIMEOUT, poll_interval: float = DEFAULT_POLL_INTERVAL,
+                 limits: Optional[Dict[str, int]] = None, quotas: Optional[Dict[str, Quota]] = None,
+                 deadline: Optional[float] = None):
+        self.tracker = tracker
+        self.verifiers = verifiers or {}
+        self.limits = limits or {}
+        self.quotas = quotas or {}
+        self.deadline = deadline
+        self.max_workers = max_workers
+        self.verify = verify
+        self.verify_timeout = verify_timeout
+        self.poll_interval = poll_interval
+        self._lock = threading.Lock()
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._futures = []
+        self._awaiting: Dict[Tuple[str, str, str], Dict[str, Mutation]] = {}
+        self._queues: Dict[Tuple[str, str, str], deque] = {}
+        self._running = Counter()
+        # time.monotonic() value before which the next mutation of a quota queue may not start
+        self._next_start: Dict[Tuple[str, str, str], float] = {}
+
+    def submit(self, mutation: Mutation):
+        """Queue a mutation for the worker pool
+
+        :param mutation: Mutation to apply
+        """
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.max_workers)
+            quota = self.quotas.get(mutation.service)
+            limit = quota.concurrency if quota else self.limits.get(mutation.service)
+            if limit is None:
+                self._futures.append(self._executor.submit(self._apply, mutation))
+                return
+            key = (mutation.service, mutation.region, mutation.account)
+            # Entries are (mutation, attempts so far)
+            self._queues.setdefault(key, deque()).append((mutation, 0))
+            if self._running[key] < limit:
+                self._running[key] += 1
+                self._futures.append(self._executor.submit(self._work_queue, key))
+
+    def _work_queue(self, key: Tuple[str, str, str]):
+        """Apply the queued mutations of one limited (kind, region, account) until the queue is empty"""
+        quota = self.quotas.get(key[0])
+        while True:
+            with self._lock:
+                queue = self._queues[key]
+                if not queue:
+                    self._running[key] -= 1
+                    return
+                mutation, attempts = queue.popleft()
+                start = time.monotonic()
+                if quota is not None:
+                    # Reserve the next start slot of the queue, like a token of the rate limiters
+                    start = max(start, self._next_start.get(key, 0.0))
+                    self._next_start[key] = start + 1.0 / quota.rate
+
+            if quota is None:
+                self._apply(mutation)
+            elif self.deadline is not None and start > self.deadline:
+                self._fail(mutation, 'time budget exhausted before the mutation could start')
+            else:
+                time.sleep(max(0.0, start - time.monotonic()))
+                self._apply_within_quota(key, quota, mutation, attempts)
+
+    def _apply_within_quota(self, key: Tuple[str, str, str], quota: Quota, mutation: Mutation, attempts: int):
+        try:
+            mutation.action()
+        except ClientError as e:
+            error_code = e.response.get('Error', {}).get('Code', '')
+            if error_code not in quota.retry_errors or attempts + 1 >= QUOTA_MAX_ATTEMPTS:
+                self._fail(mutation, e)
+                return
+            delay = min(QUOTA_MAX_BACKOFF, QUOTA_INITIAL_BACKOFF * 2 ** attempts)
+            delay = random.uniform(delay / 2, delay)
+            with self._lock:
+                # The whole queue waits: its next mutations would exceed the same quota
+                self._next_start[key] = max(self._next_start.get(key, 0.0), time.monotonic() + delay)
+                self._queues[key].appendleft((mutation, attempts + 1))
+            logger.warning(f'{mutation.service} quota exceeded in {mutation.region} ({error_code}), '
+                           f'retrying {mutation.resource_id} in {delay:.1f}s')
+            return
+        except Exception as e:
+            self._fail(mutation, e)
+            return
+        self._applied(mutation)
+
+    def _apply(self, mutation: Mutation):
+        try:
+            mutation.action()
+        except Exception as e:
+            self._fail(mutation, e)
+            return
+        self._applied(mutation)
+
+    def _fail(self, mutation: Mutation, error):
+        logger.error(f'Failed to apply {mutation.service} cleanup to {mutation.resource_id} '
+                     f'in {mutation.region}: {str(error)}')
+        self.tracker.add_failed(mutation.service, mutation.resource_id, mutation.region, mutation.operation,
+                                mutation.account)
+
+    def _applied(self, mutation: Mutation):
+        if self.verify and mutation.service in self.verifiers:
+            with self._lock:
+                group = self._awaiting.setdefault((mutation.service, mutation.region, mutation.account), {})
+                group[mutation.verify_id or mutation.resource_id] = mutation
+        else:
+            self.tracker.add_deleted(mutation.service, mutation.resource_id, mutation.region, mutation.operation,
+                                     mutation.account)
+        logger.info(f'Applied {mutation.service} cleanup to {mutation.resource_id} in {mutation.region}')
+
+    def drain(self, deadline: Optional[float] = None):
+        """Wait for all queued mutations, then verify them until the deadline
+
+        :param deadline: time.monotonic() value after which verification stops at the latest
+                         (verification never runs longer than verify_timeout)
+        """
+        while True:
+            with self._lock:
+                futures, self._futures = self._futures, []
+            if not futures:
+                break
+            for future in as_completed(futures):
+                future.result()
+
+        with self._lock:
+            executor, self._executor = self._executor, None
+            awaiting, self._awaiting = self._awaiting, {}
+        if executor is not None:
+            executor.shutdown()
+
+        if not awaiting:
+            return
+
+        verify_deadline = time.monotonic() + self.verify_timeout
+        deadline = verify_deadline if deadline is None else min(deadline, verify_deadline)
+        logger.info(f'Verifying {sum(len(group) for group in awaiting.values())} mutations')
+
+        with ThreadPoolExecutor(max_workers=VERIFY_WORKERS) as executor:
+            futures = [executor.submit(self._poll_group, service, region, group, deadline)
+                       for (service, region, _), group in awaiting.items()]
+            for future in as_completed(futures):
+                try:
+                    future.result()
+                except Exception as e:
+                    logger.error(f'Error in verification thread: {str(e)}')
+
+    def _poll_group(self, service: str, region: str, pending: Dict[str, Mutation], deadline: float):
+        verifier = self.verifiers[service]
+        pending = dict(pending)
+        # Every mutation of a group belongs to the same account
+        credentials = next(iter(pending.values())).credentials
+
+        while pending:
+            for batch in chunked(list(pending), verifier.batch_size):
+                try:
+                    states = verifier.check(region, batch, credentials)
+                except Exception as e:
+                    logger.warning(f'Error verifying {service} in region {region}: {str(e)}')
+                    continue
+
+                for verify_id in batch:
+                    state = states.get(verify_id)
+                    mutation = pending[verify_id]
+                    if (state is None and verifier.gone_is_done) or state in verifier.done_states:
+                        self.tracker.add_deleted(service, mutation.resource_id, region, mutation.operation,
+                                                 mutation.account)
+                        del pending[verify_id]
+                    elif state in verifier.failed_states:
+                        logger.error(f'{service} {mutation.resource_id} reached state {state}')
+                        self.tracker.add_failed(service, mutation.resource_id, region, mutation.operation,
+                                                mutation.account)
+                        del pending[verify_id]
+
+            if not pending or time.monotonic() + self.poll_interval > deadline:
+                break
+            time.sleep(self.poll_interval)
+
+        for mutation in pending.values():
+            logger.warning(f'{service} {mutation.resource_id} in {region} not confirmed before the deadline')
+            self.tracker.add_pending(service, mutation.resource_id, region, mutation.operation, mutation.account)
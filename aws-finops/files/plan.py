@@ -0,0 +1,147 @@
+import json
+import logging
+import threading
+import time
+import zlib
+from typing import TYPE_CHECKING, Callable, Dict, List, NamedTuple, Optional, Tuple
+
+if TYPE_CHECKING:
+    from checkpoint import CheckpointStore
+
+logger = logging.getLogger()
+
+PLAN_VERSION = 1
+PLAN_KEY = 'plan.json.z'
+# Plans older than this describe an account that has changed too much to be worth applying
+DEFAULT_PLAN_MAX_AGE = 7 * 24 * 3600
+
+
+class PlanEntry(NamedTuple):
+    """A cleanup action found by a dry run.
+
+    :param account: Account the resource belongs to ('' for the Lambda's own account)
+    :param region: AWS region name
+    :param kind: Tracker category (e.g. 'ebs-volume')
+    :param resource_id: Id the API call takes (e.g. volume id, MSK cluster ARN)
+    :param action: Name of the API operation (e.g. 'delete_volume')
+    :param fingerprint: snapshot.fingerprint() of the resource when the dry run evaluated it
+    """
+    account: str
+    region: str
+    kind: str
+    resource_id: str
+    action: str
+    fingerprint: str
+
+
+class PlanKind(NamedTuple):
+    """How apply mode re-validates and executes the plan entries of one resource kind.
+
+    `fingerprints(region, ids, run)` returns the current fingerprint of each id it still
+    finds, computed like the dry run did; entries whose fingerprint changed are not
+    applied. `apply(region, ids, run)` runs the planned action on the remaining ids.
+    Kinds whose fingerprint does not cover the tags set `arn_resource(id)`, giving the
+    (service, resource) ARN parts checked against the ProtectionIndex.
+    """
+    service: str
+    fingerprints: Callable[[str, List[str], object], Dict[str, str]]
+    apply: Callable[[str, List[str], object], None]
+    batch_size: int = 100
+    arn_resource: Optional[Callable[[str], Tuple[str, str]]] = None
+
+
+class Plan:
+    """Cleanup actions found by a dry run, to be applied later without scanning again.
+
+    Saved as a zlib-compressed JSON document in a CheckpointStore, with the entries
+    grouped per (account, region, kind, action). A dry run that pauses for lack of time
+    saves an incomplete plan, which its resumed invocations keep adding to; only a
+    complete plan is applied.
+    """
+
+    def __init__(self, created_at: Optional[float] = None, complete: bool = False,
+                 entries: Optional[List[PlanEntry]] = None):
+        self.created_at = created_at if created_at is not None else time.time()
+        self.complete = complete
+        self.entries = list(entries or [])
+        self._lock = threading.Lock()
+
+    def add(self, entry: PlanEntry):
+        with self._lock:
+            self.entries.append(entry)
+
+    def groups(self) -> Dict[Tuple[str, str, str], List[PlanEntry]]:
+        """Get the entries per (account, region, kind)"""
+        groups = {}
+        for entry in self.entries:
+            groups.setdefault((entry.account, entry.region, entry.kind), []).append(entry)
+        return groups
+
+    def to_bytes(self) -> bytes:
+        groups = {}
+        for entry in self.entries:
+            groups.setdefault((entry.account, entry.region, entry.kind, entry.action), []).append(
+                [entry.resource_id, entry.fingerprint])
+        return zlib.compress(json.dumps({
+            'version': PLAN_VERSION,
+            'created_at': self.created_at,
+            'complete': self.complete,
+            'groups': [[*key, resources] for key, resources in sorted(groups.items())],
+        }, separators=(',', ':')).encode())
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> Optional["Plan"]:
+        try:
+            state = json.loads(zlib.decompress(data))
+        except (zlib.error, ValueError) as e:
+            logger.warning(f'Ignoring unreadable plan: {str(e)}')
+            return None
+        if state.get('version') != PLAN_VERSION:
+            logger.warning(f'Ignoring plan with version {state.get("version")}')
+            return None
+        entries = [PlanEntry(account, region, kind, resource_id, action, resource_fingerprint)
+                   for account, region, kind, action, resources in state['groups']
+                   for resource_id, resource_fingerprint in resources]
+        return cls(state['created_at'], state['complete'], entries)
+
+
+def load_plan(store: Optional["CheckpointStore"], created_at: Optional[float] = None,
+              max_age: float = DEFAULT_PLAN_MAX_AGE) -> Optional[Plan]:
+    """Load the saved plan
+
+    :param store: CheckpointStore holding the plan (None: no plan)
+    :param created_at: Start time of a resumed dry run: only its incomplete plan is loaded.
+                       Without it, only a complete plan is loaded (to be applied)
+    :param max_age: Maximum plan age in seconds
+    :return: Plan, or None if there is none to use
+    """
+    if store is None:
+        return None
+    data = store.load(PLAN_KEY)
+    if data is None:
+        return None
+
+    plan = Plan.from_bytes(data)
+    if plan is None:
+        return None
+    if created_at is not None:
+        return plan if plan.created_at == created_at and not plan.complete else None
+    if not plan.complete:
+        logger.info('Ignoring incomplete plan, its dry run has not finished yet')
+        return None
+    if time.time() - plan.created_at > max_age:
+        logger.info('Ignoring expired plan')
+        return None
+
+    logger.info(f'Loaded plan with {len(plan.entries)} actions')
+    return plan
+
+
+def save_plan(store: "CheckpointStore", plan: Plan):
+    store.save(PLAN_KEY, plan.to_bytes())
+    logger.info(f'Saved {"complete" if plan.complete else "partial"} plan with {len(plan.entries)} actions')
+
+
+def clear_plan(store: Optional["CheckpointStore"]):
+    if store is not None:
+        store.delete(PLAN_KEY)
@@ -0,0 +1,244 @@
+import logging
+import threading
+import time
+from typing import Dict, Optional, Tuple
+
+logger = logging.getLogger()
+
+# Starting (and ceiling) request rates per second for each service and region. They sit
+# below the documented API rate limits, which are shared with everything else running
+# in the account.
+DEFAULT_RATE_LIMITS = {
+    'ec2': 20.0,
+    'elb': 10.0,
+    'rds': 10.0,
+    'eks': 10.0,
+    'kinesis': 5.0,
+    'kafka': 5.0,
+    'opensearch': 5.0,
+    'config': 5.0,
+    'resource-explorer-2': 2.0,
+    'ses': 1.0,
+}
+DEFAULT_RATE_LIMIT = 10.0
+MIN_RATE = 0.5
+# AIMD parameters: halve the rate on throttling, regain 0.1 request/s per success. Throttles
+# arriving within DECREASE_COOLDOWN seconds of a decrease belong to the same burst and
+# do not cut the rate again.
+DECREASE_FACTOR = 0.5
+ADDITIVE_INCREASE = 0.1
+DECREASE_COOLDOWN = 1.0
+
+THROTTLING_ERRORS = {
+    'Throttling',
+    'ThrottlingException',
+    'ThrottledException',
+    'RequestThrottled',
+    'RequestThrottledException',
+    'RequestLimitExceeded',
+    'TooManyRequestsException',
+    'SlowDown',
+}
+
+
+class AdaptiveRateLimiter:
+    """Token bucket shared by every thread calling one (service, region) endpoint.
+
+    The refill rate starts at the configured rate and adapts with AIMD: it is cut by
+    DECREASE_FACTOR whenever a call is throttled and grows back by ADDITIVE_INCREASE per
+    successful call, up to the configured rate. Callers reserve a token under the lock
+    and sleep outside it, so waiting threads are released in arrival order.
+    """
+
+    def __init__(self, rate: float, burst: Optional[float] = None):
+        self.max_rate = rate
+        self.rate = rate
+        self.capacity = burst if burst is not None else max(1.0, rate)
+        self._tokens = self.capacity
+        self._last_refill = time.monotonic()
+        self._last_decrease = 0.0
+        self._lock = threading.Lock()
+        self.acquired = 0
+        self.waited = 0
+        self.wait_seconds = 0.0
+        self.throttles = 0
+
+    def _refill(self, now: float):
+        self._tokens = min(self.capacity, self._tokens + (now - self._last_refill) * self.rate)
+        self._last_refill = now
+
+    def acquire(self) -> float:
+        """Take one token, sleeping until it is available
+
+        :return: Seconds spent waiting
+        """
+        with self._lock:
+            self._refill(time.monotonic())
+            self._tokens -= 1
+            self.acquired += 1
+            wait = -self._tokens / self.rate if self._tokens < 0 else 0.0
+            if wait:
+                self.waited += 1
+                self.wait_seconds += wait
+
+        if wait:
+            time.sleep(wait)
+        return wait
+
+    def on_throttle(self):
+        with self._lock:
+            self.throttles += 1
+            now = time.monotonic()
+            if now - self._last_decrease < DECREASE_COOLDOWN:
+                return
+            self._last_decrease = now
+            self._refill(now)
+            self.rate = max(MIN_RATE, self.rate * DECREASE_FACTOR)
+            self._tokens = min(self._tokens, 0.0)
+
+    def on_success(self):
+        if self.rate >= self.max_rate:
+            return
+        with self._lock:
+            self.rate = min(self.max_rate, self.rate + ADDITIVE_INCREASE)
+
+    def stats(self) -> dict:
+        return {
+            'rate': round(self.rate, 2),
+            'acquired': self.acquired,
+            'waited': self.waited,
+            'wait_seconds': round(self.wait_seconds, 3),
+            'throttles': self.throttles,
+        }
+
+    def reset_stats(self):
+        with self._lock:
+            self.acquired = 0
+            self.waited = 0
+            self.wait_seconds = 0.0
+            self.throttles = 0
+
+
+# Limiters are process-wide so adapted rates carry over to warm invocations
+_lock = threading.Lock()
+_limiters: Dict[Tuple[str, Optional[str], Optional[str]], AdaptiveRateLimiter] = {}
+_rate_limits: Dict[str, float] = dict(DEFAULT_RATE_LIMITS)
+
+
+def parse_rate_limits(value: Optional[str]) -> Dict[str, float]:
+    """Parse a "service=rate,service=rate" string (requests per second) into a dict
+
+    :param value: Raw string (e.g. "ec2=10,rds=2.5"), may be empty
+    :return: Dict of service name to rate
+    :raises: ValueError if an entry is malformed or a rate is not a positive number
+    """
+    rate_limits = {}
+    for entry in (value or '').split(','):
+        entry = entry.strip()
+        if not entry:
+            continue
+        service, _, rate = entry.partition('=')
+        try:
+            rate_limits[service.strip()] = float(rate)
+        except ValueError:
+            rate_limits[service.strip()] = 0.0
+        if not service.strip() or rate_limits[service.strip()] <= 0:
+            raise ValueError(f"Invalid rate limit entry '{entry}', expected '<service>=<positive number>'")
+    return rate_limits
+
+
+def configure_rate_limits(rate_limits: Dict[str, float]):
+    """Override the starting rates of services (existing limiters are replaced)
+
+    :param rate_limits: Dict of service name to requests per second
+    """
+    with _lock:
+        _rate_limits.update(rate_limits)
+        for key in list(_limiters):
+            if key[0] in rate_limits:
+                del _limiters[key]
+
+
+def get_limiter(service: str, region: Optional[str], account_id: Optional[str] = None) -> AdaptiveRateLimiter:
+    """Get the shared limiter of a (service, region, account), creating it on first use
+
+    API rate limits apply per account, so each account gets its own limiters.
+    """
+    key = (service, region, account_id)
+    limiter = _limiters.get(key)
+    if limiter is None:
+        with _lock:
+            limiter = _limiters.get(key)
+            if limiter is None:
+                limiter = AdaptiveRateLimiter(_rate_limits.get(service, DEFAULT_RATE_LIMIT))
+                _limiters[key] = limiter
+    return limiter
+
+
+def limiter_stats() -> Dict[str, dict]:
+    """Get counters of all limiters, keyed by "service:region" ("account:service:region" for other accounts)
+
+    :return: Dict of limiter name to rate, acquired, waited, wait_seconds and throttles
+    """
+    with _lock:
+        limiters = dict(_limiters)
+    return {
+        f'{account_id}:{service}:{region}' if account_id else f'{service}:{region}': limiter.stats()
+        for (service, region, account_id), limiter in sorted(limiters.items(), key=lambda item: str(item[0]))
+    }
+
+
+def reset_limiter_stats():
+    with _lock:
+        limiters = list(_limiters.values())
+    for limiter in limiters:
+        limiter.reset_stats()
+
+
+def _error_code(parsed) -> str:
+    if not isinstance(parsed, dict):
+        return ''
+    return parsed.get('Error', {}).get('Code', '')
+
+
+def attach_rate_limiter(client, service: str, region: Optional[str], account_id: Optional[str] = None):
+    """Route every API call of a client through the limiter of its (service, region, account)
+
+    The first attempt of a call takes its token in before-call. Attempts botocore retries
+    do not go through before-call again; they take theirs in request-created, which fires
+    for every attempt. Throttled attempts retried by botocore are reported from
+    needs-retry; the final outcome of a call is reported from after-call, unless its last
+    attempt was already counted.
+
+    :param client: boto3 client
+    :param service: AWS service name
+    :param region: AWS region name
+    :param account_id: Account of the client's credentials (None for the default credentials)
+    """
+    def before_call(context, **kwargs):
+        context['rate_limit_counted'] = False
+        get_limiter(service, region, account_id).acquire()
+
+    def request_created(request, **kwargs):
+        if request.context.get('retries', {}).get('attempt', 1) > 1:
+            get_limiter(service, region, account_id).acquire()
+
+    def needs_retry(response, request_dict, **kwargs):
+        if response is not None and _error_code(response[1]) in THROTTLING_ERRORS:
+            get_limiter(service, region, account_id).on_throttle()
+            request_dict['context']['rate_limit_counted'] = True
+        else:
+            request_dict['context']['rate_limit_counted'] = False
+
+    def after_call(parsed, context, **kwargs):
+        error_code = _error_code(parsed)
+        if error_code in THROTTLING_ERRORS:
+            if not context.get('rate_limit_counted'):
+                get_limiter(service, region, account_id).on_throttle()
+        elif not error_code:
+            get_limiter(service, region, account_id).on_success()
+
+    client.meta.events.register('before-call', before_call)
+    client.meta.events.register('request-created', request_created)
+    client.meta.events.register('needs-retry', needs_retry)
+    client.meta.events.register('after-call', after_call)
@@ -0,0 +1,93 @@
+import logging
+from typing import Dict, FrozenSet, Iterable, List, Optional, Set
+
+logger = logging.getLogger()
+
+# Resource Explorer types each cleanup phase works on. Resource Explorer indexes resources
+# whether or not they are tagged, unlike the Resource Groups Tagging API, which only knows
+# resources that carry (or once carried) a tag. Phases missing here run in every region.
+PHASE_RESOURCE_TYPES: Dict[str, tuple] = {
+    'ec2-instance': ('ec2:instance',),
+    'ec2-tagging': ('ec2:instance',),
+    'ec2-monitoring': ('ec2:instance',),
+    'eip': ('ec2:elastic-ip',),
+    'ebs-volume': ('ec2:volume',),
+    'classic-elb': ('elasticloadbalancing:loadbalancer',),
+    'rds': ('rds:db', 'rds:cluster'),
+    'eks-nodegroup': ('eks:cluster',),
+    'kinesis-stream': ('kinesis:stream',),
+    'msk-cluster': ('kafka:cluster',),
+    'opensearch-domain': ('es:domain',),
+}
+# Resources one Search call returns at most; more results are not paginated past this
+SEARCH_MAX_RESULTS = 1000
+
+
+class RegionMap:
+    """Regions that hold resources of each type, as seen by a Resource Explorer aggregator index.
+
+    Regions without a Resource Explorer index, and types whose search failed, are unknown:
+    every phase may have work there.
+    """
+
+    def __init__(self, indexed_regions: Iterable[str], regions_by_type: Dict[str, FrozenSet[str]]):
+        self.indexed_regions = frozenset(indexed_regions)
+        self.regions_by_type = regions_by_type
+
+    def may_have_work(self, phase_name: str, region: str) -> bool:
+        resource_types = PHASE_RESOURCE_TYPES.get(phase_name)
+        if not resource_types or region not in self.indexed_regions:
+            return True
+        for resource_type in resource_types:
+            regions = self.regions_by_type.get(resource_type)
+            if regions is None or region in regions:
+                return True
+        return False
+
+
+def _regions_of_type(resource_explorer, resource_type: str, regions: Set[str]) -> FrozenSet[str]:
+    """Find the regions holding at least one resource of a type
+
+    A search returns at most SEARCH_MAX_RESULTS resources, so while the result is incomplete
+    the regions already found are excluded from the query and it is repeated; each round finds
+    at least one new region or ends the search.
+    """
+    found: Set[str] = set()
+    while True:
+        query = ' '.join([f'resourcetype:{resource_type}'] + [f'-region:{region}' for region in sorted(found)])
+        response = resource_explorer.search(QueryString=query, MaxResults=SEARCH_MAX_RESULTS)
+        new_regions = {resource['Region'] for resource in response.get('Resources', [])} - found
+        found |= new_regions
+        complete = response.get('Count', {}).get('Complete', True) and not response.get('NextToken')
+        if complete or not new_regions or regions <= found:
+            return frozenset(found)
+
+
+def probe_regions(resource_explorer, regions: List[str],
+                  resource_types: Optional[Iterable[str]] = None) -> Optional[RegionMap]:
+    """Map the resource types of the cleanup phases to the regions that hold them
+
+    Uses the default view of the region the client is in, which must hold the aggregator
+    index for the map to cover other regions.
+
+    :param resource_explorer: resource-explorer-2 client of the aggregator index region
+    :param regions: Regions the run will scan
+    :param resource_types: Types to look up (default: every type of PHASE_RESOURCE_TYPES)
+    :return: RegionMap, or None if Resource Explorer is not usable (every unit then runs)
+    """
+    if resource_types is None:
+        resource_types = {t for types in PHASE_RESOURCE_TYPES.values() for t in types}
+    try:
+        indexed_regions = {index['Region'] for page in resource_explorer.get_paginator('list_indexes').paginate()
+                           for index in page.get('Indexes', [])}
+    except Exception as e:
+        logger.warning(f'Region probe disabled, cannot list Resource Explorer indexes: {str(e)}')
+        return None
+
+    regions_by_type = {}
+    for resource_type in sorted(resource_types):
+        try:
+            regions_by_type[resource_type] = _regions_of_type(resource_explorer, resource_type, set(regions))
+        except Exception as e:
+            logger.warning(f'Region probe of {resource_type} failed, scanning every region for it: {str(e)}')
+    return RegionMap(indexed_regions, regions_by_type)
@@ -0,0 +1,184 @@
+import logging
+import time
+from collections import OrderedDict, deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Callable, Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+logger = logging.getLogger()
+
+DEFAULT_MAX_WORKERS = 10
+DEFAULT_SERVICE_CONCURRENCY = 5
+# Time kept in reserve at the end of an invocation for draining mutations, saving the
+# checkpoint and sending the report
+DEFAULT_SAFETY_MARGIN_SECONDS = 60
+
+
+class TimeBudgetExceeded(BaseException):
+    """Raised by work units that stop early because the invocation is running out of time.
+
+    Derives from BaseException so the per-resource `except Exception` handlers of the
+    cleanup functions let it through to the scheduler.
+    """
+
+
+class TimeBudget:
+    """Remaining execution time of the invocation, minus a safety margin.
+
+    Built from the Lambda context (get_remaining_time_in_millis); without a context the
+    budget is unlimited.
+    """
+
+    def __init__(self, context=None, safety_margin: float = DEFAULT_SAFETY_MARGIN_SECONDS):
+        self.safety_margin = safety_margin
+        self._deadline = None
+        if context is not None and hasattr(context, 'get_remaining_time_in_millis'):
+            self._deadline = time.monotonic() + context.get_remaining_time_in_millis() / 1000.0
+
+    @property
+    def deadline(self) -> Optional[float]:
+        """time.monotonic() value after which no new work should start (None if unlimited)"""
+        if self._deadline is None:
+            return None
+        return self._deadline - self.safety_margin
+
+    def remaining(self) -> Optional[float]:
+        """Seconds left before the safety margin (None if unlimited)"""
+        if self._deadline is None:
+            return None
+        return self.deadline - time.monotonic()
+
+    def exhausted(self) -> bool:
+        return self._deadline is not None and self.remaining() <= 0
+
+    def check(self):
+        """Raise TimeBudgetExceeded once the budget is exhausted"""
+        if self.exhausted():
+            raise TimeBudgetExceeded()
+
+
+class WorkUnit(NamedTuple):
+    """A single (cleanup phase, region) piece of work, in the Lambda's own account or another one."""
+    phase: str
+    service: str
+    region: str
+    func: Callable[[], None]
+    account: str = ''
+
+    @property
+    def label(self) -> str:
+        return f'{self.phase} cleanup for region {self.region}' + (f' in account {self.account}' if self.account else '')
+
+
+class UnitResult(NamedTuple):
+    unit: WorkUnit
+    error: Optional[BaseException]
+
+
+def parse_concurrency_map(value: Optional[str]) -> Dict[str, int]:
+    """Parse a "service=limit,service=limit" string into a dict
+
+    :param value: Raw string (e.g. "ec2=4,rds=2"), may be empty
+    :return: Dict of service name to concurrency limit
+    :raises: ValueError if an entry is malformed or a limit is not a positive integer
+    """
+    limits = {}
+    if not value:
+        return limits
+
+    for entry in value.split(','):
+        entry = entry.strip()
+        if not entry:
+            continue
+        service, sep, limit = entry.partition('=')
+        if not sep or not service.strip() or not limit.strip().isdigit() or int(limit) < 1:
+            raise ValueError(f"Invalid concurrency entry '{entry}', expected '<service>=<positive int>'")
+        limits[service.strip()] = int(limit)
+
+    return limits
+
+
+class WorkScheduler:
+    """Runs work units on a single bounded thread pool.
+
+    A unit is only dispatched while the global worker limit, the limit of its service and
+    the limit of its account all have a free slot, so a slow service or account can never
+    starve the others. Service limits apply per account, since API rate limits do too.
+    (account, service) queues are served round-robin in the order their first unit was
+    submitted.
+    """
+
+    def __init__(self, max_workers: int = DEFAULT_MAX_WORKERS,
+                 service_limits: Optional[Dict[str, int]] = None,
+                 default_service_limit: int = DEFAULT_SERVICE_CONCURRENCY,
+                 account_limit: Optional[int] = None):
+        if max_workers < 1:
+            raise ValueError(f"max_workers must be positive, got: {max_workers}")
+        self.max_workers = max_workers
+        self.service_limits = dict(service_limits or {})
+        self.default_service_limit = default_service_limit
+        self.account_limit = min(account_limit or max_workers, max_workers)
+
+    def limit_for(self, service: str) -> int:
+        return min(self.service_limits.get(service, self.default_service_limit), self.max_workers)
+
+    def run(self, units: Iterable[WorkUnit], budget: Optional[TimeBudget] = None) -> List[UnitResult]:
+        """Run all units to completion, or until the time budget is exhausted
+
+        :param units: Work units to execute
+        :param budget: Optional TimeBudget; once exhausted no further units are dispatched
+        :return: One UnitResult per dispatched unit, in completion order
+        """
+        queues: "OrderedDict[Tuple[str, str], deque]" = OrderedDict()
+        for unit in units:
+            queues.setdefault((unit.account, unit.service), deque()).append(unit)
+
+        in_flight: Dict[Tuple[str, str], int] = {key: 0 for key in queues}
+        account_in_flight: Dict[str, int] = {account: 0 for account, _ in queues}
+        futures = {}
+        results: List[UnitResult] = []
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            while queues or futures:
+                if queues and budget is not None and budget.exhausted():
+                    logger.warning(f'Time budget exhausted, not dispatching '
+                                   f'{sum(len(queue) for queue in queues.values())} remaining work units')
+                    queues.clear()
+
+                dispatched = True
+                while dispatched and len(futures) < self.max_workers:
+                    dispatched = False
+                    for key in list(queues):
+                        if len(futures) >= self.max_workers:
+                            break
+                        account, service = key
+                        if (in_flight[key] >= self.limit_for(service)
+                                or account_in_flight[account] >= self.account_limit):
+                            continue
+                        unit = queues[key].popleft()
+                        if queues[key]:
+                            # Served queues go to the back, so a full pool does not always restart at the first one
+                            queues.move_to_end(key)
+                        else:
+                            del queues[key]
+                        in_flight[key] += 1
+                        account_in_flight[account] += 1
+                        futures[executor.submit(unit.func)] = unit
+                        dispatched = True
+
+                if not futures:
+                    break
+
+                done, _ = wait(futures, return_when=FIRST_COMPLETED)
+                for future in done:
+                    unit = futures.pop(future)
+                    in_flight[(unit.account, unit.service)] -= 1
+                    account_in_flight[unit.account] -= 1
+                    error = future.exception()
+                    if isinstance(error, TimeBudgetExceeded):
+                        logger.warning(f'{unit.label} stopped, out of time')
+                    elif error is not None:
+                        logger.error(f'Error in {unit.label}: {str(error)}')
+                    results.append(UnitResult(unit, error))
+
+        return results
+
@@ -1,28 +1,54 @@
-import os
+import csv
+import gzip
+import io
 
-import boto3
 import logging
+from collections import Counter
+from typing import Optional
+from email.mime.application import MIMEApplication
+from email.mime.multipart import MIMEMultipart
+from email.mime.text import MIMEText
+from html import escape
 from botocore.exceptions import ClientError
 
+from aws_clients import get_client
+from settings import DEFAULT_CACHE_TTL, DEFAULT_REPORT_MAX_BODY_BYTES, DEFAULT_REPORT_TOP_ROWS, DEFAULT_SES_REGION
+from ttl_cache import TtlCache
+
 logger = logging.getLogger()
 
-SES_REGION = os.environ.get('SES_REGION', 'us-east-1')
+REPORT_ATTACHMENT_NAME = 'finops-cleanup-report.csv.gz'
+# Largest raw message SES send_raw_email accepts, attachment included once base64-encoded
+SES_MAX_MESSAGE_BYTES = 10 * 1024 * 1024
+
+# Verified identities are remembered across warm invocations; unverified ones are checked again.
+# Created on first use, with the CACHE_TTL_SECONDS of the container.
+_verified_identities: Optional[TtlCache] = None
 
 
-def verify_email_identity(email_address):
+def verify_email_identity(email_address, ses_region=DEFAULT_SES_REGION, cache_ttl=DEFAULT_CACHE_TTL):
     """Verify if an email identity is verified in SES
 
     :param email_address: Email address to verify
+    :param ses_region: Region of the SES identity
+    :param cache_ttl: Seconds a verified identity is remembered
     :return: Boolean indicating if email is verified
     """
+    global _verified_identities
+    if _verified_identities is None:
+        _verified_identities = TtlCache(cache_ttl)
+    if _verified_identities.get(email_address):
+        return True
+
     try:
-        ses_client = boto3.client('ses', region_name=SES_REGION)
+        ses_client = get_client('ses', region_name=ses_region)
         response = ses_client.get_identity_verification_attributes(Identities=[email_address])
 
         verification_status = response.get('VerificationAttributes', {}).get(email_address, {}).get('VerificationStatus')
 
         if verification_status == 'Success':
             logger.info(f'Email identity {email_address} is verified')
+            _verified_identities.set(email_address, True)
             return True
         else:
             logger.warning(f'Email identity {email_address} is not verified. Status: {verification_status}')
@@ -33,16 +59,7 @@ def verify_email_identity(email_address):
         return False
 
 
-def get_email_body(deleted_resources, skip_delete_resources, notify_resources, check_resources):
-    """Generate HTML email body with resource cleanup results
-
-    :param deleted_resources: List of tuples (resource_type, resource_id) that were deleted
-    :param skip_delete_resources: List of tuples (resource_type, resource_id) that were skipped (dry run)
-    :param notify_resources: List of tuples (resource_type, resource_id) that need attention
-    :param check_resources: List of tuples (resource_type, resource_id) that failed deletion
-    :return: HTML formatted email body
-    """
-    html_body = """
+HTML_HEAD = """
     <html>
     <head>
         <style>
@@ -108,6 +125,7 @@ def get_email_body(deleted_resources, skip_delete_resources, notify_resources, c
             .skipped { color: #f39c12; }
             .failed { color: #e74c3c; }
             .notify { color: #9b59b6; }
+            .pending { color: #2980b9; }
             .footer {
                 margin-top: 30px;
                 padding-top: 20px;
@@ -122,135 +140,191 @@ def get_email_body(deleted_resources, skip_delete_resources, notify_resources, c
 
         <div class="summary">
             <h2>Summary</h2>
-    """
+"""
 
-    # Add summary counts
-    html_body += f"""
-            <div class="summary-item">
-                <div>Deleted/Stopped</div>
-                <div class="count deleted">{len(deleted_resources)}</div>
-            </div>
-            <div class="summary-item">
-                <div>Skipped (Dry Run)</div>
-                <div class="count skipped">{len(skip_delete_resources)}</div>
-            </div>
+SUMMARY_ITEM = """
             <div class="summary-item">
-                <div>Failed</div>
-                <div class="count failed">{len(check_resources)}</div>
-            </div>
-            <div class="summary-item">
-                <div>Needs Attention</div>
-                <div class="count notify">{len(notify_resources)}</div>
-            </div>
-        </div>
-    """
+                <div>{label}</div>
+                <div class="count {css_class}">{count}</div>
+            </div>"""
 
-    # Skipped resources (Dry Run)
-    if skip_delete_resources:
-        html_body += """
-        <h2>Resources to be Deleted/Stopped (Dry Run Mode)</h2>
+TABLE_HEAD = """
+        <h2{style}>{title}</h2>
         <table>
             <tr>
-                <th>Resource Type</th>
-                <th>Resource ID / Description</th>
+                <th>{first}</th>
+                <th>{second}</th>
             </tr>
-        """
-        for resource_type, resource_id in skip_delete_resources:
-            html_body += f"""
-            <tr>
-                <td><strong>{resource_type}</strong></td>
-                <td>{resource_id}</td>
-            </tr>
-            """
-        html_body += "</table>"
+"""
 
-    # Deleted resources
-    if deleted_resources:
-        html_body += """
-        <h2>Successfully Deleted/Stopped Resources</h2>
-        <table>
-            <tr>
-                <th>Resource Type</th>
-                <th>Resource ID / Description</th>
-            </tr>
-        """
-        for resource_type, resource_id in deleted_resources:
-            html_body += f"""
-            <tr>
-                <td><strong>{resource_type}</strong></td>
-                <td>{resource_id}</td>
-            </tr>
-            """
-        html_body += "</table>"
-
-    # Failed resources
-    if check_resources:
-        html_body += """
-        <h2 style="color: #e74c3c;">Failed to Delete/Stop (Action Required)</h2>
-        <table>
-            <tr>
-                <th>Resource Type</th>
-                <th>Resource ID</th>
+TABLE_ROW = """            <tr>
+                <td><strong>{}</strong></td>
+                <td>{}</td>
             </tr>
-        """
-        for resource_type, resource_id in check_resources:
-            html_body += f"""
-            <tr>
-                <td><strong>{resource_type}</strong></td>
-                <td>{resource_id}</td>
-            </tr>
-            """
-        html_body += "</table>"
+"""
 
-    # Resources needing attention
-    if notify_resources:
-        html_body += """
-        <h2 style="color: #9b59b6;">Resources Needing Attention</h2>
-        <table>
-            <tr>
-                <th>Resource Type</th>
-                <th>Resource ID</th>
-            </tr>
-        """
-        for resource_type, resource_id in notify_resources:
-            html_body += f"""
-            <tr>
-                <td><strong>{resource_type}</strong></td>
-                <td>{resource_id}</td>
-            </tr>
-            """
-        html_body += "</table>"
+ATTACHMENT_NOTE = """
+        <div class="summary">
+            <p><strong>{}</strong></p>
+        </div>
+"""
 
-    # No resources found
-    if not (deleted_resources or skip_delete_resources or check_resources or notify_resources):
-        html_body += """
+NO_RESOURCES = """
         <div class="summary">
             <p><strong>No resources found for cleanup in any category.</strong></p>
             <p>All resources are either in use or protected by tags.</p>
         </div>
-        """
+"""
 
-    html_body += """
+HTML_FOOTER = """
         <div class="footer">
             <p>This is an automated report from AWS FinOps Resource Cleanup Lambda function.</p>
             <p>For questions or concerns, please contact your DevOps team.</p>
         </div>
     </body>
     </html>
+"""
+
+
+class _BudgetExceeded(Exception):
+    pass
+
+
+class _ReportWriter:
+    """Buffered writer that stops once the rendered size passes the budget."""
+
+    def __init__(self, max_bytes=None):
+        self.max_bytes = max_bytes
+        self.size = 0
+        self._buffer = io.StringIO()
+
+    def write(self, text):
+        self.size += len(text.encode('utf-8')) if not text.isascii() else len(text)
+        if self.max_bytes is not None and self.size > self.max_bytes:
+            raise _BudgetExceeded()
+        self._buffer.write(text)
+
+    def getvalue(self):
+        return self._buffer.getvalue()
+
+
+def _report_sections(deleted_resources, skip_delete_resources, notify_resources, check_resources,
+                     pending_resources):
+    """Report sections in display order: (status, title, h2 style, id column, rows)"""
+    return [
+        ('skipped', 'Resources to be Deleted/Stopped (Dry Run Mode)', '',
+         'Resource ID / Description', skip_delete_resources),
+        ('deleted', 'Successfully Deleted/Stopped Resources', '',
+         'Resource ID / Description', deleted_resources),
+        ('pending', 'Pending Confirmation (Still Transitioning)', '#2980b9',
+         'Resource ID', pending_resources),
+        ('failed', 'Failed to Delete/Stop (Action Required)', '#e74c3c',
+         'Resource ID', check_resources),
+        ('notify', 'Resources Needing Attention', '#9b59b6',
+         'Resource ID', notify_resources),
+    ]
+
+
+def _write_table(writer, title, style, first, second, rows):
+    writer.write(TABLE_HEAD.format(style=f' style="color: {style};"' if style else '', title=title,
+                                   first=first, second=second))
+    for first_value, second_value in rows:
+        writer.write(TABLE_ROW.format(escape(str(first_value)), escape(str(second_value))))
+    writer.write("        </table>\n")
+
+
+def get_email_body(deleted_resources, skip_delete_resources, notify_resources, check_resources,
+                   pending_resources=None, max_rows=None, max_bytes=None, attachment_note=None):
+    """Generate HTML email body with resource cleanup results
+
+    Rows are escaped and written through a buffered writer, so rendering cost is linear
+    in the number of rows.
+
+    :param deleted_resources: List of tuples (resource_type, resource_id) that were deleted
+    :param skip_delete_resources: List of tuples (resource_type, resource_id) that were skipped (dry run)
+    :param notify_resources: List of tuples (resource_type, resource_id) that need attention
+    :param check_resources: List of tuples (resource_type, resource_id) that failed deletion
+    :param pending_resources: List of tuples (resource_type, resource_id) accepted but not confirmed in time
+    :param max_rows: If set, show per-type counts and only the first max_rows rows of each section
+    :param max_bytes: If set, give up once the body grows past this size
+    :param attachment_note: If set, shown under the summary to explain what the attachment holds
+    :return: HTML formatted email body, or None if it would exceed max_bytes
     """
+    pending_resources = pending_resources or []
+    sections = _report_sections(deleted_resources, skip_delete_resources, notify_resources, check_resources,
+                                pending_resources)
+    writer = _ReportWriter(max_bytes)
+
+    try:
+        writer.write(HTML_HEAD)
+
+        # Add summary counts
+        for label, css_class, rows in (('Deleted/Stopped', 'deleted', deleted_resources),
+                                       ('Skipped (Dry Run)', 'skipped', skip_delete_resources),
+                                       ('Failed', 'failed', check_resources),
+                                       ('Needs Attention', 'notify', notify_resources),
+                                       ('Pending Confirmation', 'pending', pending_resources)):
+            writer.write(SUMMARY_ITEM.format(label=label, css_class=css_class, count=len(rows)))
+        writer.write("\n        </div>\n")
+        if attachment_note:
+            writer.write(ATTACHMENT_NOTE.format(escape(attachment_note)))
+
+        for status, title, style, id_column, rows in sections:
+            if not rows:
+                continue
+            if max_rows is not None and len(rows) > max_rows:
+                counts = Counter(resource_type for resource_type, _ in rows)
+                _write_table(writer, f'{title} - Counts by Type', style, 'Resource Type', 'Count',
+                             sorted(counts.items()))
+                _write_table(writer, f'{title} - First {max_rows} of {len(rows)} (see attachment)',
+                             style, 'Resource Type', id_column, rows[:max_rows])
+            else:
+                _write_table(writer, title, style, 'Resource Type', id_column, rows)
+
+        # No resources found
+        if not any(rows for _, _, _, _, rows in sections):
+            writer.write(NO_RESOURCES)
 
-    return html_body
+        writer.write(HTML_FOOTER)
 
+    except _BudgetExceeded:
+        return None
 
-def send_html_email(from_address, to_address, subject, html_body):
+    return writer.getvalue()
+
+
+def get_report_csv(deleted_resources, skip_delete_resources, notify_resources, check_resources,
+                   pending_resources=None, max_rows=None):
+    """Generate the full report as a gzip-compressed CSV (status, resource_type, resource_id)
+
+    :param max_rows: If set, write only the first max_rows rows, in report section order
+    :return: Compressed CSV bytes
+    """
+    sections = _report_sections(deleted_resources, skip_delete_resources, notify_resources, check_resources,
+                                pending_resources or [])
+    compressed = io.BytesIO()
+    with gzip.GzipFile(fileobj=compressed, mode='wb') as gz:
+        with io.TextIOWrapper(gz, encoding='utf-8', newline='') as text:
+            writer = csv.writer(text)
+            writer.writerow(['status', 'resource_type', 'resource_id'])
+            remaining = max_rows
+            for status, _, _, _, rows in sections:
+                if remaining is not None:
+                    rows, remaining = rows[:remaining], remaining - len(rows[:remaining])
+                writer.writerows((status, resource_type, resource_id) for resource_type, resource_id in rows)
+    return compressed.getvalue()
+
+
+def send_html_email(from_address, to_address, subject, html_body, ses_region=DEFAULT_SES_REGION):
     """Send HTML formatted email using SES
 
     :param from_address: Sender email address (must be verified in SES)
     :param to_address: Recipient email address
     :param subject: Email subject
     :param html_body: HTML formatted email body
+    :param ses_region: Region SES is called in
     """
-    ses_client = boto3.client('ses', region_name=SES_REGION)
+    ses_client = get_client('ses', region_name=ses_region)
 
     try:
         response = ses_client.send_email(
@@ -280,22 +354,133 @@ def send_html_email(from_address, to_address, subject, html_body):
         return False
 
 
-def send_email(from_address, to_address, deleted_resources, skip_delete_resources, notify_resources, check_resources):
+def get_raw_message(from_address, to_address, subject, html_body, attachment, attachment_name):
+    """Build the MIME message of an HTML email with one gzip attachment
+
+    :return: Encoded message, as sent to SES send_raw_email
+    """
+    message = MIMEMultipart('mixed')
+    message['Subject'] = subject
+    message['From'] = from_address
+    message['To'] = to_address
+    message.attach(MIMEText(html_body, 'html', 'utf-8'))
+    part = MIMEApplication(attachment, 'gzip', Name=attachment_name)
+    part['Content-Disposition'] = f'attachment; filename="{attachment_name}"'
+    message.attach(part)
+    return message.as_bytes()
+
+
+def send_raw_email(from_address, to_address, raw_message, ses_region=DEFAULT_SES_REGION):
+    """Send a MIME message using SES send_raw_email
+
+    :param from_address: Sender email address (must be verified in SES)
+    :param to_address: Recipient email address
+    :param raw_message: Encoded message (see get_raw_message)
+    :param ses_region: Region SES is called in
+    """
+    ses_client = get_client('ses', region_name=ses_region)
+
+    try:
+        response = ses_client.send_raw_email(
+            Source=from_address,
+            Destinations=[to_address],
+            RawMessage={'Data': raw_message}
+        )
+
+        logger.info(f'Email sent successfully. Message ID: {response["MessageId"]}')
+        return True
+
+    except ClientError as e:
+        logger.error(f'Error sending email: {str(e)}')
+        return False
+
+
+def send_html_email_with_attachment(from_address, to_address, subject, html_body, attachment, attachment_name,
+                                    ses_region=DEFAULT_SES_REGION):
+    """Send HTML formatted email with one attachment using SES send_raw_email
+
+    :param from_address: Sender email address (must be verified in SES)
+    :param to_address: Recipient email address
+    :param subject: Email subject
+    :param html_body: HTML formatted email body
+    :param attachment: Attachment content
+    :param attachment_name: Attachment file name
+    :param ses_region: Region SES is called in
+    """
+    return send_raw_email(from_address, to_address,
+                          get_raw_message(from_address, to_address, subject, html_body, attachment, attachment_name),
+                          ses_region)
+
+
+def send_summary_email(from_address, to_address, subject, resources, top_rows=DEFAULT_REPORT_TOP_ROWS,
+                       ses_region=DEFAULT_SES_REGION):
+    """Send the summarized report with the full list as a CSV attachment, within the SES size limit
+
+    When the encoded message would exceed SES_MAX_MESSAGE_BYTES, the attachment is cut down
+    to the rows that fit, and the body says so.
+
+    :param from_address: Sender email address (must be verified in SES)
+    :param to_address: Recipient email address
+    :param subject: Email subject
+    :param resources: Report sections, in get_email_body argument order
+    :param top_rows: Rows shown per section of the body
+    :param ses_region: Region SES is called in
+    """
+    total_rows = sum(len(rows or []) for rows in resources)
+    max_rows, note = None, None
+    while True:
+        html_body = get_email_body(*resources, max_rows=top_rows, attachment_note=note)
+        raw_message = get_raw_message(from_address, to_address, subject, html_body,
+                                      get_report_csv(*resources, max_rows=max_rows), REPORT_ATTACHMENT_NAME)
+        if len(raw_message) <= SES_MAX_MESSAGE_BYTES:
+            return send_raw_email(from_address, to_address, raw_message, ses_region)
+
+        # Rows take roughly the same room each: shrink in proportion, with a margin for the body
+        rows = total_rows if max_rows is None else max_rows
+        max_rows = int(rows * SES_MAX_MESSAGE_BYTES / len(raw_message) * 0.9)
+        if max_rows < 1:
+            logger.warning(f'Report attachment does not fit in {SES_MAX_MESSAGE_BYTES} bytes, sending the summary only')
+            return send_html_email(from_address, to_address, subject, get_email_body(
+                *resources, max_rows=top_rows,
+                attachment_note='The full list is too large to attach to this email.'), ses_region)
+        logger.warning(f'Report attachment exceeds {SES_MAX_MESSAGE_BYTES} bytes, '
+                       f'attaching the first {max_rows} of {total_rows} resources')
+        note = (f'The attachment lists the first {max_rows} of {total_rows} resources; '
+                f'the full list exceeds the {SES_MAX_MESSAGE_BYTES // (1024 * 1024)} MB email size limit.')
+
+
+def send_email(from_address, to_address, deleted_resources, skip_delete_resources, notify_resources, check_resources,
+               pending_resources=None, ses_region=DEFAULT_SES_REGION, max_body_bytes=DEFAULT_REPORT_MAX_BODY_BYTES,
+               top_rows=DEFAULT_REPORT_TOP_ROWS, cache_ttl=DEFAULT_CACHE_TTL):
     """Main function to send email notification about resource cleanup
 
+    Reports larger than max_body_bytes are sent as a summary with the first top_rows
+    rows of each section, plus the full list as a CSV attachment, cut down if needed to
+    keep the message within the SES size limit.
+
     :param from_address: Sender email address
     :param to_address: Recipient email address
     :param deleted_resources: List of deleted resources
     :param skip_delete_resources: List of skipped resources (dry run)
     :param notify_resources: List of resources needing attention
     :param check_resources: List of failed deletions
+    :param pending_resources: List of mutations not confirmed before the verification deadline
+    :param ses_region: Region SES is called in
+    :param max_body_bytes: Largest HTML body sent inline
+    :param top_rows: Rows shown per section of a summarized report
+    :param cache_ttl: Seconds a verified sender identity is remembered
     """
     subject = "AWS FinOps: Resource Cleanup Report"
-    verified = verify_email_identity(from_address)
+    verified = verify_email_identity(from_address, ses_region, cache_ttl)
 
     if verified:
-        html_body = get_email_body(deleted_resources, skip_delete_resources, notify_resources, check_resources)
-        send_html_email(from_address, to_address, subject, html_body)
+        resources = (deleted_resources, skip_delete_resources, notify_resources, check_resources, pending_resources)
+        html_body = get_email_body(*resources, max_bytes=max_body_bytes)
+        if html_body is not None:
+            send_html_email(from_address, to_address, subject, html_body, ses_region)
+        else:
+            logger.info(f'Report exceeds {max_body_bytes} bytes, sending a summary with a CSV attachment')
+            send_summary_email(from_address, to_address, subject, resources, top_rows, ses_region)
         logger.info("Email sent successfully")
     else:
         logger.warning("Warning: Email address is not verified yet, unable to send email notification.")
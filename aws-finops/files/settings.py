@@ -0,0 +1,231 @@
+import logging
+import os
+import re
+from typing import TYPE_CHECKING, Dict, NamedTuple, Optional, Tuple
+
+from aws_clients import (DEFAULT_CONNECT_TIMEOUT, DEFAULT_MAX_ATTEMPTS, DEFAULT_READ_TIMEOUT, DEFAULT_RETRY_MODE,
+                         RETRY_MODES)
+from pipeline import DEFAULT_VERIFY_TIMEOUT
+from rate_limit import parse_rate_limits
+from scheduler import DEFAULT_MAX_WORKERS, DEFAULT_SAFETY_MARGIN_SECONDS, parse_concurrency_map
+from telemetry import DEFAULT_METRICS_NAMESPACE
+
+if TYPE_CHECKING:
+    from checkpoint import CheckpointStore
+
+logger = logging.getLogger()
+
+# Default regions if not specified
+DEFAULT_REGIONS = (
+    'us-east-1',
+    'us-east-2',
+    'us-west-1',
+    'us-west-2',
+    'eu-north-1',
+    'eu-central-1',
+    'eu-west-1'
+)
+# How long warm containers reuse discovered regions and the SES identity verification
+DEFAULT_CACHE_TTL = 3600
+# Role assumed in each target account in organization mode
+DEFAULT_ROLE_NAME = 'FinOpsCleanupRole'
+DEFAULT_SES_REGION = 'us-east-1'
+# SES rejects messages over 10 MB after MIME encoding; larger reports are summarized in the
+# body and attached in full as a gzip-compressed CSV
+DEFAULT_REPORT_MAX_BODY_BYTES = 5 * 1024 * 1024
+# Rows shown per section of a summarized report
+DEFAULT_REPORT_TOP_ROWS = 100
+
+
+def validate_email(email: str) -> bool:
+    """Validate email address format"""
+    pattern = r'^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$'
+    return re.match(pattern, email) is not None
+
+
+def get_validated_env(key: str, default: Optional[str] = None, required: bool = True) -> Optional[str]:
+    """Get and validate environment variable
+
+    :param key: Environment variable name
+    :param default: Default value if not set
+    :param required: Whether variable is required
+    :return: Environment variable value
+    :raises: ValueError if required variable is missing or invalid
+    """
+    value = os.environ.get(key, default)
+
+    if required and not value:
+        raise ValueError(f"Required environment variable '{key}' is not set")
+
+    # Validate specific environment variables
+    if key in ['EMAIL_IDENTITY', 'TO_ADDRESS'] and value:
+        if not validate_email(value):
+            raise ValueError(f"Invalid email format for '{key}': {value}")
+
+    if key == 'DRY_RUN' and value:
+        if value.lower() not in ['true', 'false']:
+            raise ValueError(f"DRY_RUN must be 'true' or 'false', got: {value}")
+
+    if key == 'MAX_WORKERS' and value:
+        if not value.isdigit() or int(value) < 1:
+            raise ValueError(f"MAX_WORKERS must be a positive integer, got: {value}")
+
+    if key == 'CHECK_ALL_REGIONS' and value:
+        if value.lower() not in ['true', 'false']:
+            raise ValueError(f"CHECK_ALL_REGIONS must be 'true' or 'false', got: {value}")
+
+    if key == 'VERIFY_MUTATIONS' and value:
+        if value.lower() not in ['true', 'false']:
+            raise ValueError(f"VERIFY_MUTATIONS must be 'true' or 'false', got: {value}")
+
+    if key == 'VERIFY_TIMEOUT_SECONDS' and value:
+        if not value.isdigit() or int(value) < 1:
+            raise ValueError(f"VERIFY_TIMEOUT_SECONDS must be a positive integer, got: {value}")
+
+    if key == 'APPLY_PLAN' and value:
+        if value.lower() not in ['true', 'false']:
+            raise ValueError(f"APPLY_PLAN must be 'true' or 'false', got: {value}")
+
+    if key == 'API_METRICS' and value:
+        if value.lower() not in ['true', 'false']:
+            raise ValueError(f"API_METRICS must be 'true' or 'false', got: {value}")
+
+    if key in ['ACCOUNT_CONCURRENCY', 'CACHE_TTL_SECONDS'] and value:
+        if not value.isdigit():
+            raise ValueError(f"{key} must be a non-negative integer, got: {value}")
+
+    if key in ['REPORT_MAX_BODY_BYTES', 'REPORT_TOP_ROWS'] and value:
+        if not value.isdigit() or int(value) < 1:
+            raise ValueError(f"{key} must be a positive integer, got: {value}")
+
+    if key in ['BOTO_CONNECT_TIMEOUT', 'BOTO_READ_TIMEOUT'] and value:
+        try:
+            valid = float(value) > 0
+        except ValueError:
+            valid = False
+        if not valid:
+            raise ValueError(f"{key} must be a positive number, got: {value}")
+
+    if key == 'BOTO_MAX_ATTEMPTS' and value:
+        if not value.isdigit() or int(value) < 1:
+            raise ValueError(f"BOTO_MAX_ATTEMPTS must be a positive integer, got: {value}")
+
+    if key == 'BOTO_RETRY_MODE' and value:
+        if value not in RETRY_MODES:
+            raise ValueError(f"BOTO_RETRY_MODE must be one of {', '.join(RETRY_MODES)}, got: {value}")
+
+    if key == 'SAFETY_MARGIN_SECONDS' and value:
+        if not value.isdigit():
+            raise ValueError(f"SAFETY_MARGIN_SECONDS must be a non-negative integer, got: {value}")
+
+    return value
+
+
+def get_store(key: str) -> Optional["CheckpointStore"]:
+    """Build the CheckpointStore of a location variable (see checkpoint.get_checkpoint_store())
+
+    :param key: Environment variable name
+    :return: CheckpointStore, or None if the variable is not set
+    """
+    location = get_validated_env(key, default='', required=False)
+    if not location:
+        return None
+    # Imported on first use: stores are optional, most runs configure none
+    from checkpoint import get_checkpoint_store
+    return get_checkpoint_store(location)
+
+
+class Settings(NamedTuple):
+    """Settings of the Lambda, parsed once from the environment."""
+    keep_tag_key: str
+    keep_tag_value: str
+    dry_run: bool
+    from_address: str
+    to_address: str
+    regions: Tuple[str, ...]
+    check_all_regions: bool
+    max_workers: int
+    service_concurrency: Dict[str, int]
+    rate_limits: Dict[str, float]
+    config_aggregator_name: Optional[str]
+    config_aggregator_region: str
+    verify_mutations: bool
+    verify_timeout: int
+    safety_margin: int
+    checkpoint_store: Optional["CheckpointStore"]
+    snapshot_store: Optional["CheckpointStore"]
+    accounts: str
+    assume_role_name: str
+    account_concurrency: int
+    api_metrics: bool
+    metrics_namespace: str
+    cache_ttl: int
+    resource_explorer_region: Optional[str]
+    plan_store: Optional["CheckpointStore"]
+    apply_plan: bool
+    ses_region: str
+    report_max_body_bytes: int
+    report_top_rows: int
+    boto_connect_timeout: float
+    boto_read_timeout: float
+    boto_max_attempts: int
+    boto_retry_mode: str
+
+
+def load_settings() -> Settings:
+    """Read and validate every setting from the environment
+
+    :return: Settings
+    :raises: ValueError if a required variable is missing or a value is invalid
+    """
+    max_workers = int(get_validated_env('MAX_WORKERS', default=str(DEFAULT_MAX_WORKERS), required=False))
+    regions = get_validated_env('REGIONS', default='', required=False)
+    plan_store = get_store('PLAN_STORE')
+    apply_plan = get_validated_env('APPLY_PLAN', default='false', required=False).lower() == 'true'
+    if apply_plan and plan_store is None:
+        raise ValueError("APPLY_PLAN requires PLAN_STORE to be set")
+    return Settings(
+        keep_tag_key=get_validated_env('KEEP_TAG_KEY', default='auto-deletion', required=False),
+        keep_tag_value=get_validated_env('KEEP_TAG_VALUE', default='skip-resource', required=False),
+        dry_run=get_validated_env('DRY_RUN', default='true', required=False).lower() == 'true',
+        from_address=get_validated_env('EMAIL_IDENTITY', required=True),
+        to_address=get_validated_env('TO_ADDRESS', required=True),
+        regions=tuple(r.strip() for r in regions.split(',') if r.strip()) if regions else DEFAULT_REGIONS,
+        check_all_regions=get_validated_env('CHECK_ALL_REGIONS', default='false', required=False).lower() == 'true',
+        max_workers=max_workers,
+        service_concurrency=parse_concurrency_map(get_validated_env('SERVICE_CONCURRENCY', default='',
+                                                                    required=False)),
+        rate_limits=parse_rate_limits(get_validated_env('RATE_LIMITS', default='', required=False)),
+        config_aggregator_name=get_validated_env('CONFIG_AGGREGATOR_NAME', default='', required=False) or None,
+        config_aggregator_region=get_validated_env('CONFIG_AGGREGATOR_REGION',
+                                                   default=os.environ.get('AWS_REGION', 'us-east-1'), required=False),
+        verify_mutations=get_validated_env('VERIFY_MUTATIONS', default='false', required=False).lower() == 'true',
+        verify_timeout=int(get_validated_env('VERIFY_TIMEOUT_SECONDS', default=str(DEFAULT_VERIFY_TIMEOUT),
+                                             required=False)),
+        safety_margin=int(get_validated_env('SAFETY_MARGIN_SECONDS', default=str(DEFAULT_SAFETY_MARGIN_SECONDS),
+                                            required=False)),
+        checkpoint_store=get_store('CHECKPOINT_STORE'),
+        snapshot_store=get_store('SNAPSHOT_STORE'),
+        accounts=get_validated_env('ACCOUNTS', default='', required=False),
+        assume_role_name=get_validated_env('ASSUME_ROLE_NAME', default=DEFAULT_ROLE_NAME, required=False),
+        account_concurrency=int(get_validated_env('ACCOUNT_CONCURRENCY', default=str(max_workers), required=False)
+                                or max_workers),
+        api_metrics=get_validated_env('API_METRICS', default='true', required=False).lower() == 'true',
+        metrics_namespace=get_validated_env('METRICS_NAMESPACE', default=DEFAULT_METRICS_NAMESPACE, required=False),
+        cache_ttl=int(get_validated_env('CACHE_TTL_SECONDS', default=str(DEFAULT_CACHE_TTL), required=False)),
+        resource_explorer_region=get_validated_env('RESOURCE_EXPLORER_REGION', default='', required=False) or None,
+        plan_store=plan_store,
+        apply_plan=apply_plan,
+        ses_region=get_validated_env('SES_REGION', default=DEFAULT_SES_REGION, required=False),
+        report_max_body_bytes=int(get_validated_env('REPORT_MAX_BODY_BYTES', default=str(DEFAULT_REPORT_MAX_BODY_BYTES),
+                                                    required=False)),
+        report_top_rows=int(get_validated_env('REPORT_TOP_ROWS', default=str(DEFAULT_REPORT_TOP_ROWS),
+                                              required=False)),
+        boto_connect_timeout=float(get_validated_env('BOTO_CONNECT_TIMEOUT', default=str(DEFAULT_CONNECT_TIMEOUT),
+                                                     required=False)),
+        boto_read_timeout=float(get_validated_env('BOTO_READ_TIMEOUT', default=str(DEFAULT_READ_TIMEOUT),
+                                                  required=False)),
+        boto_max_attempts=int(get_validated_env('BOTO_MAX_ATTEMPTS', default=str(DEFAULT_MAX_ATTEMPTS),
+                                                required=False)),
+        boto_retry_mode=get_validated_env('BOTO_RETRY_MODE', default=DEFAULT_RETRY_MODE, required=False),
+    )
@@ -0,0 +1,184 @@
+import hashlib
+import json
+import logging
+import threading
+import time
+import zlib
+from typing import TYPE_CHECKING, Dict, Iterable, List, Optional
+
+if TYPE_CHECKING:
+    from checkpoint import CheckpointStore
+
+logger = logging.getLogger()
+
+SNAPSHOT_VERSION = 1
+SNAPSHOT_KEY = 'snapshot.json.z'
+# Verdicts older than this are re-evaluated even if the resource did not change, so
+# conditions outside the resource itself (e.g. its EKS cluster being deleted) are noticed
+DEFAULT_REEVALUATE_AFTER = 7 * 24 * 3600
+# Resources not seen for this long are dropped from the snapshot
+DEFAULT_SNAPSHOT_MAX_AGE = 14 * 24 * 3600
+
+# Verdicts worth remembering: each one saves API calls on the next run. Checks the
+# per-region indexes answer from memory (protection, EKS clusters) are not cached.
+NO_CONFIG_HISTORY = 'no-config-history'
+
+# Entry fields: [state, tags hash, verdict, evaluated at, last seen]
+STATE, TAGS_HASH, VERDICT, EVALUATED_AT, LAST_SEEN = range(5)
+
+
+def tags_hash(tags: Iterable) -> str:
+    """Stable short hash of a tag set
+
+    :param tags: List of tag dicts with Key/Value, or of (key, value) tuples
+    :return: Hex digest, independent of tag order
+    """
+    pairs = sorted((tag['Key'], tag.get('Value', '')) if isinstance(tag, dict) else tuple(tag) for tag in tags)
+    return hashlib.blake2b(json.dumps(pairs).encode(), digest_size=8).hexdigest()
+
+
+def fingerprint(*values) -> str:
+    """Short stable hash of the values a cleanup decision was based on (see plan.PlanEntry)
+
+    :param values: JSON-serializable values (e.g. resource state, tags_hash() of its tags)
+    :return: Hex digest
+    """
+    return hashlib.blake2b(json.dumps(values, default=str).encode(), digest_size=6).hexdigest()
+
+
+class ResourceSnapshot:
+    """Resource inventory of the previous run, used to skip re-evaluating unchanged resources.
+
+    Entries are kept per (resource kind, region) and hold the resource state, a hash of
+    its tags, the verdict reached about it and when. A scan that finds a resource with
+    the same state and tags hash reuses the verdict instead of evaluating it again. The
+    snapshot is a zlib-compressed JSON document in a CheckpointStore; without a store
+    every lookup misses and nothing is saved.
+    """
+
+    def __init__(self, store: Optional["CheckpointStore"] = None,
+                 reevaluate_after: float = DEFAULT_REEVALUATE_AFTER,
+                 max_age: float = DEFAULT_SNAPSHOT_MAX_AGE):
+        self.store = store
+        self.reevaluate_after = reevaluate_after
+        self.max_age = max_age
+        self._lock = threading.Lock()
+        self._previous: Optional[Dict[str, Dict[str, List]]] = None
+        self._current: Dict[str, Dict[str, List]] = {}
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.store is not None
+
+    def for_account(self, account: str) -> "AccountSnapshot":
+        """Get a view keeping the entries of one account apart from the others"""
+        return AccountSnapshot(self, account)
+
+    def _load(self) -> Dict[str, Dict[str, List]]:
+        with self._lock:
+            if self._previous is None:
+                self._previous = {}
+                try:
+                    data = self.store.load(SNAPSHOT_KEY)
+                    if data is not None:
+                        state = json.loads(zlib.decompress(data))
+                        if state.get('version') == SNAPSHOT_VERSION:
+                            self._previous = state['resources']
+                            logger.info(f'Loaded resource snapshot with '
+                                        f'{sum(len(group) for group in self._previous.values())} resources')
+                except Exception as e:
+                    logger.warning(f'Error loading resource snapshot, scanning everything: {str(e)}')
+            return self._previous
+
+    def lookup(self, kind: str, region: str, resource_id: str, state: str, tag_hash: str) -> Optional[str]:
+        """Get the previous verdict of a resource if it is unchanged and recent enough
+
+        A hit also carries the entry over to the snapshot saved by this run.
+
+        :param kind: Resource kind (e.g. 'ebs-volume')
+        :param region: AWS region name
+        :param resource_id: Resource id
+        :param state: Current resource state
+        :param tag_hash: tags_hash() of the current tags
+        :return: Previous verdict, or None if the resource has to be evaluated
+        """
+        if not self.enabled:
+            return None
+        group = f'{kind}:{region}'
+        entry = self._load().get(group, {}).get(resource_id)
+        now = time.time()
+        if (entry is None or entry[STATE] != state or entry[TAGS_HASH] != tag_hash
+                or now - entry[EVALUATED_AT] > self.reevaluate_after):
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        with self._lock:
+            self._current.setdefault(group, {})[resource_id] = entry[:LAST_SEEN] + [int(now)]
+        return entry[VERDICT]
+
+    def record(self, kind: str, region: str, resource_id: str, state: str, tag_hash: str, verdict: str):
+        """Remember the verdict reached about a resource for the next run
+
+        :param kind: Resource kind (e.g. 'ebs-volume')
+        :param region: AWS region name
+        :param resource_id: Resource id
+        :param state: Current resource state
+        :param tag_hash: tags_hash() of the current tags
+        :param verdict: Verdict (e.g. NO_CONFIG_HISTORY)
+        """
+        if not self.enabled:
+            return
+        now = int(time.time())
+        with self._lock:
+            self._current.setdefault(f'{kind}:{region}', {})[resource_id] = [state, tag_hash, verdict, now, now]
+
+    def save(self):
+        """Save the entries of this run, plus recent entries of resources it did not scan"""
+        if not self.enabled:
+            return
+        with self._lock:
+            if self._previous is None and not self._current:
+                # Nothing was looked up or recorded: the stored snapshot is still current
+                return
+        cutoff = time.time() - self.max_age
+        resources = {}
+        for group, entries in self._load().items():
+            kept = {resource_id: entry for resource_id, entry in entries.items() if entry[LAST_SEEN] >= cutoff}
+            if kept:
+                resources[group] = kept
+        with self._lock:
+            for group, entries in self._current.items():
+                resources.setdefault(group, {}).update(entries)
+
+        try:
+            self.store.save(SNAPSHOT_KEY, zlib.compress(json.dumps({
+                'version': SNAPSHOT_VERSION,
+                'saved_at': int(time.time()),
+                'resources': resources,
+            }, separators=(',', ':')).encode()))
+        except Exception as e:
+            logger.warning(f'Error saving resource snapshot: {str(e)}')
+            return
+        logger.info(f'Saved resource snapshot with {sum(len(group) for group in resources.values())} resources '
+                    f'({self.hits} reused verdicts, {self.misses} evaluations)')
+
+
+class AccountSnapshot:
+    """Scopes lookups and records of a ResourceSnapshot to one account of an organization run."""
+
+    def __init__(self, snapshot: ResourceSnapshot, account: str):
+        self.snapshot = snapshot
+        self.account = account
+
+    @property
+    def enabled(self) -> bool:
+        return self.snapshot.enabled
+
+    def lookup(self, kind: str, region: str, resource_id: str, state: str, tag_hash: str) -> Optional[str]:
+        return self.snapshot.lookup(f'{self.account}:{kind}', region, resource_id, state, tag_hash)
+
+    def record(self, kind: str, region: str, resource_id: str, state: str, tag_hash: str, verdict: str):
+        self.snapshot.record(f'{self.account}:{kind}', region, resource_id, state, tag_hash, verdict)
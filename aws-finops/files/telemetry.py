@@ -0,0 +1,228 @@
+import json
+import logging
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+
+from rate_limit import THROTTLING_ERRORS
+
+logger = logging.getLogger()
+
+DEFAULT_METRICS_NAMESPACE = 'FinOpsCleanup'
+# Upper bounds (milliseconds) of the latency histogram buckets; slower calls go to a last, open bucket
+LATENCY_BUCKETS_MS = (10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+# EMF documents carry at most 100 metrics; one document per operation stays well below it
+EMF_DIMENSIONS = [['Service', 'Operation', 'Region']]
+
+# Stat fields: counts, then latency sum/max, then one count per histogram bucket
+CALLS, ERRORS, RETRIES, THROTTLES, LATENCY_SUM, LATENCY_MAX = range(6)
+HISTOGRAM = 6
+STAT_FIELDS = HISTOGRAM + len(LATENCY_BUCKETS_MS) + 1
+
+# Per-thread stats, merged on read, so recording a call takes no lock. reset_telemetry()
+# empties the list and starts a new generation; a thread registers a fresh dict on its
+# first call of the generation, so the pool threads of past invocations are not kept.
+_lock = threading.Lock()
+_local = threading.local()
+_thread_stats: List[Dict[Tuple[str, str, str], list]] = []
+_generation = 0
+
+
+def _stats_of_thread() -> Dict[Tuple[str, str, str], list]:
+    stats = getattr(_local, 'stats', None)
+    if stats is None or _local.generation != _generation:
+        with _lock:
+            stats = _local.stats = {}
+            _local.generation = _generation
+            _thread_stats.append(stats)
+    return stats
+
+
+def _bucket(latency_ms: float) -> int:
+    for index, bound in enumerate(LATENCY_BUCKETS_MS):
+        if latency_ms <= bound:
+            return index
+    return len(LATENCY_BUCKETS_MS)
+
+
+def _record(service: str, operation: str, region: Optional[str], latency_ms: float, retries: int,
+            throttles: int, error: bool):
+    stats = _stats_of_thread()
+    key = (service, operation, region or '')
+    stat = stats.get(key)
+    if stat is None:
+        stat = stats[key] = [0] * STAT_FIELDS
+    stat[CALLS] += 1
+    stat[ERRORS] += error
+    stat[RETRIES] += retries
+    stat[THROTTLES] += throttles
+    stat[LATENCY_SUM] += latency_ms
+    stat[LATENCY_MAX] = max(stat[LATENCY_MAX], latency_ms)
+    stat[HISTOGRAM + _bucket(latency_ms)] += 1
+
+
+def operation_stats() -> Dict[Tuple[str, str, str], list]:
+    """Get the merged stats of every (service, operation, region) since the last reset"""
+    merged: Dict[Tuple[str, str, str], list] = {}
+    with _lock:
+        thread_stats = [dict(stats) for stats in _thread_stats]
+    for stats in thread_stats:
+        for key, stat in stats.items():
+            total = merged.get(key)
+            if total is None:
+                merged[key] = list(stat)
+                continue
+            for field in range(STAT_FIELDS):
+                if field == LATENCY_MAX:
+                    total[field] = max(total[field], stat[field])
+                else:
+                    total[field] += stat[field]
+    return merged
+
+
+def reset_telemetry():
+    global _generation
+    with _lock:
+        _generation += 1
+        _thread_stats.clear()
+
+
+def _percentile(stat: list, fraction: float) -> float:
+    """Estimate a latency percentile as the upper bound of the bucket it falls in, capped at the maximum"""
+    rank = fraction * stat[CALLS]
+    seen = 0
+    for index in range(len(LATENCY_BUCKETS_MS)):
+        seen += stat[HISTOGRAM + index]
+        if seen >= rank:
+            return round(min(LATENCY_BUCKETS_MS[index], stat[LATENCY_MAX]), 1)
+    return round(stat[LATENCY_MAX], 1)
+
+
+def _error_code(parsed) -> str:
+    if not isinstance(parsed, dict):
+        return ''
+    return parsed.get('Error', {}).get('Code', '')
+
+
+def attach_telemetry(client, service: str, region: Optional[str], account_id: Optional[str] = None):
+    """Record the latency, retries, throttles and outcome of every API call of a client
+
+    The timer starts in before-call and stops in after-call (or after-call-error), so the
+    latency includes botocore retries and their backoff. needs-retry fires once per
+    attempt and counts throttled attempts.
+
+    :param client: boto3 client
+    :param service: AWS service name
+    :param region: AWS region name
+    :param account_id: Account of the client's credentials (metrics are aggregated over accounts)
+    """
+    def before_call(model, context, **kwargs):
+        # after-call-error gets no model, only the context
+        context['telemetry_operation'] = model.name
+        context['telemetry_start'] = time.perf_counter()
+        context['telemetry_attempts'] = 0
+        context['telemetry_throttles'] = 0
+
+    def needs_retry(response, attempts, request_dict, **kwargs):
+        context = request_dict['context']
+        context['telemetry_attempts'] = attempts
+        if response is not None and _error_code(response[1]) in THROTTLING_ERRORS:
+            context['telemetry_throttles'] = context.get('telemetry_throttles', 0) + 1
+
+    def after_call(parsed, model, context, **kwargs):
+        start = context.get('telemetry_start')
+        if start is None:
+            return
+        error_code = _error_code(parsed)
+        throttles = context.get('telemetry_throttles', 0)
+        # A short-circuited call (no attempt made) still reports its throttling error
+        if not context.get('telemetry_attempts') and error_code in THROTTLING_ERRORS:
+            throttles = 1
+        _record(service, model.name, region, (time.perf_counter() - start) * 1000,
+                max(0, context.get('telemetry_attempts', 0) - 1), throttles, bool(error_code))
+
+    def after_call_error(context, exception=None, **kwargs):
+        start = context.get('telemetry_start')
+        if start is None:
+            return
+        _record(service, context['telemetry_operation'], region, (time.perf_counter() - start) * 1000,
+                max(0, context.get('telemetry_attempts', 0) - 1), context.get('telemetry_throttles', 0), True)
+
+    client.meta.events.register('before-call', before_call)
+    client.meta.events.register('needs-retry', needs_retry)
+    client.meta.events.register('after-call', after_call)
+    client.meta.events.register('after-call-error', after_call_error)
+
+
+def emit_metrics(namespace: str = DEFAULT_METRICS_NAMESPACE):
+    """Write one CloudWatch Embedded Metric Format document per (service, operation, region)
+
+    Calls, Errors, Retries, Throttles, LatencyAvg and LatencyMax become metrics; the
+    latency histogram is kept as a LatencyHistogram property for Logs Insights queries.
+
+    :param namespace: CloudWatch metric namespace
+    """
+    timestamp = int(time.time() * 1000)
+    bucket_names = [f'le_{bound}ms' for bound in LATENCY_BUCKETS_MS] + [f'gt_{LATENCY_BUCKETS_MS[-1]}ms']
+    for (service, operation, region), stat in sorted(operation_stats().items()):
+        document = {
+            '_aws': {
+                'Timestamp': timestamp,
+                'CloudWatchMetrics': [{
+                    'Namespace': namespace,
+                    'Dimensions': EMF_DIMENSIONS,
+                    'Metrics': [
+                        {'Name': 'Calls', 'Unit': 'Count'},
+                        {'Name': 'Errors', 'Unit': 'Count'},
+                        {'Name': 'Retries', 'Unit': 'Count'},
+                        {'Name': 'Throttles', 'Unit': 'Count'},
+                        {'Name': 'LatencyAvg', 'Unit': 'Milliseconds'},
+                        {'Name': 'LatencyMax', 'Unit': 'Milliseconds'},
+                    ],
+                }],
+            },
+            'Service': service,
+            'Operation': operation,
+            'Region': region or 'global',
+            'Calls': stat[CALLS],
+            'Errors': stat[ERRORS],
+            'Retries': stat[RETRIES],
+            'Throttles': stat[THROTTLES],
+            'LatencyAvg': round(stat[LATENCY_SUM] / stat[CALLS], 2) if stat[CALLS] else 0.0,
+            'LatencyMax': round(stat[LATENCY_MAX], 2),
+            'LatencyHistogram': dict(zip(bucket_names, stat[HISTOGRAM:])),
+        }
+        # EMF documents must be whole log lines; the Lambda log formatter would prefix them
+        print(json.dumps(document, separators=(',', ':')), flush=True)
+
+
+def telemetry_summary(top: int = 10) -> dict:
+    """Summarize the API calls of the invocation for the handler response
+
+    :param top: Number of operations listed, slowest total time first
+    :return: Dict with totals and the top operations
+    """
+    stats = operation_stats()
+    operations = sorted(stats.items(), key=lambda item: item[1][LATENCY_SUM], reverse=True)
+    return {
+        'calls': sum(stat[CALLS] for stat in stats.values()),
+        'errors': sum(stat[ERRORS] for stat in stats.values()),
+        'retries': sum(stat[RETRIES] for stat in stats.values()),
+        'throttles': sum(stat[THROTTLES] for stat in stats.values()),
+        'seconds': round(sum(stat[LATENCY_SUM] for stat in stats.values()) / 1000, 3),
+        'top_operations': [
+            {
+                'operation': f'{service}.{operation}',
+                'region': region,
+                'calls': stat[CALLS],
+                'errors': stat[ERRORS],
+                'retries': stat[RETRIES],
+                'throttles': stat[THROTTLES],
+                'seconds': round(stat[LATENCY_SUM] / 1000, 3),
+                'p50_ms': _percentile(stat, 0.5),
+                'p90_ms': _percentile(stat, 0.9),
+                'max_ms': round(stat[LATENCY_MAX], 1),
+            }
+            for (service, operation, region), stat in operations[:top]
+        ],
+    }
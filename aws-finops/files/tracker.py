@@ -0,0 +1,247 @@
+import threading
+from array import array
+from collections import Counter
+from typing import Dict, Iterator, List, Tuple
+
+DELETED = 0
+SKIPPED = 1
+NOTIFY = 2
+FAILED = 3
+PENDING = 4
+OUTCOMES = ('deleted', 'skipped', 'notify', 'failed', 'pending')
+
+# Records a thread buffers before moving them to the shared store under the lock
+FLUSH_THRESHOLD = 512
+
+
+class ResourceTracker:
+    """Thread-safe tracker for resource cleanup results.
+
+    Each thread appends records to its own buffer without locking; a buffer is moved to
+    the shared store every FLUSH_THRESHOLD records and on merge(). Service, region,
+    action and account names are interned as small integer codes, so the store is a
+    handful of typed arrays plus one UTF-8 blob of resource ids. Counts per outcome,
+    category, region and account are kept up to date on every flush. run_phases merges
+    the buffers at the end of each run, and every read merges them as well.
+
+    Records of the account the Lambda runs in have an empty account; other accounts
+    record through for_account() views sharing the same store.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._buffers: List[list] = []
+        self._codes: Dict[str, int] = {}
+        self._names: List[str] = []
+        self._outcomes = array('B')
+        self._services = array('H')
+        self._regions = array('H')
+        self._actions = array('H')
+        self._accounts = array('H')
+        self._id_offsets = array('Q', [0])
+        self._id_blob = bytearray()
+        self._totals = Counter()
+        self._by_category = Counter()
+        self._by_region = Counter()
+        self._by_account = Counter()
+
+    def _code(self, name: str) -> int:
+        code = self._codes.get(name)
+        if code is None:
+            with self._lock:
+                code = self._codes.get(name)
+                if code is None:
+                    code = len(self._names)
+                    self._names.append(name)
+                    self._codes[name] = code
+        return code
+
+    def _buffer(self) -> list:
+        buffer = getattr(self._local, 'buffer', None)
+        if buffer is None:
+            buffer = self._local.buffer = []
+            with self._lock:
+                self._buffers.append(buffer)
+        return buffer
+
+    def _record(self, outcome: int, service: str, resource_id: str, region: str, action: str, account: str):
+        buffer = self._buffer()
+        buffer.append((outcome, self._code(service), self._code(region), self._code(action), self._code(account),
+                       resource_id))
+        if len(buffer) >= FLUSH_THRESHOLD:
+            with self._lock:
+                self._flush(buffer)
+
+    def _flush(self, buffer: list):
+        # Slice then delete: records the owning thread appends meanwhile stay buffered
+        records = buffer[:]
+        del buffer[:len(records)]
+        for outcome, service, region, action, account, resource_id in records:
+            self._outcomes.append(outcome)
+            self._services.append(service)
+            self._regions.append(region)
+            self._actions.append(action)
+            self._accounts.append(account)
+            self._id_blob += resource_id.encode()
+            self._id_offsets.append(len(self._id_blob))
+            self._totals[outcome] += 1
+            self._by_category[(outcome, service)] += 1
+            self._by_region[(outcome, region)] += 1
+            self._by_account[(outcome, account)] += 1
+
+    def merge(self):
+        """Move every thread's buffered records to the shared store"""
+        with self._lock:
+            for buffer in self._buffers:
+                self._flush(buffer)
+
+    def add_deleted(self, service: str, resource_id: str, region: str = '', action: str = '', account: str = ''):
+        self._record(DELETED, service, resource_id, region, action, account)
+
+    def add_skipped(self, service: str, resource_id: str, region: str = '', action: str = '', account: str = ''):
+        self._record(SKIPPED, service, resource_id, region, action, account)
+
+    def add_notify(self, service: str, resource_id: str, region: str = '', action: str = '', account: str = ''):
+        self._record(NOTIFY, service, resource_id, region, action, account)
+
+    def add_failed(self, service: str, resource_id: str, region: str = '', action: str = '', account: str = ''):
+        self._record(FAILED, service, resource_id, region, action, account)
+
+    def add_pending(self, service: str, resource_id: str, region: str = '', action: str = '', account: str = ''):
+        self._record(PENDING, service, resource_id, region, action, account)
+
+    def for_account(self, account: str) -> "AccountTracker":
+        """Get a view that records every resource under one account"""
+        return AccountTracker(self, account)
+
+    def dump(self) -> List[list]:
+        """Get every record as [outcome, service, resource_id, region, action, account] (for checkpoints)"""
+        self.merge()
+        names, blob, offsets = self._names, self._id_blob, self._id_offsets
+        return [[outcome, names[self._services[index]], blob[offsets[index]:offsets[index + 1]].decode(),
+                 names[self._regions[index]], names[self._actions[index]], names[self._accounts[index]]]
+                for index, outcome in enumerate(self._outcomes)]
+
+    def load(self, records: List[list]):
+        """Add records produced by dump()"""
+        for outcome, service, resource_id, region, action, account in records:
+            self._record(outcome, service, resource_id, region, action, account)
+        self.merge()
+
+    def records(self, outcome: int) -> Iterator[Tuple[str, str, str, str, str]]:
+        """Iterate over the records of one outcome
+
+        :param outcome: DELETED, SKIPPED, NOTIFY, FAILED or PENDING
+        :return: Iterator of (service, resource_id, region, action, account) tuples
+        """
+        self.merge()
+        names, blob, offsets = self._names, self._id_blob, self._id_offsets
+        for index, record_outcome in enumerate(self._outcomes):
+            if record_outcome == outcome:
+                yield (names[self._services[index]],
+                       blob[offsets[index]:offsets[index + 1]].decode(),
+                       names[self._regions[index]],
+                       names[self._actions[index]],
+                       names[self._accounts[index]])
+
+    def resources(self, outcome: int) -> List[Tuple[str, str]]:
+        """Get the (service, resource_id) pairs of one outcome
+
+        Resources of other accounts are labelled "service [account]" in the report.
+        """
+        return [(f'{service} [{account}]' if account else service, resource_id)
+                for service, resource_id, _, _, account in self.records(outcome)]
+
+    @property
+    def deleted_resources(self) -> List[Tuple[str, str]]:
+        return self.resources(DELETED)
+
+    @property
+    def skip_delete_resources(self) -> List[Tuple[str, str]]:
+        return self.resources(SKIPPED)
+
+    @property
+    def notify_resources(self) -> List[Tuple[str, str]]:
+        return self.resources(NOTIFY)
+
+    @property
+    def check_resources(self) -> List[Tuple[str, str]]:
+        return self.resources(FAILED)
+
+    @property
+    def pending_resources(self) -> List[Tuple[str, str]]:
+        return self.resources(PENDING)
+
+    def count(self, outcome: int) -> int:
+        self.merge()
+        return self._totals[outcome]
+
+    def counts_by_category(self, outcome: int) -> Dict[str, int]:
+        """Get the number of records of one outcome per service category"""
+        self.merge()
+        return {self._names[service]: count for (record_outcome, service), count in self._by_category.items()
+                if record_outcome == outcome}
+
+    def counts_by_region(self, outcome: int) -> Dict[str, int]:
+        """Get the number of records of one outcome per region"""
+        self.merge()
+        return {self._names[region]: count for (record_outcome, region), count in self._by_region.items()
+                if record_outcome == outcome}
+
+    def counts_by_account(self, outcome: int) -> Dict[str, int]:
+        """Get the number of records of one outcome per account ('' is the Lambda's own account)"""
+        self.merge()
+        return {self._names[account]: count for (record_outcome, account), count in self._by_account.items()
+                if record_outcome == outcome}
+
+    def summary(self) -> Dict[str, dict]:
+        """Get counts per outcome name, with their per-category, per-region and per-account breakdown"""
+        return {
+            name: {
+                'total': self.count(outcome),
+                'by_category': self.counts_by_category(outcome),
+                'by_region': self.counts_by_region(outcome),
+                'by_account': self.counts_by_account(outcome),
+            }
+            for outcome, name in enumerate(OUTCOMES)
+            if self.count(outcome)
+        }
+
+    def __len__(self) -> int:
+        self.merge()
+        return len(self._outcomes)
+
+    @property
+    def nbytes(self) -> int:
+        """Approximate size of the record store in bytes (arrays, id blob and interned names)"""
+        self.merge()
+        columns = (self._outcomes, self._services, self._regions, self._actions, self._accounts, self._id_offsets)
+        return (sum(column.itemsize * len(column) for column in columns) + len(self._id_blob)
+                + sum(len(name) for name in self._names))
+
+
+class AccountTracker:
+    """Records into a ResourceTracker on behalf of one account of an organization run."""
+
+    def __init__(self, tracker: ResourceTracker, account: str):
+        self.tracker = tracker
+        self.account = account
+
+    def merge(self):
+        self.tracker.merge()
+
+    def add_deleted(self, service: str, resource_id: str, region: str = '', action: str = ''):
+        self.tracker.add_deleted(service, resource_id, region, action, self.account)
+
+    def add_skipped(self, service: str, resource_id: str, region: str = '', action: str = ''):
+        self.tracker.add_skipped(service, resource_id, region, action, self.account)
+
+    def add_notify(self, service: str, resource_id: str, region: str = '', action: str = ''):
+        self.tracker.add_notify(service, resource_id, region, action, self.account)
+
+    def add_failed(self, service: str, resource_id: str, region: str = '', action: str = ''):
+        self.tracker.add_failed(service, resource_id, region, action, self.account)
+
+    def add_pending(self, service: str, resource_id: str, region: str = '', action: str = ''):
+        self.tracker.add_pending(service, resource_id, region, action, self.account)
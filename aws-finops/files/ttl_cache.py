@@ -0,0 +1,44 @@
+import threading
+import time
+from typing import Any, Callable, Dict, Hashable, Tuple
+
+
+class TtlCache:
+    """Process-wide cache of values that stay valid for a while, so warm invocations reuse them.
+
+    Only values passed to set() are cached: callers store successful lookups and let
+    failures be retried on the next invocation.
+    """
+
+    def __init__(self, ttl: float):
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._entries: Dict[Hashable, Tuple[float, Any]] = {}
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        entry = self._entries.get(key)
+        if entry is None or time.monotonic() >= entry[0]:
+            return default
+        return entry[1]
+
+    def set(self, key: Hashable, value: Any):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+
+    def get_or_load(self, key: Hashable, load: Callable[[], Any]) -> Any:
+        """Get a cached value, calling load() and caching its result on a miss
+
+        :param key: Cache key
+        :param load: Function computing the value; exceptions propagate and nothing is cached
+        :return: Cached or loaded value
+        """
+        missing = object()
+        value = self.get(key, missing)
+        if value is missing:
+            value = load()
+            self.set(key, value)
+        return value
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
@@ -25,6 +25,7 @@ data "aws_iam_policy_document" "lambda_cleanup_policy" {
     effect = "Allow"
     actions = [
       "elasticloadbalancing:DescribeLoadBalancers",
+      "elasticloadbalancing:DescribeTags",
       "elasticloadbalancing:DeleteLoadBalancer"
     ]
     resources = ["*"]
@@ -63,6 +64,7 @@ data "aws_iam_policy_document" "lambda_cleanup_policy" {
     effect = "Allow"
     actions = [
       "kinesis:ListStreams",
+      "kinesis:ListTagsForStream",
       "kinesis:DeleteStream"
     ]
     resources = ["*"]
@@ -86,7 +88,9 @@ data "aws_iam_policy_document" "lambda_cleanup_policy" {
     actions = [
       "es:ListDomainNames",
       "es:DeleteDomain",
-      "es:DescribeDomain"
+      "es:DescribeDomain",
+      "es:DescribeDomains",
+      "es:ListTags"
     ]
     resources = ["*"]
   }
@@ -97,11 +101,35 @@ data "aws_iam_policy_document" "lambda_cleanup_policy" {
     effect = "Allow"
     actions = [
       "config:GetResourceConfigHistory",
-      "config:GetDiscoveredResourceCounts"
+      "config:GetDiscoveredResourceCounts",
+      "config:SelectResourceConfig",
+      "config:SelectAggregateResourceConfig"
     ]
     resources = ["*"]
   }
 
+  # Resource Explorer permissions (region pre-probe)
+  dynamic "statement" {
+    for_each = var.resource_explorer_region != "" ? [1] : []
+    content {
+      sid    = "ResourceExplorerRead"
+      effect = "Allow"
+      actions = [
+        "resource-explorer-2:ListIndexes",
+        "resource-explorer-2:Search"
+      ]
+      resources = ["*"]
+    }
+  }
+
+  # Resource Groups Tagging API permissions (protection tag index)
+  statement {
+    sid       = "TaggingRead"
+    effect    = "Allow"
+    actions   = ["tag:GetResources"]
+    resources = ["*"]
+  }
+
   # SES permissions (for email notifications)
   statement {
     sid    = "SESEmail"
@@ -114,6 +142,46 @@ data "aws_iam_policy_document" "lambda_cleanup_policy" {
     resources = ["*"]
   }
 
+  # S3 permissions (checkpoint of runs interrupted by the Lambda timeout)
+  dynamic "statement" {
+    for_each = var.checkpoint_bucket != "" ? [var.checkpoint_bucket] : []
+    content {
+      sid    = "CheckpointStore"
+      effect = "Allow"
+      actions = [
+        "s3:GetObject",
+        "s3:PutObject",
+        "s3:DeleteObject",
+        "s3:ListBucket"
+      ]
+      resources = [
+        "arn:aws:s3:::${statement.value}",
+        "arn:aws:s3:::${statement.value}/${var.function_name}/*"
+      ]
+    }
+  }
+
+  # STS/Organizations permissions (organization mode)
+  dynamic "statement" {
+    for_each = length(var.accounts) > 0 ? [var.assume_role_name] : []
+    content {
+      sid       = "AssumeCleanupRole"
+      effect    = "Allow"
+      actions   = ["sts:AssumeRole"]
+      resources = ["arn:aws:iam::*:role/${statement.value}"]
+    }
+  }
+
+  dynamic "statement" {
+    for_each = contains(var.accounts, "organization") ? [1] : []
+    content {
+      sid       = "ListOrganizationAccounts"
+      effect    = "Allow"
+      actions   = ["organizations:ListAccounts"]
+      resources = ["*"]
+    }
+  }
+
   # CloudWatch Logs permissions (Lambda default)
   statement {
     sid    = "CloudWatchLogs"
@@ -25,6 +25,14 @@ module "lambda_function" {
     EMAIL_IDENTITY    = var.email_identity
     TO_ADDRESS        = var.to_address
     SES_REGION        = var.ses_region
+    CHECKPOINT_STORE  = var.checkpoint_bucket != "" ? "s3://${var.checkpoint_bucket}/${var.function_name}" : ""
+    SNAPSHOT_STORE    = var.incremental_scan && var.checkpoint_bucket != "" ? "s3://${var.checkpoint_bucket}/${var.function_name}" : ""
+    PLAN_STORE        = (var.save_plan || var.apply_plan) && var.checkpoint_bucket != "" ? "s3://${var.checkpoint_bucket}/${var.function_name}" : ""
+    APPLY_PLAN        = var.apply_plan
+    ACCOUNTS          = join(",", var.accounts)
+    ASSUME_ROLE_NAME  = var.assume_role_name
+
+    RESOURCE_EXPLORER_REGION = var.resource_explorer_region
   }
 
   allowed_triggers = {
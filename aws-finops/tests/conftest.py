@@ -0,0 +1,17 @@
+import os
+import sys
+
+# The Lambda modules import each other as top-level modules, as in the deployment package
+FILES_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'files')
+sys.path.insert(0, FILES_DIR)
+
+# Settings index.py parses on import; the tests never reach AWS
+for key, value in {
+    'EMAIL_IDENTITY': 'finops@example.com',
+    'TO_ADDRESS': 'finops@example.com',
+    'AWS_DEFAULT_REGION': 'us-east-1',
+    'AWS_ACCESS_KEY_ID': 'testing',
+    'AWS_SECRET_ACCESS_KEY': 'testing',
+    'DRY_RUN': 'true',
+}.items():
+    os.environ.setdefault(key, value)
@@ -0,0 +1,135 @@
+import threading
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from botocore.exceptions import ClientError
+
+import accounts
+from accounts import assume_role_credentials, list_organization_accounts, parse_accounts, resolve_accounts
+
+OWN_ACCOUNT = '999999999999'
+
+
+class FakeOrganizations:
+    def __init__(self, pages):
+        self.pages = pages
+
+    def get_paginator(self, operation):
+        assert operation == 'list_accounts'
+        return self
+
+    def paginate(self):
+        return iter(self.pages)
+
+
+class FakeSts:
+    """Hands out credentials valid for `lifetime`, numbered by call; roles in `denied` fail"""
+
+    def __init__(self, lifetime=timedelta(hours=1), denied=(), barrier=None):
+        self.lifetime = lifetime
+        self.denied = denied
+        self.barrier = barrier
+        self._lock = threading.Lock()
+        self.calls = []
+
+    def get_caller_identity(self):
+        return {'Account': OWN_ACCOUNT}
+
+    def assume_role(self, RoleArn, RoleSessionName, DurationSeconds):
+        with self._lock:
+            self.calls.append(RoleArn)
+            number = len(self.calls)
+        if self.barrier is not None:
+            # Only returns once every role is being assumed at the same time
+            self.barrier.wait(timeout=5)
+        if RoleArn in self.denied:
+            raise ClientError({'Error': {'Code': 'AccessDenied', 'Message': 'denied'}}, 'AssumeRole')
+        return {'Credentials': {'AccessKeyId': f'AKIA{number}', 'SecretAccessKey': 'secret',
+                                'SessionToken': 'token',
+                                'Expiration': datetime.now(timezone.utc) + self.lifetime}}
+
+
+@pytest.fixture
+def clients(monkeypatch):
+    clients = {'sts': FakeSts()}
+    monkeypatch.setattr(accounts, 'get_client', lambda service: clients[service])
+    monkeypatch.setattr(accounts, '_credentials', {})
+    monkeypatch.setattr(accounts, '_role_locks', {})
+    return clients
+
+
+def role(account_id: str) -> str:
+    return f'arn:aws:iam::{account_id}:role/FinOpsCleanupRole'
+
+
+def test_parse_accounts():
+    assert parse_accounts(' 111111111111, arn:aws:iam::222222222222:role/Other,', 'FinOpsCleanupRole') == [
+        role('111111111111'), 'arn:aws:iam::222222222222:role/Other']
+    for value in ('11111111111', 'arn:aws:iam::222222222222:user/someone', 'prod'):
+        with pytest.raises(ValueError):
+            parse_accounts(value)
+
+
+def test_organization_lists_active_accounts(clients):
+    clients['organizations'] = FakeOrganizations([
+        {'Accounts': [{'Id': '111111111111', 'Status': 'ACTIVE'}, {'Id': '222222222222', 'Status': 'SUSPENDED'}]},
+        {'Accounts': [{'Id': '333333333333', 'Status': 'ACTIVE'}]},
+        {}])
+    assert list_organization_accounts('Cleanup') == ['arn:aws:iam::111111111111:role/Cleanup',
+                                                     'arn:aws:iam::333333333333:role/Cleanup']
+
+
+def test_credentials_are_cached_per_role(clients):
+    credentials = assume_role_credentials(role('111111111111'))
+    assert credentials.account_id == '111111111111'
+    assert credentials.get_frozen_credentials().access_key == 'AKIA1'
+
+    assert assume_role_credentials(role('111111111111')) is credentials
+    assert assume_role_credentials(role('222222222222')) is not credentials
+    assert clients['sts'].calls == [role('111111111111'), role('222222222222')]
+
+
+def test_credentials_refresh_before_they_expire(clients):
+    # Inside botocore's refresh window from the start
+    clients['sts'].lifetime = timedelta(minutes=5)
+    credentials = assume_role_credentials(role('111111111111'))
+    assert credentials.get_frozen_credentials().access_key == 'AKIA2'
+    assert assume_role_credentials(role('111111111111')) is credentials
+    assert clients['sts'].calls == [role('111111111111')] * 2
+
+
+def test_concurrent_callers_assume_a_role_once(clients):
+    start = threading.Barrier(8)
+    results = []
+
+    def assume():
+        start.wait()
+        results.append(assume_role_credentials(role('111111111111')))
+
+    threads = [threading.Thread(target=assume) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert clients['sts'].calls == [role('111111111111')]
+    assert len({id(credentials) for credentials in results}) == 1
+
+
+def test_resolve_accounts_assumes_roles_concurrently(clients):
+    # Each AssumeRole waits for the two others: run one after the other, they would time out
+    clients['sts'] = FakeSts(denied=[role('222222222222')], barrier=threading.Barrier(3))
+    value = f'111111111111,{OWN_ACCOUNT},222222222222,333333333333,111111111111'
+    resolved, unreachable = resolve_accounts(value)
+
+    assert [(account.account_id, account.role_arn) for account in resolved] == [
+        ('111111111111', role('111111111111')), (OWN_ACCOUNT, None), ('333333333333', role('333333333333'))]
+    assert resolved[1].credentials is None
+    assert resolved[2].credentials.account_id == '333333333333'
+    assert unreachable == ['222222222222']
+    assert sorted(clients['sts'].calls) == [role('111111111111'), role('222222222222'), role('333333333333')]
+
+
+def test_organization_mode_off(clients):
+    assert resolve_accounts('') == ([], [])
+    assert clients['sts'].calls == []
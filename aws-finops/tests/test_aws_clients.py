@@ -0,0 +1,44 @@
+import boto3
+import pytest
+
+import aws_clients
+from aws_clients import clear_clients, configure_clients, get_client
+
+
+@pytest.fixture(autouse=True)
+def fresh_clients(monkeypatch):
+    monkeypatch.setattr(aws_clients, '_clients', {})
+    monkeypatch.setattr(aws_clients, '_sessions', {})
+    monkeypatch.setattr(aws_clients, '_default_session', None)
+    monkeypatch.setattr(aws_clients, '_options', dict(aws_clients._options))
+
+
+def test_clients_share_one_session_of_their_own():
+    ec2 = get_client('ec2', 'us-east-1')
+    assert get_client('ec2', 'us-east-1') is ec2
+    assert get_client('ec2', 'eu-west-1') is not ec2
+
+    session = aws_clients._default_session
+    assert isinstance(session, boto3.Session)
+    assert session is not boto3.DEFAULT_SESSION
+    get_client('rds', 'us-east-1')
+    assert aws_clients._default_session is session
+
+    clear_clients()
+    assert get_client('ec2', 'us-east-1') is not ec2
+    assert aws_clients._default_session is not session
+
+
+def test_configure_clients():
+    ec2 = get_client('ec2', 'us-east-1')
+    configure_clients(25, connect_timeout=2.5, read_timeout=30, max_attempts=7, retry_mode='adaptive')
+
+    rebuilt = get_client('ec2', 'us-east-1')
+    assert rebuilt is not ec2
+    config = rebuilt.meta.config
+    assert (config.max_pool_connections, config.connect_timeout, config.read_timeout) == (25, 2.5, 30)
+    assert config.retries == {'mode': 'adaptive', 'total_max_attempts': 7}
+
+    # Same options: the cached clients are kept
+    configure_clients(25, connect_timeout=2.5, read_timeout=30, max_attempts=7, retry_mode='adaptive')
+    assert get_client('ec2', 'us-east-1') is rebuilt
@@ -0,0 +1,58 @@
+from botocore.exceptions import ClientError
+
+from batching import apply_in_batches
+
+
+def client_error(code: str) -> ClientError:
+    return ClientError({'Error': {'Code': code, 'Message': code}}, 'StopInstances')
+
+
+def run_batches(resource_ids, batch_size, bad_ids=(), error_code='InvalidInstanceID.NotFound'):
+    calls, succeeded, failed = [], [], []
+
+    def call(batch):
+        calls.append(list(batch))
+        if set(batch) & set(bad_ids):
+            raise client_error(error_code)
+
+    apply_in_batches(call, resource_ids, batch_size, succeeded.extend,
+                     lambda resource_id, e: failed.append(resource_id))
+    return calls, succeeded, failed
+
+
+def test_chunks_without_errors():
+    ids = [f'i-{n}' for n in range(250)]
+    calls, succeeded, failed = run_batches(ids, 100)
+
+    assert [len(batch) for batch in calls] == [100, 100, 50]
+    assert succeeded == ids
+    assert failed == []
+
+
+def test_bisects_down_to_the_failing_id():
+    ids = [f'i-{n}' for n in range(8)]
+    calls, succeeded, failed = run_batches(ids, 8, bad_ids={'i-5'})
+
+    assert failed == ['i-5']
+    assert sorted(succeeded) == sorted(set(ids) - {'i-5'})
+    # 8 -> 4 + 4 -> 2 + 2 -> 1 + 1: one failing call per level below the whole batch
+    assert len(calls) == 7
+
+
+def test_whole_batch_error_is_not_bisected():
+    ids = [f'i-{n}' for n in range(8)]
+    calls, succeeded, failed = run_batches(ids, 8, bad_ids={'i-5'}, error_code='UnauthorizedOperation')
+
+    assert len(calls) == 1
+    assert succeeded == []
+    assert failed == ids
+
+
+def test_unexpected_error_fails_the_batch():
+    failed = []
+
+    def call(batch):
+        raise RuntimeError('connection reset')
+
+    apply_in_batches(call, ['i-1', 'i-2'], 10, lambda batch: None, lambda resource_id, e: failed.append(resource_id))
+    assert failed == ['i-1', 'i-2']
@@ -0,0 +1,94 @@
+import json
+import time
+import zlib
+
+import pytest
+
+from checkpoint import (CHECKPOINT_KEY, Checkpoint, CheckpointStore, LocalCheckpointStore, clear_checkpoint,
+                        get_checkpoint_store, load_checkpoint, save_checkpoint)
+
+
+class UnreadableStore(CheckpointStore):
+    def load(self, key):
+        raise OSError('access denied')
+
+    def save(self, key, data):
+        raise OSError('access denied')
+
+    def delete(self, key):
+        raise OSError('access denied')
+
+
+def sample_checkpoint(**kwargs) -> Checkpoint:
+    # Keys as index.unit_key() and RunContext.paginate() make them
+    return Checkpoint(True, completed={'ebs-volume:us-east-1', '111111111111:rds:eu-west-1'},
+                      page_tokens={'rds-instances:us-east-1': 'token', '111111111111:ebs-volumes:eu-west-1': 'token'},
+                      records=[[0, 'ebs-volume', 'vol-1', 'us-east-1', 'delete_volume', '']], **kwargs)
+
+
+def test_round_trip(tmp_path):
+    store = LocalCheckpointStore(str(tmp_path))
+    checkpoint = sample_checkpoint()
+    save_checkpoint(store, checkpoint)
+
+    loaded = load_checkpoint(store, dry_run=True)
+    assert loaded.created_at == checkpoint.created_at
+    assert loaded.completed == checkpoint.completed
+    assert loaded.page_tokens == checkpoint.page_tokens
+    assert loaded.records == checkpoint.records
+
+
+def test_other_modes_are_ignored(tmp_path):
+    store = LocalCheckpointStore(str(tmp_path))
+    save_checkpoint(store, sample_checkpoint())
+    assert load_checkpoint(store, dry_run=False) is None
+    assert load_checkpoint(store, dry_run=True, apply_plan=True) is None
+
+    save_checkpoint(store, sample_checkpoint(apply_plan=True))
+    assert load_checkpoint(store, dry_run=True) is None
+    assert load_checkpoint(store, dry_run=True, apply_plan=True) is not None
+
+
+def test_expired_checkpoint_is_ignored(tmp_path):
+    store = LocalCheckpointStore(str(tmp_path))
+    save_checkpoint(store, Checkpoint(True, created_at=time.time() - 3600))
+    assert load_checkpoint(store, dry_run=True, max_age=60) is None
+    assert load_checkpoint(store, dry_run=True) is not None
+
+
+def test_other_version_is_ignored(tmp_path):
+    store = LocalCheckpointStore(str(tmp_path))
+    store.save(CHECKPOINT_KEY, zlib.compress(json.dumps({'version': 1, 'dry_run': True}).encode()))
+    assert load_checkpoint(store, dry_run=True) is None
+
+
+def test_corrupt_or_unreadable_checkpoint_starts_fresh(tmp_path):
+    store = LocalCheckpointStore(str(tmp_path))
+    store.save(CHECKPOINT_KEY, b'not zlib')
+    assert load_checkpoint(store, dry_run=True) is None
+    assert load_checkpoint(UnreadableStore(), dry_run=True) is None
+
+
+def test_clear(tmp_path):
+    store = LocalCheckpointStore(str(tmp_path))
+    save_checkpoint(store, sample_checkpoint())
+    clear_checkpoint(store)
+    assert load_checkpoint(store, dry_run=True) is None
+    clear_checkpoint(store)
+    clear_checkpoint(None)
+
+
+def test_store_must_implement_every_method():
+    class LoadOnlyStore(CheckpointStore):
+        def load(self, key):
+            return None
+
+    with pytest.raises(TypeError):
+        LoadOnlyStore()
+
+
+def test_store_locations(tmp_path):
+    assert get_checkpoint_store('') is None
+    store = get_checkpoint_store('s3://bucket/some/prefix/')
+    assert (store.bucket, store._key('x')) == ('bucket', 'some/prefix/x')
+    assert get_checkpoint_store(f'file://{tmp_path}').directory == str(tmp_path)
@@ -0,0 +1,143 @@
+import time
+
+from botocore.exceptions import ClientError
+
+import pipeline
+from pipeline import Mutation, MutationPipeline, Quota, Verifier
+from tracker import DELETED, FAILED, PENDING, ResourceTracker
+
+
+KINESIS_QUOTA = Quota(100.0, frozenset({'LimitExceededException'}))
+
+
+def client_error(code: str) -> ClientError:
+    return ClientError({'Error': {'Code': code, 'Message': code}}, 'DeleteStream')
+
+
+def outcomes(tracker: ResourceTracker, outcome: int):
+    return sorted(resource_id for _, resource_id, _, _, _ in tracker.records(outcome))
+
+
+def stop_db_cluster():
+    pass
+
+
+def verified_pipeline(states, **kwargs):
+    """Pipeline verifying rds-cluster mutations against `states`, a dict of id -> state (missing: gone)"""
+    checks = []
+
+    def check(region, ids, credentials):
+        checks.append(list(ids))
+        return {resource_id: states[resource_id] for resource_id in ids if resource_id in states}
+
+    verifier = Verifier(check, frozenset({'stopped'}), frozenset({'inaccessible-encryption-credentials'}))
+    tracker = ResourceTracker()
+    mutations = MutationPipeline(tracker, {'rds-cluster': verifier}, verify=True, poll_interval=0.01, **kwargs)
+    return tracker, mutations, checks
+
+
+def test_verifier_confirms_done_and_gone_resources():
+    tracker, mutations, checks = verified_pipeline({'db-1': 'stopped'})
+    for resource_id in ('db-1', 'db-2'):
+        mutations.submit(Mutation('rds-cluster', resource_id, 'us-east-1', stop_db_cluster))
+    mutations.drain()
+
+    assert outcomes(tracker, DELETED) == ['db-1', 'db-2']
+    assert len(checks) == 1
+
+
+def test_verifier_reports_failed_state():
+    tracker, mutations, _ = verified_pipeline({'db-1': 'inaccessible-encryption-credentials'})
+    mutations.submit(Mutation('rds-cluster', 'db-1', 'us-east-1', stop_db_cluster))
+    mutations.drain()
+
+    assert outcomes(tracker, FAILED) == ['db-1']
+    assert tracker.count(DELETED) == 0
+
+
+def test_unconfirmed_mutation_is_pending_at_the_deadline():
+    tracker, mutations, checks = verified_pipeline({'db-1': 'stopping'}, verify_timeout=0.05)
+    mutations.submit(Mutation('rds-cluster', 'db-1', 'us-east-1', stop_db_cluster))
+    mutations.drain()
+
+    assert outcomes(tracker, PENDING) == ['db-1']
+    assert len(checks) > 1
+
+
+def test_failed_action_is_not_verified():
+    tracker, mutations, checks = verified_pipeline({})
+
+    def failing_stop():
+        raise client_error('InvalidDBClusterStateFault')
+
+    mutations.submit(Mutation('rds-cluster', 'db-1', 'us-east-1', failing_stop))
+    mutations.drain()
+
+    assert outcomes(tracker, FAILED) == ['db-1']
+    assert checks == []
+
+
+def test_quota_error_requeues_the_mutation(monkeypatch):
+    monkeypatch.setattr(pipeline, 'QUOTA_INITIAL_BACKOFF', 0.01)
+    attempts = []
+
+    def delete_stream():
+        attempts.append(time.monotonic())
+        if len(attempts) < 3:
+            raise client_error('LimitExceededException')
+
+    tracker = ResourceTracker()
+    mutations = MutationPipeline(tracker, quotas={'kinesis-stream': KINESIS_QUOTA})
+    mutations.submit(Mutation('kinesis-stream', 'orders', 'us-east-1', delete_stream))
+    mutations.drain()
+
+    assert len(attempts) == 3
+    assert outcomes(tracker, DELETED) == ['orders']
+    assert tracker.count(FAILED) == 0
+
+
+def test_quota_gives_up_after_max_attempts(monkeypatch):
+    monkeypatch.setattr(pipeline, 'QUOTA_INITIAL_BACKOFF', 0.001)
+    monkeypatch.setattr(pipeline, 'QUOTA_MAX_ATTEMPTS', 3)
+    attempts = []
+
+    def delete_stream():
+        attempts.append(1)
+        raise client_error('LimitExceededException')
+
+    tracker = ResourceTracker()
+    mutations = MutationPipeline(tracker, quotas={'kinesis-stream': KINESIS_QUOTA})
+    mutations.submit(Mutation('kinesis-stream', 'orders', 'us-east-1', delete_stream))
+    mutations.drain()
+
+    assert len(attempts) == 3
+    assert outcomes(tracker, FAILED) == ['orders']
+
+
+def test_other_errors_are_not_requeued():
+    attempts = []
+
+    def delete_stream():
+        attempts.append(1)
+        raise client_error('ResourceInUseException')
+
+    tracker = ResourceTracker()
+    mutations = MutationPipeline(tracker, quotas={'kinesis-stream': KINESIS_QUOTA})
+    mutations.submit(Mutation('kinesis-stream', 'orders', 'us-east-1', delete_stream))
+    mutations.drain()
+
+    assert len(attempts) == 1
+    assert outcomes(tracker, FAILED) == ['orders']
+
+
+def test_quota_paces_mutation_starts():
+    starts = []
+    tracker = ResourceTracker()
+    mutations = MutationPipeline(tracker, quotas={'kinesis-stream': Quota(20.0, frozenset())})
+    for name in ('a', 'b', 'c', 'd'):
+        mutations.submit(Mutation('kinesis-stream', name, 'us-east-1', lambda: starts.append(time.monotonic())))
+    mutations.drain()
+
+    assert tracker.count(DELETED) == 4
+    # 20 per second: at least 50 ms between starts, minus timer slack
+    assert starts[-1] - starts[0] >= 3 * 0.05 - 0.01
@@ -0,0 +1,67 @@
+import json
+import time
+import zlib
+
+from checkpoint import LocalCheckpointStore
+from plan import PLAN_KEY, Plan, PlanEntry, clear_plan, load_plan, save_plan
+from snapshot import fingerprint, tags_hash
+
+
+def sample_plan(created_at=None, complete=True) -> Plan:
+    plan = Plan(created_at, complete)
+    plan.add(PlanEntry('', 'us-east-1', 'ebs-volume', 'vol-1', 'delete_volume', fingerprint('available', 'abc')))
+    plan.add(PlanEntry('', 'us-east-1', 'ebs-volume', 'vol-2', 'delete_volume', fingerprint('available', 'def')))
+    plan.add(PlanEntry('111111111111', 'eu-west-1', 'eip', 'eipalloc-1', 'release_address', fingerprint('')))
+    return plan
+
+
+def test_round_trip(tmp_path):
+    store = LocalCheckpointStore(str(tmp_path))
+    plan = sample_plan()
+    save_plan(store, plan)
+
+    loaded = load_plan(store)
+    assert loaded.created_at == plan.created_at
+    assert loaded.complete
+    assert sorted(loaded.entries) == sorted(plan.entries)
+    assert set(loaded.groups()) == {('', 'us-east-1', 'ebs-volume'), ('111111111111', 'eu-west-1', 'eip')}
+
+
+def test_only_complete_plans_are_applied(tmp_path):
+    store = LocalCheckpointStore(str(tmp_path))
+    plan = sample_plan(complete=False)
+    save_plan(store, plan)
+    assert load_plan(store) is None
+
+    # The dry run that made the plan resumes it, other runs do not
+    assert load_plan(store, created_at=plan.created_at).entries == plan.entries
+    assert load_plan(store, created_at=plan.created_at + 1) is None
+
+
+def test_expired_plan_is_ignored(tmp_path):
+    store = LocalCheckpointStore(str(tmp_path))
+    save_plan(store, sample_plan(created_at=time.time() - 3600))
+    assert load_plan(store, max_age=60) is None
+    assert load_plan(store) is not None
+
+
+def test_other_version_or_corrupt_plan_is_ignored(tmp_path):
+    store = LocalCheckpointStore(str(tmp_path))
+    store.save(PLAN_KEY, zlib.compress(json.dumps({'version': 0, 'complete': True}).encode()))
+    assert load_plan(store) is None
+    store.save(PLAN_KEY, b'not zlib')
+    assert load_plan(store) is None
+
+
+def test_clear(tmp_path):
+    store = LocalCheckpointStore(str(tmp_path))
+    save_plan(store, sample_plan())
+    clear_plan(store)
+    assert load_plan(store) is None
+    assert load_plan(None) is None
+
+
+def test_fingerprints_follow_the_resource():
+    assert fingerprint('available', tags_hash([{'Key': 'a', 'Value': '1'}, {'Key': 'b', 'Value': '2'}])) == \
+        fingerprint('available', tags_hash([('b', '2'), ('a', '1')]))
+    assert fingerprint('available', 'abc') != fingerprint('in-use', 'abc')
@@ -0,0 +1,207 @@
+import json
+import types
+
+import boto3
+import botocore.endpoint
+import pytest
+from botocore.awsrequest import AWSResponse
+from botocore.config import Config
+from botocore.exceptions import ClientError
+
+import index
+import rate_limit
+from index import retry_with_backoff
+from rate_limit import (ADDITIVE_INCREASE, DECREASE_COOLDOWN, MIN_RATE, AdaptiveRateLimiter, attach_rate_limiter,
+                        configure_rate_limits, get_limiter, parse_rate_limits)
+
+
+class Clock:
+    """Stands in for the time module: sleeping advances the clock"""
+
+    def __init__(self):
+        self.now = 1000.0
+        self.slept = []
+
+    def monotonic(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.slept.append(seconds)
+        self.now += seconds
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(rate_limit, 'time', clock)
+    return clock
+
+
+@pytest.fixture(autouse=True)
+def fresh_limiters(monkeypatch):
+    monkeypatch.setattr(rate_limit, '_limiters', {})
+    monkeypatch.setattr(rate_limit, '_rate_limits', dict(rate_limit.DEFAULT_RATE_LIMITS))
+
+
+def test_burst_then_paced(clock):
+    limiter = AdaptiveRateLimiter(4.0)
+    waits = [limiter.acquire() for _ in range(6)]
+
+    assert waits[:4] == [0.0] * 4
+    assert waits[4:] == pytest.approx([0.25, 0.25])
+    assert limiter.stats()['waited'] == 2
+
+
+def test_throttle_halves_the_rate_once_per_cooldown(clock):
+    limiter = AdaptiveRateLimiter(8.0)
+    limiter.on_throttle()
+    assert limiter.rate == 4.0
+    # Same burst of throttles
+    clock.now += DECREASE_COOLDOWN / 2
+    limiter.on_throttle()
+    assert limiter.rate == 4.0
+    clock.now += DECREASE_COOLDOWN
+    limiter.on_throttle()
+    assert limiter.rate == 2.0
+    assert limiter.stats()['throttles'] == 3
+
+    for _ in range(10):
+        clock.now += DECREASE_COOLDOWN
+        limiter.on_throttle()
+    assert limiter.rate == MIN_RATE
+
+
+def test_throttle_empties_the_bucket(clock):
+    limiter = AdaptiveRateLimiter(4.0)
+    limiter.on_throttle()
+    # No burst left: the next call waits for a token at the halved rate
+    assert limiter.acquire() == pytest.approx(0.5)
+
+
+def test_success_recovers_up_to_the_configured_rate(clock):
+    limiter = AdaptiveRateLimiter(1.0)
+    limiter.on_throttle()
+    limiter.on_success()
+    assert limiter.rate == pytest.approx(0.5 + ADDITIVE_INCREASE)
+    for _ in range(20):
+        limiter.on_success()
+    assert limiter.rate == 1.0
+
+
+def test_parse_rate_limits():
+    assert parse_rate_limits('ec2=10, rds=2.5,,') == {'ec2': 10.0, 'rds': 2.5}
+    assert parse_rate_limits('') == {}
+    assert parse_rate_limits(None) == {}
+    for value in ('ec2', 'ec2=fast', 'ec2=0', 'ec2=-1', '=5'):
+        with pytest.raises(ValueError):
+            parse_rate_limits(value)
+
+
+def test_limiters_are_shared_per_service_region_and_account():
+    limiter = get_limiter('ec2', 'us-east-1')
+    assert get_limiter('ec2', 'us-east-1') is limiter
+    assert get_limiter('ec2', 'eu-west-1') is not limiter
+    assert get_limiter('ec2', 'us-east-1', '111111111111') is not limiter
+    assert limiter.max_rate == rate_limit.DEFAULT_RATE_LIMITS['ec2']
+    assert get_limiter('unknown', 'us-east-1').max_rate == rate_limit.DEFAULT_RATE_LIMIT
+
+    configure_rate_limits({'ec2': 3.0})
+    assert get_limiter('ec2', 'us-east-1') is not limiter
+    assert get_limiter('ec2', 'us-east-1').max_rate == 3.0
+
+
+class FakeRaw:
+    def __init__(self, body: bytes):
+        self.body = body
+
+    def stream(self, **kwargs):
+        yield self.body
+
+
+def eks_client(monkeypatch, responses):
+    """EKS client answering ListClusters from `responses`, a list of (status, error type) pairs"""
+    # botocore's retry delays would only slow the tests down
+    monkeypatch.setattr(botocore.endpoint, 'time', types.SimpleNamespace(sleep=lambda seconds: None))
+    client = boto3.client('eks', region_name='us-east-1', aws_access_key_id='testing',
+                          aws_secret_access_key='testing',
+                          config=Config(retries={'mode': 'standard', 'total_max_attempts': 3}))
+    attach_rate_limiter(client, 'eks', 'us-east-1')
+
+    def before_send(request, **kwargs):
+        status, error_type = responses.pop(0)
+        headers = {'x-amzn-ErrorType': error_type} if error_type else {}
+        body = json.dumps({'message': error_type} if error_type else {'clusters': []}).encode()
+        return AWSResponse(request.url, status, headers, FakeRaw(body))
+
+    client.meta.events.register('before-send', before_send)
+    return client
+
+
+def test_retried_attempts_take_a_token(monkeypatch):
+    client = eks_client(monkeypatch, [(429, 'TooManyRequestsException'), (429, 'TooManyRequestsException'),
+                                      (200, None)])
+    client.list_clusters()
+
+    stats = get_limiter('eks', 'us-east-1').stats()
+    assert stats['acquired'] == 3
+    assert stats['throttles'] == 2
+    # Both throttles came within the cooldown: one decrease, then one success
+    assert stats['rate'] == pytest.approx(rate_limit.DEFAULT_RATE_LIMITS['eks'] / 2 + ADDITIVE_INCREASE)
+
+
+def test_final_throttle_is_counted_once(monkeypatch):
+    client = eks_client(monkeypatch, [(429, 'TooManyRequestsException')] * 3)
+    with pytest.raises(client.exceptions.ClientError):
+        client.list_clusters()
+
+    stats = get_limiter('eks', 'us-east-1').stats()
+    assert (stats['acquired'], stats['throttles']) == (3, 3)
+
+
+def test_other_errors_neither_slow_down_nor_recover(monkeypatch):
+    client = eks_client(monkeypatch, [(404, 'ResourceNotFoundException')])
+    limiter = get_limiter('eks', 'us-east-1')
+    limiter.rate = 1.0
+    with pytest.raises(client.exceptions.ResourceNotFoundException):
+        client.list_clusters()
+
+    assert limiter.rate == 1.0
+    assert limiter.stats()['acquired'] == 1
+
+
+def flaky(codes):
+    """Function failing with the ClientError codes in `codes`, then returning 'done'"""
+    calls = []
+
+    def call():
+        calls.append(len(calls))
+        if codes:
+            code = codes.pop(0)
+            raise ClientError({'Error': {'Code': code, 'Message': code}}, 'StopInstances')
+        return 'done'
+
+    return call, calls
+
+
+@pytest.fixture
+def no_backoff_sleep(monkeypatch):
+    monkeypatch.setattr(index, 'time', types.SimpleNamespace(sleep=lambda seconds: None))
+
+
+def test_retry_with_backoff_retries_other_errors(no_backoff_sleep):
+    call, calls = flaky(['InternalError', 'ServiceUnavailable'])
+    assert retry_with_backoff(max_retries=3)(call)() == 'done'
+    assert len(calls) == 3
+
+    call, calls = flaky(['InternalError'] * 5)
+    with pytest.raises(ClientError):
+        retry_with_backoff(max_retries=3)(call)()
+    assert len(calls) == 4
+
+
+@pytest.mark.parametrize('code', ['Throttling', 'RequestLimitExceeded', 'UnauthorizedOperation'])
+def test_retry_with_backoff_raises_throttling_and_non_retryable_errors(no_backoff_sleep, code):
+    call, calls = flaky([code])
+    with pytest.raises(ClientError):
+        retry_with_backoff(max_retries=3)(call)()
+    assert len(calls) == 1
@@ -0,0 +1,96 @@
+from botocore.exceptions import ClientError
+
+from region_probe import SEARCH_MAX_RESULTS, RegionMap, probe_regions
+
+REGIONS = ['us-east-1', 'us-west-2', 'eu-west-1']
+
+
+class FakeResourceExplorer:
+    """Answers Search from (resource type, region) pairs, honouring -region: exclusions"""
+
+    def __init__(self, resources, indexes=REGIONS, failing_types=(), no_index=False):
+        self.resources = resources
+        self.indexes = indexes
+        self.failing_types = failing_types
+        self.no_index = no_index
+        self.queries = []
+
+    def get_paginator(self, operation):
+        assert operation == 'list_indexes'
+        return self
+
+    def paginate(self):
+        if self.no_index:
+            raise ClientError({'Error': {'Code': 'AccessDeniedException', 'Message': 'no index'}}, 'ListIndexes')
+        return iter([{'Indexes': [{'Region': region, 'Type': 'LOCAL'} for region in self.indexes]}])
+
+    def search(self, QueryString, MaxResults):
+        self.queries.append(QueryString)
+        terms = QueryString.split()
+        resource_type = terms[0].partition(':')[2]
+        if resource_type in self.failing_types:
+            raise ClientError({'Error': {'Code': 'ThrottlingException', 'Message': 'slow down'}}, 'Search')
+        excluded = {term.partition(':')[2] for term in terms[1:] if term.startswith('-region:')}
+        matches = [{'Region': region, 'ResourceType': resource_type} for found_type, region in self.resources
+                   if found_type == resource_type and region not in excluded]
+        return {'Resources': matches[:MaxResults],
+                'Count': {'TotalResources': len(matches), 'Complete': len(matches) <= MaxResults}}
+
+
+def test_units_without_resources_are_skipped():
+    explorer = FakeResourceExplorer([('ec2:volume', 'us-east-1'), ('ec2:instance', 'eu-west-1'),
+                                     ('rds:cluster', 'us-west-2')])
+    region_map = probe_regions(explorer, REGIONS)
+
+    assert region_map.may_have_work('ebs-volume', 'us-east-1')
+    assert not region_map.may_have_work('ebs-volume', 'eu-west-1')
+    assert region_map.may_have_work('ec2-tagging', 'eu-west-1')
+    # rds covers both instances and clusters
+    assert region_map.may_have_work('rds', 'us-west-2')
+    assert not region_map.may_have_work('rds', 'us-east-1')
+    # Phases without a resource type mapping always run
+    assert region_map.may_have_work('unknown-phase', 'us-east-1')
+
+
+def test_truncated_search_is_repeated_without_the_regions_found():
+    resources = ([('ec2:volume', 'us-east-1')] * (SEARCH_MAX_RESULTS + 500)
+                 + [('ec2:volume', 'eu-west-1')] * 3)
+    explorer = FakeResourceExplorer(resources)
+    region_map = probe_regions(explorer, REGIONS, resource_types=['ec2:volume'])
+
+    assert explorer.queries == ['resourcetype:ec2:volume', 'resourcetype:ec2:volume -region:us-east-1']
+    assert region_map.regions_by_type == {'ec2:volume': frozenset({'us-east-1', 'eu-west-1'})}
+    assert not region_map.may_have_work('ebs-volume', 'us-west-2')
+
+
+def test_search_stops_once_every_region_is_found():
+    resources = [('ec2:volume', region) for region in REGIONS] * SEARCH_MAX_RESULTS
+    explorer = FakeResourceExplorer(resources)
+    probe_regions(explorer, REGIONS, resource_types=['ec2:volume'])
+    assert len(explorer.queries) == 1
+
+
+def test_regions_without_an_index_are_scanned():
+    explorer = FakeResourceExplorer([('ec2:volume', 'us-east-1')], indexes=['us-east-1', 'eu-west-1'])
+    region_map = probe_regions(explorer, REGIONS)
+
+    assert not region_map.may_have_work('ebs-volume', 'eu-west-1')
+    assert region_map.may_have_work('ebs-volume', 'us-west-2')
+
+
+def test_no_index_disables_the_probe():
+    assert probe_regions(FakeResourceExplorer([], no_index=True), REGIONS) is None
+
+
+def test_failed_search_scans_every_region_for_that_type():
+    explorer = FakeResourceExplorer([('ec2:volume', 'us-east-1')], failing_types=['kinesis:stream'])
+    region_map = probe_regions(explorer, REGIONS)
+
+    assert 'kinesis:stream' not in region_map.regions_by_type
+    assert all(region_map.may_have_work('kinesis-stream', region) for region in REGIONS)
+    assert not region_map.may_have_work('ebs-volume', 'eu-west-1')
+
+
+def test_region_map_without_types():
+    region_map = RegionMap(REGIONS, {})
+    assert region_map.may_have_work('ebs-volume', 'us-east-1')
@@ -0,0 +1,177 @@
+import pytest
+
+import index
+from index import PAGINATION_DONE, RunContext, stop_rds_in_region
+from scheduler import TimeBudget, TimeBudgetExceeded
+from tracker import DELETED, SKIPPED
+
+
+class FakePageIterator:
+    """Pages of a paginator; resume tokens are the index of the next page, as strings"""
+
+    def __init__(self, pages, starting_token=None):
+        self.pages = pages
+        self.start = int(starting_token) if starting_token else 0
+        self.resume_token = None
+
+    def __iter__(self):
+        for position in range(self.start, len(self.pages)):
+            self.resume_token = str(position + 1) if position + 1 < len(self.pages) else None
+            yield self.pages[position]
+
+
+class FakePaginator:
+    def __init__(self, pages):
+        self.pages = pages
+        self.calls = []
+
+    def paginate(self, PaginationConfig=None, **kwargs):
+        starting_token = (PaginationConfig or {}).get('StartingToken')
+        self.calls.append(starting_token)
+        return FakePageIterator(self.pages, starting_token)
+
+
+class ExhaustedBudget(TimeBudget):
+    """Budget exhausted from the start, as at the end of an invocation"""
+
+    def exhausted(self) -> bool:
+        return True
+
+
+class NoProtection:
+    def is_protected(self, region, service, resource):
+        return False
+
+
+def resume(run: RunContext, budget=None) -> RunContext:
+    """Context of the next invocation, restored from the checkpoint of `run`"""
+    return RunContext(budget=budget, checkpoint=run.to_checkpoint())
+
+
+def test_paginate_resumes_from_the_saved_token():
+    paginator = FakePaginator([['a'], ['b'], ['c']])
+    run = RunContext(budget=ExhaustedBudget())
+    seen = []
+    with pytest.raises(TimeBudgetExceeded):
+        for page in run.paginate('volumes:us-east-1', paginator):
+            seen.extend(page)
+    assert seen == ['a']
+    assert run.page_tokens['volumes:us-east-1'] == '1'
+
+    resumed = resume(run)
+    for page in resumed.paginate('volumes:us-east-1', paginator):
+        seen.extend(page)
+    assert seen == ['a', 'b', 'c']
+    assert paginator.calls == [None, '1']
+    assert resumed.page_tokens['volumes:us-east-1'] == PAGINATION_DONE
+
+
+def test_finished_pagination_is_not_listed_again():
+    paginator = FakePaginator([['a']])
+    run = RunContext(budget=ExhaustedBudget())
+    # The last page has no resume token: the pagination finishes despite the budget
+    assert [page for page in run.paginate('volumes:us-east-1', paginator)] == [['a']]
+
+    assert list(resume(run).paginate('volumes:us-east-1', paginator)) == []
+    assert paginator.calls == [None]
+
+
+def test_search_projects_each_page():
+    paginator = FakePaginator([{'Volumes': [{'VolumeId': 'vol-1', 'Size': 1}]}, {'Volumes': [{'VolumeId': 'vol-2'}]}])
+    run = RunContext()
+    assert list(run.search('volumes:us-east-1', paginator, 'Volumes[].VolumeId')) == ['vol-1', 'vol-2']
+
+
+def test_resumable_skips_finished_items():
+    run = RunContext(budget=ExhaustedBudget())
+    with pytest.raises(TimeBudgetExceeded):
+        for _ in run.resumable('domains:us-east-1', ['c', 'a', 'b']):
+            pass
+    assert run.page_tokens['domains:us-east-1'] == 'a'
+
+    resumed = resume(run)
+    assert list(resumed.resumable('domains:us-east-1', ['c', 'a', 'b'])) == ['b', 'c']
+    assert list(resume(resumed).resumable('domains:us-east-1', ['c', 'a', 'b'])) == []
+
+
+def test_prefetched_submits_ahead_and_resumes():
+    submitted = []
+
+    def submit(item):
+        submitted.append(item)
+        return f'future-{item}'
+
+    run = RunContext(budget=ExhaustedBudget())
+    with pytest.raises(TimeBudgetExceeded):
+        for item, future in run.prefetched('clusters:us-east-1', ['a', 'b', 'c', 'd'], submit, window=2):
+            assert future == f'future-{item}'
+    assert submitted == ['a', 'b']
+
+    submitted.clear()
+    resumed = resume(run)
+    items = [item for item, _ in resumed.prefetched('clusters:us-east-1', ['a', 'b', 'c', 'd'], submit, window=2)]
+    assert items == ['b', 'c', 'd']
+    assert submitted == ['b', 'c', 'd']
+    assert list(resume(resumed).prefetched('clusters:us-east-1', ['a', 'b'], submit, window=2)) == []
+
+
+def test_keys_are_scoped_to_the_account():
+    run = RunContext()
+    run.account = '111111111111'
+    list(run.paginate('volumes:us-east-1', FakePaginator([['a']])))
+    assert run.page_tokens == {'111111111111:volumes:us-east-1': PAGINATION_DONE}
+
+
+class FakeRds:
+    """describe_db_clusters lists one page of clusters, describe_db_instances two pages of instances"""
+
+    def __init__(self):
+        self.paginators = {
+            'describe_db_clusters': FakePaginator([{'DBClusters': [
+                {'DBClusterIdentifier': 'aurora-1', 'Status': 'available',
+                 'DBClusterMembers': [{'DBInstanceIdentifier': 'aurora-1-a'}]}]}]),
+            'describe_db_instances': FakePaginator([
+                {'DBInstances': [{'DBInstanceIdentifier': 'aurora-1-a', 'DBInstanceStatus': 'available',
+                                  'DBClusterIdentifier': 'aurora-1'},
+                                 {'DBInstanceIdentifier': 'db-1', 'DBInstanceStatus': 'available'}]},
+                {'DBInstances': [{'DBInstanceIdentifier': 'db-2', 'DBInstanceStatus': 'available'}]}]),
+        }
+        self.stopped = []
+
+    def get_paginator(self, operation):
+        return self.paginators[operation]
+
+    def stop_db_cluster(self, DBClusterIdentifier):
+        self.stopped.append(DBClusterIdentifier)
+
+    def stop_db_instance(self, DBInstanceIdentifier):
+        self.stopped.append(DBInstanceIdentifier)
+
+
+def run_rds(rds: FakeRds, run: RunContext) -> RunContext:
+    run.client = lambda service, region: rds
+    run.protection = NoProtection()
+    try:
+        stop_rds_in_region('us-east-1', run)
+    except TimeBudgetExceeded:
+        pass
+    run.mutations.drain()
+    return run
+
+
+@pytest.mark.parametrize('dry_run', [True, False])
+def test_resumed_rds_unit_does_not_list_clusters_again(monkeypatch, dry_run):
+    monkeypatch.setattr(index, 'settings', index.settings._replace(dry_run=dry_run))
+    rds = FakeRds()
+    # The budget runs out after the first page of instances, once the clusters are done
+    first = run_rds(rds, RunContext(budget=ExhaustedBudget()))
+    assert first.page_tokens == {'rds-clusters:us-east-1': PAGINATION_DONE, 'rds-instances:us-east-1': '1'}
+
+    resumed = run_rds(rds, resume(first))
+    assert rds.paginators['describe_db_clusters'].calls == [None]
+    assert rds.paginators['describe_db_instances'].calls == [None, '1']
+
+    outcome = SKIPPED if dry_run else DELETED
+    assert sorted((service, resource_id) for service, resource_id, _, _, _ in resumed.tracker.records(outcome)) == [
+        ('rds-cluster', 'aurora-1'), ('rds-instance', 'db-1'), ('rds-instance', 'db-2')]
+    assert rds.stopped == ([] if dry_run else ['aurora-1', 'db-1', 'db-2'])
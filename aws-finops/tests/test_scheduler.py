@@ -0,0 +1,168 @@
+import threading
+import time
+from collections import Counter
+
+import pytest
+
+from scheduler import TimeBudget, TimeBudgetExceeded, WorkScheduler, WorkUnit, parse_concurrency_map
+
+
+class Concurrency:
+    """Records how many units run at once, overall, per (account, service) and per account"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.running = Counter()
+        self.peaks = Counter()
+        self.order = []
+
+    def unit(self, service: str, account: str = '', region: str = 'us-east-1', duration: float = 0.02) -> WorkUnit:
+        keys = ('all', (account, service), account)
+
+        def func():
+            with self._lock:
+                self.order.append((account, service, region))
+                for key in keys:
+                    self.running[key] += 1
+                    self.peaks[key] = max(self.peaks[key], self.running[key])
+            time.sleep(duration)
+            with self._lock:
+                for key in keys:
+                    self.running[key] -= 1
+
+        return WorkUnit(service, service, region, func, account)
+
+
+def test_global_limit():
+    concurrency = Concurrency()
+    units = [concurrency.unit(service) for service in ('ec2', 'rds', 'eks', 'kafka') for _ in range(4)]
+    results = WorkScheduler(max_workers=3, default_service_limit=10).run(units)
+
+    assert len(results) == 16 and all(result.error is None for result in results)
+    assert concurrency.peaks['all'] == 3
+
+
+def test_service_limits():
+    concurrency = Concurrency()
+    units = [concurrency.unit('ec2') for _ in range(8)] + [concurrency.unit('rds') for _ in range(8)]
+    WorkScheduler(max_workers=10, service_limits={'ec2': 3}, default_service_limit=1).run(units)
+
+    assert concurrency.peaks[('', 'ec2')] == 3
+    assert concurrency.peaks[('', 'rds')] == 1
+    # A busy service does not hold up the others
+    assert concurrency.peaks['all'] == 4
+
+
+def test_account_limit_and_per_account_service_limits():
+    concurrency = Concurrency()
+    units = [concurrency.unit(service, account)
+             for account in ('111111111111', '222222222222')
+             for service in ('ec2', 'rds')
+             for _ in range(4)]
+    WorkScheduler(max_workers=10, default_service_limit=2, account_limit=3).run(units)
+
+    for account in ('111111111111', '222222222222'):
+        assert concurrency.peaks[account] == 3
+        for service in ('ec2', 'rds'):
+            assert concurrency.peaks[(account, service)] <= 2
+    assert concurrency.peaks['all'] == 6
+
+
+def test_dispatch_is_round_robin_in_submission_order():
+    concurrency = Concurrency()
+    units = ([concurrency.unit('ec2', region=region) for region in ('r1', 'r2', 'r3')]
+             + [concurrency.unit('rds', region=region) for region in ('r1', 'r2')]
+             + [concurrency.unit('ec2', '111111111111', region='r1')])
+    WorkScheduler(max_workers=1).run(units)
+
+    assert concurrency.order == [('', 'ec2', 'r1'), ('', 'rds', 'r1'), ('111111111111', 'ec2', 'r1'),
+                                 ('', 'ec2', 'r2'), ('', 'rds', 'r2'), ('', 'ec2', 'r3')]
+
+
+def test_unit_errors_are_returned_not_raised():
+    def failing():
+        raise RuntimeError('boom')
+
+    def out_of_time():
+        raise TimeBudgetExceeded()
+
+    units = [WorkUnit('ebs', 'ec2', 'us-east-1', failing), WorkUnit('rds', 'rds', 'us-east-1', out_of_time),
+             WorkUnit('eip', 'ec2', 'eu-west-1', lambda: None)]
+    results = {result.unit.phase: result.error for result in WorkScheduler().run(units)}
+
+    assert isinstance(results['ebs'], RuntimeError)
+    assert isinstance(results['rds'], TimeBudgetExceeded)
+    assert results['eip'] is None
+
+
+class Countdown(TimeBudget):
+    """Budget exhausted once `units` units have checked it"""
+
+    def __init__(self, units: int):
+        super().__init__()
+        self.units = units
+
+    def exhausted(self) -> bool:
+        return self.units <= 0
+
+
+def test_no_units_dispatched_once_the_budget_is_exhausted():
+    budget = Countdown(2)
+    ran = []
+
+    def unit(n):
+        def func():
+            ran.append(n)
+            budget.units -= 1
+        return WorkUnit('ebs', 'ec2', f'region-{n}', func)
+
+    results = WorkScheduler(max_workers=1).run([unit(n) for n in range(5)], budget)
+
+    assert ran == [0, 1]
+    assert [result.unit.region for result in results] == ['region-0', 'region-1']
+
+
+def test_units_stopping_on_the_budget_let_the_others_finish():
+    budget = Countdown(1)
+    finished = []
+
+    def stops():
+        budget.units -= 1
+        budget.check()
+
+    units = [WorkUnit('rds', 'rds', 'us-east-1', stops),
+             WorkUnit('eip', 'ec2', 'us-east-1', lambda: finished.append('eip'))]
+    results = WorkScheduler(max_workers=2).run(units, budget)
+
+    # Both were dispatched before the budget ran out
+    assert finished == ['eip']
+    assert {result.unit.phase: type(result.error) for result in results} == {
+        'rds': TimeBudgetExceeded, 'eip': type(None)}
+
+
+class LambdaContext:
+    def __init__(self, remaining_ms: int):
+        self.remaining_ms = remaining_ms
+
+    def get_remaining_time_in_millis(self) -> int:
+        return self.remaining_ms
+
+
+def test_time_budget():
+    assert TimeBudget().remaining() is None
+    assert not TimeBudget().exhausted()
+
+    budget = TimeBudget(LambdaContext(90_000), safety_margin=60)
+    assert 29 < budget.remaining() <= 30
+    budget.check()
+
+    with pytest.raises(TimeBudgetExceeded):
+        TimeBudget(LambdaContext(30_000), safety_margin=60).check()
+
+
+def test_parse_concurrency_map():
+    assert parse_concurrency_map('ec2=4, rds=2,') == {'ec2': 4, 'rds': 2}
+    assert parse_concurrency_map('') == {}
+    for value in ('ec2', 'ec2=0', 'ec2=two', '=3', 'ec2=-1'):
+        with pytest.raises(ValueError):
+            parse_concurrency_map(value)
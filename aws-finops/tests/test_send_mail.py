@@ -0,0 +1,166 @@
+import csv
+import gzip
+import io
+import random
+from email import message_from_bytes
+
+import pytest
+
+import send_mail
+from send_mail import REPORT_ATTACHMENT_NAME, get_email_body, get_report_csv, send_email
+
+
+class FakeSes:
+    def __init__(self):
+        self.regions = []
+        self.sent = []
+        self.raw = []
+
+    def get_identity_verification_attributes(self, Identities):
+        return {'VerificationAttributes': {identity: {'VerificationStatus': 'Success'} for identity in Identities}}
+
+    def send_email(self, Source, Destination, Message):
+        self.sent.append(Message['Body']['Html']['Data'])
+        return {'MessageId': 'plain'}
+
+    def send_raw_email(self, Source, Destinations, RawMessage):
+        self.raw.append(message_from_bytes(RawMessage['Data']))
+        return {'MessageId': 'raw'}
+
+
+@pytest.fixture
+def ses(monkeypatch):
+    ses = FakeSes()
+
+    def get_client(service, region_name=None):
+        ses.regions.append(region_name)
+        return ses
+
+    monkeypatch.setattr(send_mail, 'get_client', get_client)
+    monkeypatch.setattr(send_mail, '_verified_identities', None)
+    return ses
+
+
+def read_csv(compressed: bytes):
+    return list(csv.reader(io.StringIO(gzip.decompress(compressed).decode('utf-8'))))
+
+
+def parts(message):
+    """(html body, attachment bytes or None) of a raw message"""
+    body = attachment = None
+    for part in message.walk():
+        if part.get_content_type() == 'text/html':
+            body = part.get_payload(decode=True).decode('utf-8')
+        elif part.get_filename() == REPORT_ATTACHMENT_NAME:
+            attachment = part.get_payload(decode=True)
+    return body, attachment
+
+
+def test_rows_are_escaped():
+    body = get_email_body([('ebs-volume', '<script>alert("x")</script>')], [], [], [('eip', 'a & b')])
+    assert '<script>' not in body
+    assert '&lt;script&gt;alert(&quot;x&quot;)&lt;/script&gt;' in body
+    assert 'a &amp; b' in body
+
+
+def test_empty_report():
+    assert 'No resources found for cleanup' in get_email_body([], [], [], [])
+
+
+def test_summarized_body_shows_counts_and_first_rows():
+    deleted = [('ebs-volume', f'vol-{n}') for n in range(5)] + [('eip', '1.2.3.4')]
+    body = get_email_body(deleted, [], [], [('eip', '5.6.7.8')], max_rows=2)
+
+    assert 'Successfully Deleted/Stopped Resources - Counts by Type' in body
+    assert 'Successfully Deleted/Stopped Resources - First 2 of 6 (see attachment)' in body
+    assert 'vol-1' in body and 'vol-2' not in body
+    # Sections within the limit are shown in full
+    assert 'Failed to Delete/Stop (Action Required)</h2>' in body
+    assert '5.6.7.8' in body
+
+
+def test_body_over_budget():
+    deleted = [('ebs-volume', f'vol-{n}') for n in range(100)]
+    assert get_email_body(deleted, [], [], [], max_bytes=1000) is None
+    assert get_email_body(deleted, [], [], [], max_bytes=100_000) is not None
+
+
+def test_report_csv():
+    rows = read_csv(get_report_csv([('eip', '1.2.3.4')], [('ebs-volume', 'vol-1, "8GB"')], [('kinesis', 'orders')],
+                                   [('rds-instance', 'db-1')], [('msk-cluster', 'arn:x')]))
+    assert rows == [['status', 'resource_type', 'resource_id'],
+                    ['skipped', 'ebs-volume', 'vol-1, "8GB"'],
+                    ['deleted', 'eip', '1.2.3.4'],
+                    ['pending', 'msk-cluster', 'arn:x'],
+                    ['failed', 'rds-instance', 'db-1'],
+                    ['notify', 'kinesis', 'orders']]
+
+
+def test_report_csv_row_limit():
+    deleted = [('eip', f'10.0.0.{n}') for n in range(3)]
+    rows = read_csv(get_report_csv(deleted, [('ebs-volume', 'vol-1')], [], [], max_rows=2))
+    assert rows == [['status', 'resource_type', 'resource_id'], ['skipped', 'ebs-volume', 'vol-1'],
+                    ['deleted', 'eip', '10.0.0.0']]
+
+
+def test_small_report_is_sent_inline(ses):
+    send_email('from@example.com', 'to@example.com', [('eip', '1.2.3.4')], [], [], [], ses_region='eu-west-1')
+    assert len(ses.sent) == 1 and not ses.raw
+    assert '1.2.3.4' in ses.sent[0]
+    assert ses.regions == ['eu-west-1', 'eu-west-1']
+
+
+def test_verified_sender_is_remembered(ses):
+    for _ in range(2):
+        send_email('from@example.com', 'to@example.com', [('eip', '1.2.3.4')], [], [], [], cache_ttl=60)
+    # One verification, two sends
+    assert len(ses.regions) == 3
+    assert send_mail._verified_identities.ttl == 60
+
+
+def test_large_report_falls_back_to_summary_and_attachment(ses):
+    deleted = [('ebs-volume', f'vol-{n:017x}') for n in range(500)]
+    send_email('from@example.com', 'to@example.com', deleted, [], [], [], max_body_bytes=20_000, top_rows=10)
+
+    assert not ses.sent and len(ses.raw) == 1
+    body, attachment = parts(ses.raw[0])
+    assert 'First 10 of 500' in body
+    assert 'vol-00000000000000009' in body and 'vol-0000000000000000a' not in body
+    rows = read_csv(attachment)
+    assert len(rows) == 501
+    assert rows[-1] == ['deleted', 'ebs-volume', f'vol-{499:017x}']
+
+
+def random_ids(count: int):
+    # Random ids compress poorly, so the attachment grows with the row count
+    generator = random.Random(0)
+    return [('ebs-volume', f'vol-{generator.getrandbits(128):032x}') for _ in range(count)]
+
+
+def test_attachment_is_cut_down_to_the_ses_limit(ses, monkeypatch):
+    monkeypatch.setattr(send_mail, 'SES_MAX_MESSAGE_BYTES', 60_000)
+    deleted = random_ids(5000)
+    send_email('from@example.com', 'to@example.com', deleted, [], [], [], max_body_bytes=20_000)
+
+    assert len(ses.raw) == 1
+    assert len(ses.raw[0].as_bytes()) <= 60_000
+    body, attachment = parts(ses.raw[0])
+    rows = read_csv(attachment)[1:]
+    assert 0 < len(rows) < 5000
+    assert rows == [['deleted', service, resource_id] for service, resource_id in deleted[:len(rows)]]
+    assert f'The attachment lists the first {len(rows)} of 5000 resources' in body
+
+
+def test_attachment_is_dropped_when_nothing_fits(ses, monkeypatch):
+    monkeypatch.setattr(send_mail, 'SES_MAX_MESSAGE_BYTES', 5_000)
+    send_email('from@example.com', 'to@example.com', random_ids(5000), [], [], [], max_body_bytes=20_000)
+
+    assert not ses.raw and len(ses.sent) == 1
+    assert 'The full list is too large to attach to this email.' in ses.sent[0]
+
+
+def test_unverified_sender_sends_nothing(ses, monkeypatch):
+    monkeypatch.setattr(ses, 'get_identity_verification_attributes',
+                        lambda Identities: {'VerificationAttributes': {}})
+    send_email('from@example.com', 'to@example.com', [('eip', '1.2.3.4')], [], [], [])
+    assert not ses.sent and not ses.raw
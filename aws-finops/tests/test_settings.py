@@ -0,0 +1,43 @@
+import pytest
+
+from settings import DEFAULT_REPORT_MAX_BODY_BYTES, DEFAULT_REPORT_TOP_ROWS, DEFAULT_SES_REGION, load_settings
+
+
+def test_report_settings(monkeypatch):
+    for key in ('SES_REGION', 'REPORT_MAX_BODY_BYTES', 'REPORT_TOP_ROWS'):
+        monkeypatch.delenv(key, raising=False)
+    settings = load_settings()
+    assert (settings.ses_region, settings.report_max_body_bytes, settings.report_top_rows) == (
+        DEFAULT_SES_REGION, DEFAULT_REPORT_MAX_BODY_BYTES, DEFAULT_REPORT_TOP_ROWS)
+
+    monkeypatch.setenv('SES_REGION', 'eu-west-1')
+    monkeypatch.setenv('REPORT_MAX_BODY_BYTES', '1000')
+    monkeypatch.setenv('REPORT_TOP_ROWS', '5')
+    settings = load_settings()
+    assert (settings.ses_region, settings.report_max_body_bytes, settings.report_top_rows) == ('eu-west-1', 1000, 5)
+
+
+@pytest.mark.parametrize('key', ['REPORT_MAX_BODY_BYTES', 'REPORT_TOP_ROWS'])
+@pytest.mark.parametrize('value', ['0', '-1', '5MB'])
+def test_invalid_report_settings(monkeypatch, key, value):
+    monkeypatch.setenv(key, value)
+    with pytest.raises(ValueError, match=key):
+        load_settings()
+
+
+def test_boto_settings(monkeypatch):
+    monkeypatch.setenv('BOTO_CONNECT_TIMEOUT', '2.5')
+    monkeypatch.setenv('BOTO_READ_TIMEOUT', '30')
+    monkeypatch.setenv('BOTO_MAX_ATTEMPTS', '7')
+    monkeypatch.setenv('BOTO_RETRY_MODE', 'adaptive')
+    settings = load_settings()
+    assert (settings.boto_connect_timeout, settings.boto_read_timeout, settings.boto_max_attempts,
+            settings.boto_retry_mode) == (2.5, 30.0, 7, 'adaptive')
+
+
+@pytest.mark.parametrize('key, value', [('BOTO_CONNECT_TIMEOUT', '0'), ('BOTO_READ_TIMEOUT', 'slow'),
+                                        ('BOTO_MAX_ATTEMPTS', '1.5'), ('BOTO_RETRY_MODE', 'eager')])
+def test_invalid_boto_settings(monkeypatch, key, value):
+    monkeypatch.setenv(key, value)
+    with pytest.raises(ValueError, match=key):
+        load_settings()
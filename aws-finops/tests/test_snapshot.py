@@ -0,0 +1,112 @@
+import time
+
+import snapshot
+from checkpoint import LocalCheckpointStore
+from snapshot import NO_CONFIG_HISTORY, SNAPSHOT_KEY, ResourceSnapshot, tags_hash
+
+
+class Clock:
+    def __init__(self):
+        self.now = time.time()
+
+    def time(self):
+        return self.now
+
+
+def next_run(store, **kwargs) -> ResourceSnapshot:
+    return ResourceSnapshot(store, **kwargs)
+
+
+def test_verdict_persists_across_runs(tmp_path):
+    store = LocalCheckpointStore(str(tmp_path))
+    first = next_run(store)
+    assert first.lookup('ec2-instance', 'us-east-1', 'i-1', 'untagged', '') is None
+    first.record('ec2-instance', 'us-east-1', 'i-1', 'untagged', '', NO_CONFIG_HISTORY)
+    first.save()
+
+    second = next_run(store)
+    assert second.lookup('ec2-instance', 'us-east-1', 'i-1', 'untagged', '') == NO_CONFIG_HISTORY
+    assert second.lookup('ec2-instance', 'eu-west-1', 'i-1', 'untagged', '') is None
+    assert (second.hits, second.misses) == (1, 1)
+
+    # A hit is carried over, so the verdict survives a third run
+    second.save()
+    assert next_run(store).lookup('ec2-instance', 'us-east-1', 'i-1', 'untagged', '') == NO_CONFIG_HISTORY
+
+
+def test_changed_resource_is_evaluated_again(tmp_path):
+    store = LocalCheckpointStore(str(tmp_path))
+    first = next_run(store)
+    first.record('ebs-volume', 'us-east-1', 'vol-1', 'available', tags_hash([('team', 'a')]), NO_CONFIG_HISTORY)
+    first.save()
+
+    second = next_run(store)
+    assert second.lookup('ebs-volume', 'us-east-1', 'vol-1', 'in-use', tags_hash([('team', 'a')])) is None
+    assert second.lookup('ebs-volume', 'us-east-1', 'vol-1', 'available', tags_hash([('team', 'b')])) is None
+    assert second.lookup('ebs-volume', 'us-east-1', 'vol-1', 'available', tags_hash([('team', 'a')])) is not None
+
+
+def test_old_verdicts_are_evaluated_again_and_unseen_resources_dropped(tmp_path, monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(snapshot, 'time', clock)
+    store = LocalCheckpointStore(str(tmp_path))
+    first = next_run(store, reevaluate_after=100, max_age=1000)
+    first.record('ec2-instance', 'us-east-1', 'i-1', 'untagged', '', NO_CONFIG_HISTORY)
+    first.record('ec2-instance', 'us-east-1', 'i-2', 'untagged', '', NO_CONFIG_HISTORY)
+    first.save()
+
+    clock.now += 50
+    second = next_run(store, reevaluate_after=100, max_age=1000)
+    assert second.lookup('ec2-instance', 'us-east-1', 'i-1', 'untagged', '') == NO_CONFIG_HISTORY
+    second.save()
+
+    clock.now += 100
+    third = next_run(store, reevaluate_after=100, max_age=1000)
+    assert third.lookup('ec2-instance', 'us-east-1', 'i-1', 'untagged', '') is None
+    third.record('ec2-instance', 'us-east-1', 'i-1', 'untagged', '', NO_CONFIG_HISTORY)
+    third.save()
+
+    # i-2 was last seen by the first run, longer ago than max_age: the next save drops it
+    clock.now += 900
+    fourth = next_run(store, reevaluate_after=10 ** 6, max_age=1000)
+    assert fourth.lookup('ec2-instance', 'us-east-1', 'i-1', 'untagged', '') == NO_CONFIG_HISTORY
+    fourth.save()
+    fifth = next_run(store, reevaluate_after=10 ** 6, max_age=1000)
+    assert fifth.lookup('ec2-instance', 'us-east-1', 'i-1', 'untagged', '') == NO_CONFIG_HISTORY
+    assert fifth.lookup('ec2-instance', 'us-east-1', 'i-2', 'untagged', '') is None
+
+
+def test_accounts_are_kept_apart(tmp_path):
+    store = LocalCheckpointStore(str(tmp_path))
+    first = next_run(store)
+    first.for_account('111111111111').record('ec2-instance', 'us-east-1', 'i-1', 'untagged', '', NO_CONFIG_HISTORY)
+    first.save()
+
+    second = next_run(store)
+    assert second.lookup('ec2-instance', 'us-east-1', 'i-1', 'untagged', '') is None
+    assert second.for_account('222222222222').lookup('ec2-instance', 'us-east-1', 'i-1', 'untagged', '') is None
+    assert (second.for_account('111111111111').lookup('ec2-instance', 'us-east-1', 'i-1', 'untagged', '')
+            == NO_CONFIG_HISTORY)
+
+
+def test_without_store_nothing_is_kept():
+    disabled = ResourceSnapshot()
+    disabled.record('ec2-instance', 'us-east-1', 'i-1', 'untagged', '', NO_CONFIG_HISTORY)
+    assert disabled.lookup('ec2-instance', 'us-east-1', 'i-1', 'untagged', '') is None
+    disabled.save()
+
+
+def test_unused_snapshot_is_not_rewritten(tmp_path):
+    store = LocalCheckpointStore(str(tmp_path))
+    next_run(store).save()
+    assert store.load(SNAPSHOT_KEY) is None
+
+
+def test_corrupt_snapshot_scans_everything(tmp_path):
+    store = LocalCheckpointStore(str(tmp_path))
+    store.save(SNAPSHOT_KEY, b'not zlib')
+    run = next_run(store)
+    assert run.lookup('ec2-instance', 'us-east-1', 'i-1', 'untagged', '') is None
+    run.record('ec2-instance', 'us-east-1', 'i-1', 'untagged', '', NO_CONFIG_HISTORY)
+    run.save()
+    assert next_run(store).lookup('ec2-instance', 'us-east-1', 'i-1', 'untagged', '') == NO_CONFIG_HISTORY
@@ -0,0 +1,147 @@
+import json
+import types
+from concurrent.futures import ThreadPoolExecutor
+
+import boto3
+import botocore.endpoint
+import pytest
+from botocore.awsrequest import AWSResponse
+from botocore.config import Config
+
+import telemetry
+from telemetry import (CALLS, ERRORS, HISTOGRAM, LATENCY_BUCKETS_MS, LATENCY_MAX, RETRIES, STAT_FIELDS, THROTTLES,
+                       _percentile, _record, attach_telemetry, operation_stats, reset_telemetry, telemetry_summary)
+
+
+@pytest.fixture(autouse=True)
+def fresh_telemetry():
+    reset_telemetry()
+    yield
+    reset_telemetry()
+
+
+def stat_of(latencies_ms):
+    stat = [0] * STAT_FIELDS
+    for latency_ms in latencies_ms:
+        stat[CALLS] += 1
+        stat[LATENCY_MAX] = max(stat[LATENCY_MAX], latency_ms)
+        stat[HISTOGRAM + telemetry._bucket(latency_ms)] += 1
+    return stat
+
+
+def test_percentile_is_the_upper_bound_of_its_bucket():
+    stat = stat_of([5] * 5 + [40] * 4 + [700])
+    assert _percentile(stat, 0.5) == 10.0
+    assert _percentile(stat, 0.9) == 50.0
+    assert _percentile(stat, 1.0) == 700.0
+
+
+def test_percentile_never_exceeds_the_maximum():
+    stat = stat_of([0.2, 0.3])
+    assert _percentile(stat, 0.5) == 0.3
+    assert _percentile(stat, 0.9) == 0.3
+
+
+def test_percentile_in_the_open_bucket_is_the_maximum():
+    stat = stat_of([LATENCY_BUCKETS_MS[-1] + 1000, LATENCY_BUCKETS_MS[-1] + 2000])
+    assert _percentile(stat, 0.5) == LATENCY_BUCKETS_MS[-1] + 2000
+
+
+def test_stats_of_every_thread_are_merged():
+    def record(n):
+        _record('ec2', 'DescribeVolumes', 'us-east-1', 5.0, n % 2, 0, False)
+
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        list(executor.map(record, range(100)))
+    record(0)
+
+    stat = operation_stats()[('ec2', 'DescribeVolumes', 'us-east-1')]
+    assert (stat[CALLS], stat[RETRIES], stat[ERRORS]) == (101, 50, 0)
+
+
+def test_reset_drops_the_stats_of_past_threads():
+    for _ in range(5):
+        reset_telemetry()
+        # A new pool per invocation, as the handler does
+        with ThreadPoolExecutor(max_workers=4) as executor:
+            list(executor.map(lambda n: _record('ec2', 'DescribeVolumes', 'us-east-1', 5.0, 0, 0, False),
+                              range(40)))
+        assert len(telemetry._thread_stats) <= 4
+        assert operation_stats()[('ec2', 'DescribeVolumes', 'us-east-1')][CALLS] == 40
+
+    reset_telemetry()
+    assert operation_stats() == {}
+    assert telemetry._thread_stats == []
+
+
+class FakeRaw:
+    def __init__(self, body: bytes):
+        self.body = body
+
+    def stream(self, **kwargs):
+        yield self.body
+
+
+def eks_client(monkeypatch, responses):
+    """EKS client answering ListClusters from `responses`: (status, error type) pairs or exceptions to raise"""
+    monkeypatch.setattr(botocore.endpoint, 'time', types.SimpleNamespace(sleep=lambda seconds: None))
+    client = boto3.client('eks', region_name='us-east-1', aws_access_key_id='testing',
+                          aws_secret_access_key='testing',
+                          config=Config(retries={'mode': 'standard', 'total_max_attempts': 3}))
+    attach_telemetry(client, 'eks', 'us-east-1')
+
+    def before_send(request, **kwargs):
+        response = responses.pop(0)
+        if isinstance(response, Exception):
+            raise response
+        status, error_type = response
+        headers = {'x-amzn-ErrorType': error_type} if error_type else {}
+        body = json.dumps({'message': error_type} if error_type else {'clusters': []}).encode()
+        return AWSResponse(request.url, status, headers, FakeRaw(body))
+
+    client.meta.events.register('before-send', before_send)
+    return client
+
+
+def list_clusters_stat():
+    return operation_stats()[('eks', 'ListClusters', 'us-east-1')]
+
+
+def test_hooks_count_retries_and_throttles(monkeypatch):
+    client = eks_client(monkeypatch, [(429, 'TooManyRequestsException'), (500, 'ServerException'), (200, None)])
+    client.list_clusters()
+
+    stat = list_clusters_stat()
+    assert (stat[CALLS], stat[RETRIES], stat[THROTTLES], stat[ERRORS]) == (1, 2, 1, 0)
+
+
+def test_hooks_count_failed_calls(monkeypatch):
+    client = eks_client(monkeypatch, [(429, 'TooManyRequestsException')] * 3 + [(404, 'ResourceNotFoundException')])
+    with pytest.raises(client.exceptions.ClientError):
+        client.list_clusters()
+    with pytest.raises(client.exceptions.ResourceNotFoundException):
+        client.list_clusters()
+
+    stat = list_clusters_stat()
+    assert (stat[CALLS], stat[RETRIES], stat[THROTTLES], stat[ERRORS]) == (2, 2, 3, 2)
+
+
+def test_hooks_count_calls_that_raise(monkeypatch):
+    client = eks_client(monkeypatch, [RuntimeError('connection reset')])
+    with pytest.raises(RuntimeError):
+        client.list_clusters()
+
+    stat = list_clusters_stat()
+    assert (stat[CALLS], stat[ERRORS]) == (1, 1)
+
+
+def test_summary(monkeypatch):
+    client = eks_client(monkeypatch, [(200, None), (200, None)])
+    client.list_clusters()
+    client.list_clusters()
+
+    summary = telemetry_summary()
+    assert (summary['calls'], summary['errors'], summary['retries'], summary['throttles']) == (2, 0, 0, 0)
+    (operation,) = summary['top_operations']
+    assert operation['operation'] == 'eks.ListClusters' and operation['calls'] == 2
+    assert operation['p50_ms'] <= operation['max_ms']
@@ -0,0 +1,97 @@
+import threading
+
+import tracker as tracker_module
+from tracker import DELETED, FAILED, NOTIFY, PENDING, SKIPPED, ResourceTracker
+
+
+def test_concurrent_adds_are_all_merged():
+    tracker = ResourceTracker()
+    threads, per_thread = 8, 1500  # more than FLUSH_THRESHOLD, so buffers flush mid-way too
+    start = threading.Barrier(threads)
+
+    def add(thread):
+        start.wait()
+        for n in range(per_thread):
+            tracker.add_deleted('ebs-volume', f'vol-{thread}-{n}', f'region-{thread % 2}', 'delete_volume')
+
+    workers = [threading.Thread(target=add, args=(thread,)) for thread in range(threads)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    tracker.merge()
+
+    assert len(tracker) == threads * per_thread
+    assert tracker.count(DELETED) == threads * per_thread
+    assert len({resource_id for _, resource_id in tracker.deleted_resources}) == threads * per_thread
+    assert tracker.counts_by_region(DELETED) == {'region-0': 4 * per_thread, 'region-1': 4 * per_thread}
+
+
+def test_reads_include_unflushed_records():
+    tracker = ResourceTracker()
+    tracker.add_failed('rds-cluster', 'db-1', 'us-east-1', 'stop_db_cluster')
+    assert tracker.count(FAILED) == 1
+    assert tracker.check_resources == [('rds-cluster', 'db-1')]
+
+
+def test_report_properties():
+    tracker = ResourceTracker()
+    tracker.add_deleted('eip', '1.2.3.4', 'us-east-1', 'release_address')
+    tracker.add_skipped('ebs-volume', 'vol-1 (8GB)', 'us-east-1', 'delete_volume')
+    tracker.add_notify('kinesis', 'orders', 'eu-west-1')
+    tracker.add_failed('rds-instance', 'db-1', 'eu-west-1', 'stop_db_instance')
+    tracker.add_pending('msk-cluster', 'arn:aws:kafka:eu-west-1:1:cluster/x', 'eu-west-1', 'delete_cluster')
+    tracker.for_account('111111111111').add_deleted('eip', '5.6.7.8', 'us-east-1', 'release_address')
+
+    assert tracker.deleted_resources == [('eip', '1.2.3.4'), ('eip [111111111111]', '5.6.7.8')]
+    assert tracker.skip_delete_resources == [('ebs-volume', 'vol-1 (8GB)')]
+    assert tracker.notify_resources == [('kinesis', 'orders')]
+    assert tracker.check_resources == [('rds-instance', 'db-1')]
+    assert tracker.pending_resources == [('msk-cluster', 'arn:aws:kafka:eu-west-1:1:cluster/x')]
+    assert list(tracker.records(FAILED)) == [('rds-instance', 'db-1', 'eu-west-1', 'stop_db_instance', '')]
+
+
+def test_counts():
+    tracker = ResourceTracker()
+    for n in range(3):
+        tracker.add_deleted('ebs-volume', f'vol-{n}', 'us-east-1', 'delete_volume')
+    tracker.add_deleted('eip', '1.2.3.4', 'eu-west-1', 'release_address')
+    tracker.for_account('111111111111').add_skipped('ebs-volume', 'vol-9', 'eu-west-1', 'delete_volume')
+
+    assert tracker.counts_by_category(DELETED) == {'ebs-volume': 3, 'eip': 1}
+    assert tracker.counts_by_region(DELETED) == {'us-east-1': 3, 'eu-west-1': 1}
+    assert tracker.counts_by_account(SKIPPED) == {'111111111111': 1}
+    assert tracker.count(NOTIFY) == 0
+    assert tracker.summary() == {
+        'deleted': {'total': 4, 'by_category': {'ebs-volume': 3, 'eip': 1},
+                    'by_region': {'us-east-1': 3, 'eu-west-1': 1}, 'by_account': {'': 4}},
+        'skipped': {'total': 1, 'by_category': {'ebs-volume': 1},
+                    'by_region': {'eu-west-1': 1}, 'by_account': {'111111111111': 1}},
+    }
+
+
+def test_dump_round_trip():
+    tracker = ResourceTracker()
+    tracker.add_deleted('ebs-volume', 'vol-1 (8GB)', 'us-east-1', 'delete_volume')
+    tracker.add_skipped('opensearch-domain', 'données-é中文', 'eu-west-1', 'delete_domain')
+    tracker.add_pending('eks-nodegroup', 'cluster/nodegroup 🚀', 'eu-west-1', 'update_nodegroup_config')
+    tracker.for_account('111111111111').add_failed('eip', '', 'us-east-1', 'release_address')
+
+    restored = ResourceTracker()
+    restored.load(tracker.dump())
+
+    assert restored.dump() == tracker.dump()
+    assert restored.summary() == tracker.summary()
+    assert restored.skip_delete_resources == [('opensearch-domain', 'données-é中文')]
+    assert restored.pending_resources == [('eks-nodegroup', 'cluster/nodegroup 🚀')]
+    assert restored.check_resources == [('eip [111111111111]', '')]
+
+
+def test_store_stays_compact(monkeypatch):
+    monkeypatch.setattr(tracker_module, 'FLUSH_THRESHOLD', 10)
+    tracker = ResourceTracker()
+    for n in range(1000):
+        tracker.add_deleted('ebs-volume', f'vol-{n:017x}', 'us-east-1', 'delete_volume')
+    # Ids plus a few bytes of codes and offsets per record
+    assert tracker.nbytes < 1000 * (21 + 1 + 4 * 2 + 8) + 100
+    assert tracker.count(PENDING) == 0
@@ -94,6 +94,48 @@ variable "ses_region" {
   default     = "us-east-1"
 }
 
+variable "checkpoint_bucket" {
+  type        = string
+  description = "S3 bucket storing the progress of runs interrupted by the Lambda timeout (empty to disable resuming)"
+  default     = ""
+}
+
+variable "incremental_scan" {
+  type        = bool
+  description = "Keep a snapshot in the checkpoint bucket so instances without AWS Config history are not looked up again"
+  default     = false
+}
+
+variable "save_plan" {
+  type        = bool
+  description = "Save the actions found by dry runs as a plan in the checkpoint bucket"
+  default     = false
+}
+
+variable "apply_plan" {
+  type        = bool
+  description = "Apply the plan saved by the last dry run instead of scanning (requires checkpoint_bucket)"
+  default     = false
+}
+
+variable "accounts" {
+  type        = list(string)
+  description = "Account ids or role ARNs to clean from this deployment, or [\"organization\"] for every active account of the organization (empty to clean only this account)"
+  default     = []
+}
+
+variable "assume_role_name" {
+  type        = string
+  description = "Role assumed in each target account; it needs the cleanup permissions and must trust the Lambda role"
+  default     = "FinOpsCleanupRole"
+}
+
+variable "resource_explorer_region" {
+  type        = string
+  description = "Region of the Resource Explorer aggregator index; when set, regions without resources of a cleanup phase's types are skipped (empty to scan every region)"
+  default     = ""
+}
+
 variable "sns_topic_arn" {
   type        = string
   description = "OPTIONAL: SNS topic ARN for CloudWatch alarm notifications. If empty, alarms will not send notifications."